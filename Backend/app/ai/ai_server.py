@@ -8,6 +8,13 @@ ai_server.py (Backend/app/ai 안에서만 독립 실행)
   2) 이상치 탐지(robust z-score)
   3) standby 전력낭비(Wh) 추정
   4) 리포트(요약 문장)
+  5) 전체 디바이스 일괄 리포트(/reports)
+- 분석 결과는 (워터마크, 모델 버전) 키의 LRU+TTL 캐시에 보관 (/health 에 hit/miss)
+- 모델은 불변 스냅샷(model_snapshot.py, models.npz 캐시)으로 로드하고 파일 변경 시 자동 교체
+- 최근 AI_ROLLING_HOURS 시간은 메모리 슬라이딩 윈도우(rolling.py)로 유지하고
+  id 워터마크 이후 행만 폴링 → 해당 범위의 /waste, /anomalies 는 DB 조회 없음
+- 그보다 긴 구간은 로컬 분석 캐시(local_store.py, ai/data/)가 있으면
+  캐시 워터마크까지는 파일에서, 그 이후 행만 DB에서 읽음
 
 실행:
   cd Backend/app/ai
@@ -22,16 +29,16 @@ ai_server.py (Backend/app/ai 안에서만 독립 실행)
 """
 
 import os
-import json
-import math
 import time
+import asyncio
 import logging
 import traceback
 import platform
 import subprocess
 from pathlib import Path
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any, List
+from contextlib import asynccontextmanager
+from typing import Optional, Dict, Any, List, Sequence
 
 import numpy as np
 import pandas as pd
@@ -43,6 +50,24 @@ import uvicorn
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 
+from analytics import (  # noqa: F401
+    analyze_window,
+    anomalies_from_window,
+    compute_standby_wh,
+    detect_anomalies,
+    prepare_window,
+    prepare_windows,
+    robust_zscore,
+    standby_wh_from_window,
+    WindowArrays,
+)
+from columnar import after_watermark, build_select, copy_frame
+from local_store import LocalStore, concat_frames
+from model_snapshot import ModelSnapshot, load_snapshot, source_signature
+from profile_model import ProfileModel
+from result_cache import ResultCache
+from rolling import RollingStore
+
 
 # -----------------------
 # 0) 로깅 설정
@@ -197,6 +222,13 @@ logger.info(f"✅ DATABASE_URL detected: {mask_db_url(DATABASE_URL)}")
 
 DEFAULT_VOLTAGE = float(os.getenv("DEFAULT_VOLTAGE", "220"))
 logger.info(f"✅ DEFAULT_VOLTAGE = {DEFAULT_VOLTAGE}")
+REPORT_Z_THRESHOLD = 3.0
+
+# 분석 결과 캐시 (AI_CACHE_TTL_SEC=0 이면 끔)
+AI_CACHE_TTL_SEC = float(os.getenv("AI_CACHE_TTL_SEC", "30"))
+AI_CACHE_MAX_ENTRIES = int(os.getenv("AI_CACHE_MAX_ENTRIES", "512"))
+result_cache = ResultCache(max_entries=AI_CACHE_MAX_ENTRIES, ttl_sec=AI_CACHE_TTL_SEC)
+logger.info(f"✅ result cache ttl={AI_CACHE_TTL_SEC}s max_entries={AI_CACHE_MAX_ENTRIES}")
 
 
 # -----------------------
@@ -216,51 +248,68 @@ logger.info(f"📄 profiles.json exists?   {PROFILE_PATH.exists()} -> {PROFILE_P
 
 
 class ModelStore:
+    """
+    현재 모델 스냅샷(model_snapshot.ModelSnapshot) 보관
+    load()는 새 스냅샷을 완전히 만든 뒤 참조만 교체 → 리로드 중에도 빈 모델이 보이지 않음
+    """
+
     def __init__(self):
-        self.thresholds: Dict[str, Dict[str, Any]] = {}
-        self.baselines: Dict[str, Dict[str, Any]] = {}
-        self.profiles: Dict[str, Dict[str, Any]] = {}
+        self.snapshot = ModelSnapshot.empty()
 
-    def load(self):
-        logger.info("🔁 Loading models...")
-        self.thresholds = {}
-        self.baselines = {}
-        self.profiles = {}
+    @property
+    def version(self) -> str:
+        return self.snapshot.version
 
-        if THR_PATH.exists():
-            self.thresholds = json.loads(THR_PATH.read_text(encoding="utf-8"))
-            logger.info(f"✅ thresholds loaded: {len(self.thresholds)} devices")
-        else:
-            logger.warning("⚠️ thresholds.json not found. fallback threshold will be used.")
+    @property
+    def profile_model(self) -> ProfileModel:
+        return self.snapshot.profile_model
 
-        if BASELINE_PATH.exists():
-            self.baselines = json.loads(BASELINE_PATH.read_text(encoding="utf-8"))
-            logger.info(f"✅ baselines loaded: {len(self.baselines)} devices")
-        else:
-            logger.warning("⚠️ baselines.json not found. anomaly detection will return empty.")
+    def load(self) -> ModelSnapshot:
+        logger.info("🔁 Loading models...")
+        self.snapshot = load_snapshot(MODELS_DIR)
+        return self.snapshot
 
-        if PROFILE_PATH.exists():
-            self.profiles = json.loads(PROFILE_PATH.read_text(encoding="utf-8"))
-            logger.info(f"✅ profiles loaded: {len(self.profiles)} devices")
-        else:
-            logger.warning("⚠️ profiles.json not found. smart auto control unavailable.")
+    async def load_async(self) -> ModelSnapshot:
+        """JSON 파싱은 스레드에서, 교체는 이벤트 루프에서"""
+        logger.info("🔁 Loading models...")
+        snap = await asyncio.to_thread(load_snapshot, MODELS_DIR)
+        self.snapshot = snap
+        return snap
+
+    def changed_on_disk(self) -> bool:
+        return not np.array_equal(source_signature(MODELS_DIR), self.snapshot.signature)
 
     def get_threshold(self, mac: str, fallback: float = 0.05) -> float:
-        item = self.thresholds.get(mac)
-        if not item:
-            return fallback
-        return float(item.get("standby_load_threshold_amp", fallback))
+        return self.snapshot.get_threshold(mac, fallback)
 
     def get_baseline(self, mac: str) -> Optional[Dict[str, Any]]:
-        return self.baselines.get(mac)
-
-    def get_profile(self, mac: str) -> Optional[Dict[str, Any]]:
-        return self.profiles.get(mac)
+        return self.snapshot.get_baseline(mac)
 
 
 store = ModelStore()
 store.load()
 
+# 디바이스별 슬라이딩 윈도우 (AI_ROLLING_HOURS=0 이면 끔 → 항상 DB 조회)
+AI_ROLLING_HOURS = int(os.getenv("AI_ROLLING_HOURS", "24"))
+AI_ROLLING_POLL_SEC = float(os.getenv("AI_ROLLING_POLL_SEC", "5"))
+rolling = RollingStore(
+    retention_hours=AI_ROLLING_HOURS,
+    z_thr=REPORT_Z_THRESHOLD,
+    get_threshold=store.get_threshold,
+    get_baseline=store.get_baseline,
+    max_lag_sec=max(30.0, 3 * AI_ROLLING_POLL_SEC),
+)
+logger.info(f"✅ rolling window hours={AI_ROLLING_HOURS} poll={AI_ROLLING_POLL_SEC}s")
+
+# 로컬 분석 캐시 (local_store.py 로 동기화, 없거나 기간을 못 덮으면 DB 조회)
+AI_LOCAL_STORE = os.getenv("AI_LOCAL_STORE", "1") == "1"
+AI_DATA_DIR = Path(os.getenv("AI_DATA_DIR", str(BASE_DIR / "data")))
+local_store = LocalStore(AI_DATA_DIR) if AI_LOCAL_STORE else None
+logger.info(f"✅ local store enabled={AI_LOCAL_STORE} dir={AI_DATA_DIR} ready={bool(local_store and local_store.ready)}")
+
+# 모델 파일 변경 감시 주기 (0 이면 끔 → /models/reload 로만 갱신)
+AI_MODEL_WATCH_SEC = float(os.getenv("AI_MODEL_WATCH_SEC", "10"))
+
 
 # -----------------------
 # 3) DB 세션(독립 서버에서만 씀)
@@ -274,6 +323,9 @@ engine = create_async_engine(
 SessionLocal = async_sessionmaker(engine, expire_on_commit=False)
 logger.info("✅ Engine created.")
 
+# 분석에 필요한 컬럼만 (columnar 로더로 조회)
+WINDOW_COLUMNS = ["device_mac", "relay_status", "energy_amp", "timestamp"]
+
 
 async def fetch_recent_point(device_mac: str) -> Optional[Dict[str, Any]]:
     sql = """
@@ -299,28 +351,184 @@ async def fetch_recent_point(device_mac: str) -> Optional[Dict[str, Any]]:
         raise
 
 
+async def fetch_local_with_tail(
+    start_ts: datetime,
+    columns: List[str],
+    device_mac: Optional[str] = None,
+) -> Optional[pd.DataFrame]:
+    """
+    로컬 캐시가 start_ts 를 덮으면: 캐시(워터마크까지) + DB의 워터마크 이후 행
+    덮지 못하면 None → 호출 측에서 DB 전체 조회
+    (timestamp 정렬은 보장하지 않음, prepare_window(s) 가 필요할 때 정렬)
+    """
+    if local_store is None:
+        return None
+    t0 = time.perf_counter()
+    macs = [device_mac] if device_mac else None
+    local_df, watermark, pending_ids = await asyncio.to_thread(local_store.read_covering, start_ts, columns, macs)
+    if local_df is None:
+        return None
+
+    # 워터마크 이후 + 로컬 동기화 때 아직 커밋 안 돼서 빠진 id
+    where, args = after_watermark(watermark, pending_ids)
+    where += f' AND "timestamp" >= ${len(args) + 1}'
+    args.append(start_ts)
+    if device_mac:
+        where += f" AND device_mac = ${len(args) + 1}"
+        args.append(device_mac)
+    async with engine.connect() as conn:
+        tail = await copy_frame(conn, build_select(columns, where=where, order_by=""), args, columns)
+
+    ms = (time.perf_counter() - t0) * 1000
+    logger.debug(f"[LOCAL] mac={device_mac} local_rows={len(local_df)} db_tail_rows={len(tail)} watermark_id={watermark} ({ms:.1f}ms)")
+    return concat_frames([local_df, tail])
+
+
 async def fetch_window(device_mac: str, hours: int = 24) -> pd.DataFrame:
     start_ts = datetime.now() - timedelta(hours=hours)
+    local = await fetch_local_with_tail(start_ts, WINDOW_COLUMNS, device_mac)
+    if local is not None:
+        return local
+
+    sql = build_select(WINDOW_COLUMNS, where='device_mac = $1 AND "timestamp" >= $2')
+    t0 = time.perf_counter()
+    logger.debug(f"[DB] fetch_window mac={device_mac} hours={hours} start_ts={start_ts.isoformat()}")
+
+    try:
+        # COPY → 타입 지정 컬럼으로 바로 디코딩 (Row 객체 생성 없음)
+        async with engine.connect() as conn:
+            df = await copy_frame(conn, sql, [device_mac, start_ts], WINDOW_COLUMNS)
+        ms = (time.perf_counter() - t0) * 1000
+        logger.debug(f"[DB] fetch_window done ({ms:.1f}ms) rows={len(df)}")
+        return df
+    except Exception as e:
+        logger.error(f"[DB] fetch_window error: {e}")
+        logger.error(traceback.format_exc())
+        raise
+
+
+async def fetch_fleet_window(hours: int = 24) -> pd.DataFrame:
+    """전체 디바이스의 최근 hours 시간 데이터를 쿼리 1번으로 조회"""
+    start_ts = datetime.now() - timedelta(hours=hours)
+    local = await fetch_local_with_tail(start_ts, WINDOW_COLUMNS)
+    if local is not None:
+        return local
+
+    sql = build_select(WINDOW_COLUMNS, where='"timestamp" >= $1', order_by='device_mac, "timestamp" ASC')
+    t0 = time.perf_counter()
+    logger.debug(f"[DB] fetch_fleet_window hours={hours} start_ts={start_ts.isoformat()}")
+
+    try:
+        async with engine.connect() as conn:
+            df = await copy_frame(conn, sql, [start_ts], WINDOW_COLUMNS)
+        ms = (time.perf_counter() - t0) * 1000
+        logger.debug(f"[DB] fetch_fleet_window done ({ms:.1f}ms) rows={len(df)}")
+        return df
+    except Exception as e:
+        logger.error(f"[DB] fetch_fleet_window error: {e}")
+        logger.error(traceback.format_exc())
+        raise
+
+
+async def fetch_rows_for_rolling(
+    after_id: int,
+    pending_ids: Sequence[int] = (),
+    start_ts: Optional[datetime] = None,
+) -> pd.DataFrame:
+    """슬라이딩 윈도우용: 처음엔 start_ts 이후 전체, 이후엔 id 워터마크 다음 행 + 아직 못 본 pending_ids"""
+    columns = ["id"] + WINDOW_COLUMNS
+    if start_ts is not None:
+        local = await fetch_local_with_tail(start_ts, columns)
+        if local is not None:
+            return local
+        sql = build_select(columns, where='"timestamp" >= $1', order_by="id ASC")
+        args = [start_ts]
+    else:
+        where, args = after_watermark(after_id, pending_ids)
+        sql = build_select(columns, where=where, order_by="id ASC")
+
+    async with engine.connect() as conn:
+        return await copy_frame(conn, sql, args, columns)
+
+
+async def sync_rolling() -> int:
+    """슬라이딩 윈도우를 DB와 맞춤. 반환: 반영한 행 수"""
+    t0 = time.perf_counter()
+    if not rolling.ready:
+        start_ts = datetime.now() - timedelta(hours=rolling.retention_hours)
+        df = await fetch_rows_for_rolling(0, start_ts=start_ts)
+        n = rolling.ingest(df)
+        rolling.ready = True
+        logger.info(
+            f"[ROLLING] bootstrap rows={n} devices={len(rolling.devices)} "
+            f"watermark_id={rolling.watermark_id} ({(time.perf_counter() - t0) * 1000:.1f}ms)"
+        )
+        return n
+
+    df = await fetch_rows_for_rolling(rolling.watermark_id, rolling.pending_ids)
+    n = rolling.ingest(df)
+    if n:
+        logger.debug(f"[ROLLING] +{n} rows watermark_id={rolling.watermark_id} ({(time.perf_counter() - t0) * 1000:.1f}ms)")
+    return n
+
+
+async def rolling_sync_loop():
+    while True:
+        try:
+            await sync_rolling()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"[ROLLING] sync error: {e}")
+            logger.error(traceback.format_exc())
+        await asyncio.sleep(AI_ROLLING_POLL_SEC)
+
+
+async def reload_models_and_state() -> ModelSnapshot:
+    """모델 스냅샷 교체 + 모델에 의존하는 상태(결과 캐시, 슬라이딩 윈도우 누적합) 갱신"""
+    snap = await store.load_async()
+    result_cache.clear()
+    rolling.rebuild()
+    return snap
+
+
+async def model_watch_loop():
+    """models/ JSON 파일의 (mtime, size)가 바뀌면 자동 리로드"""
+    while True:
+        await asyncio.sleep(AI_MODEL_WATCH_SEC)
+        try:
+            if store.changed_on_disk():
+                logger.info("[MODELS] change detected on disk -> reload")
+                await reload_models_and_state()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # 학습 스크립트가 파일을 쓰는 중이면 실패할 수 있음 → 다음 주기에 재시도
+            logger.error(f"[MODELS] reload failed: {e}")
+
+
+async def fetch_latest_points(limit: int = 200) -> List[Dict[str, Any]]:
+    """디바이스별 최신 레코드 1건씩 (DISTINCT ON)"""
     sql = """
-    SELECT device_mac, device_name, relay_status, energy_amp, temperature, humidity, "timestamp"
+    SELECT DISTINCT ON (device_mac)
+        device_mac, device_name, relay_status, energy_amp, temperature, humidity, "timestamp"
     FROM public.devices
-    WHERE device_mac = :mac AND "timestamp" >= :start_ts
-    ORDER BY "timestamp" ASC
+    ORDER BY device_mac, "timestamp" DESC
+    LIMIT :limit
     """
-    params = {"mac": device_mac, "start_ts": start_ts}
+    params = {"limit": limit}
     t0 = time.perf_counter()
-    logger.debug(f"[DB] fetch_window mac={device_mac} hours={hours} start_ts={start_ts.isoformat()}")
+    logger.debug(f"[DB] fetch_latest_points limit={limit}")
 
     try:
         async with SessionLocal() as session:
             res = await session.execute(text(sql), params)
-            rows = res.fetchall()
-            cols = res.keys()
+            rows = res.mappings().all()
         ms = (time.perf_counter() - t0) * 1000
-        logger.debug(f"[DB] fetch_window done ({ms:.1f}ms) rows={len(rows)}")
-        return pd.DataFrame(rows, columns=cols)
+        logger.debug(f"[DB] fetch_latest_points done ({ms:.1f}ms) rows={len(rows)}")
+        return [dict(r) for r in rows]
     except Exception as e:
-        logger.error(f"[DB] fetch_window error: {e}")
+        logger.error(f"[DB] fetch_latest_points error: {e}")
         logger.error(traceback.format_exc())
         raise
 
@@ -361,82 +569,24 @@ def classify_state(relay_status: str, amp: float, thr: float) -> str:
     return "STANDBY" if amp < thr else "LOAD"
 
 
-def robust_zscore(x: float, median: float, mad: float) -> float:
-    denom = (1.4826 * mad) if mad and mad > 1e-12 else 1e-12
-    return (x - median) / denom
-
-
-def detect_anomalies(df: pd.DataFrame, baseline: Optional[Dict[str, Any]], z_thr: float = 6.0):
-    logger.debug(f"[AI] detect_anomalies start df_rows={len(df)} baseline={'yes' if baseline else 'no'} z_thr={z_thr}")
-    if df.empty or not baseline:
-        return []
-
-    med = float(baseline.get("amp_median", 0.0))
-    mad = float(baseline.get("amp_mad", 0.0))
-
-    d = df.copy()
-    d["timestamp"] = pd.to_datetime(d["timestamp"], errors="coerce")
-    d["relay_status"] = d["relay_status"].astype(str).str.lower()
-    d["energy_amp"] = pd.to_numeric(d["energy_amp"], errors="coerce").fillna(0.0)
-    d = d.dropna(subset=["timestamp"])
-
-    # on일 때만 검사
-    d = d[d["relay_status"] == "on"]
-
-    out = []
-    for _, r in d.iterrows():
-        amp = float(r["energy_amp"])
-        z = robust_zscore(amp, med, mad)
-        if abs(z) >= z_thr:
-            out.append(
-                {
-                    "timestamp": r["timestamp"].isoformat(),
-                    "energy_amp": amp,
-                    "z": float(z),
-                    "reason": f"amp_outlier_robust_z>={z_thr}",
-                }
-            )
-
-    logger.debug(f"[AI] detect_anomalies done anomalies={len(out)} (median={med}, mad={mad})")
-    return out
-
-
-def compute_standby_wh(df: pd.DataFrame, thr: float, voltage: float = DEFAULT_VOLTAGE) -> float:
-    logger.debug(f"[AI] compute_standby_wh start df_rows={len(df)} thr={thr} voltage={voltage}")
-    if df.empty:
-        return 0.0
-
-    d = df.copy()
-    d["timestamp"] = pd.to_datetime(d["timestamp"], errors="coerce")
-    d = d.dropna(subset=["timestamp"]).sort_values("timestamp")
-
-    d["relay_status"] = d["relay_status"].astype(str).str.lower()
-    d["energy_amp"] = pd.to_numeric(d["energy_amp"], errors="coerce").fillna(0.0)
-
-    d["state"] = np.where(
-        d["relay_status"] != "on",
-        "IDLE",
-        np.where(d["energy_amp"] < thr, "STANDBY", "LOAD"),
-    )
-
-    dt = (d["timestamp"].shift(-1) - d["timestamp"]).dt.total_seconds().fillna(0).to_numpy()
-    amps = d["energy_amp"].to_numpy()
-    is_standby = (d["state"].to_numpy() == "STANDBY").astype(np.float64)
-
-    wh = float(np.sum((voltage * amps) * (dt / 3600.0) * is_standby))
-    if not math.isfinite(wh):
-        logger.warning("[AI] compute_standby_wh got non-finite wh -> returning 0")
-        return 0.0
-
-    wh = max(0.0, wh)
-    logger.debug(f"[AI] compute_standby_wh done standby_wh={wh:.4f}")
-    return wh
-
-
 # -----------------------
 # 5) FastAPI (이 파일만 실행)
 # -----------------------
-app = FastAPI(title="IoTCOSS AI API (standalone)", version="0.1.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    tasks = []
+    if rolling.enabled:
+        tasks.append(asyncio.create_task(rolling_sync_loop()))
+    if AI_MODEL_WATCH_SEC > 0:
+        tasks.append(asyncio.create_task(model_watch_loop()))
+    yield
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await engine.dispose()
+
+
+app = FastAPI(title="IoTCOSS AI API (standalone)", version="0.1.0", lifespan=lifespan)
 
 
 @app.middleware("http")
@@ -462,8 +612,14 @@ async def health():
         "ok": True,
         "env_path": str(ENV_PATH) if ENV_PATH else None,
         "models_dir": str(MODELS_DIR),
-        "thresholds_loaded": len(store.thresholds),
-        "baselines_loaded": len(store.baselines),
+        "thresholds_loaded": store.snapshot.thresholds_loaded,
+        "baselines_loaded": store.snapshot.baselines_loaded,
+        "profiles_loaded": len(store.profile_model),
+        "model_version": store.version,
+        "model_source": store.snapshot.source,
+        "cache": result_cache.stats(),
+        "rolling": rolling.stats(),
+        "local_store": local_store.stats() if local_store else None,
         "host": AI_HOST,
         "port": AI_PORT,
     }
@@ -472,8 +628,13 @@ async def health():
 @app.post("/models/reload")
 async def reload_models():
     logger.debug("[API] /models/reload")
-    store.load()
-    return {"ok": True, "thresholds_loaded": len(store.thresholds), "baselines_loaded": len(store.baselines)}
+    snap = await reload_models_and_state()
+    return {
+        "ok": True,
+        "version": snap.version,
+        "thresholds_loaded": snap.thresholds_loaded,
+        "baselines_loaded": snap.baselines_loaded,
+    }
 
 
 @app.get("/devices")
@@ -483,13 +644,13 @@ async def list_devices(limit: int = Query(200, ge=1, le=2000)):
     return {"items": items, "limit": limit}
 
 
-@app.get("/devices/{device_mac}/state")
-async def get_state(device_mac: str):
-    logger.debug(f"[API] /devices/{device_mac}/state")
-    row = await fetch_recent_point(device_mac)
-    if not row:
-        raise HTTPException(status_code=404, detail="device_mac 데이터 없음 (public.devices)")
+def cache_key(endpoint: str, device_mac: Optional[str], params: tuple, watermark: Any) -> tuple:
+    """결과 캐시 키: 새 레코드(워터마크)나 모델 교체(버전)가 있으면 달라짐"""
+    return (endpoint, device_mac, params, str(watermark), store.version)
 
+
+def build_state(device_mac: str, row: Dict[str, Any]) -> Dict[str, Any]:
+    """최신 레코드 1건 → 현재 상태 응답"""
     thr = store.get_threshold(device_mac)
     amp = float(row.get("energy_amp") or 0.0)
     rs = str(row.get("relay_status") or "").lower()
@@ -508,6 +669,27 @@ async def get_state(device_mac: str):
     }
 
 
+def build_summary(hours: int, standby_wh: float, anomaly_count: int, state: str) -> str:
+    summary = (
+        f"최근 {hours}시간 기준 standby 추정 {standby_wh:.2f}Wh, "
+        f"이상치 {anomaly_count}건, 현재 상태 {state}."
+    )
+    if standby_wh >= 50:
+        summary += " standby 낭비가 큰 편이라 미사용 시 차단을 권장."
+    if anomaly_count >= 3:
+        summary += " 이상치가 반복되어 센서/부하/릴레이 점검 권장."
+    return summary
+
+
+@app.get("/devices/{device_mac}/state")
+async def get_state(device_mac: str):
+    logger.debug(f"[API] /devices/{device_mac}/state")
+    row = await fetch_recent_point(device_mac)
+    if not row:
+        raise HTTPException(status_code=404, detail="device_mac 데이터 없음 (public.devices)")
+    return build_state(device_mac, row)
+
+
 @app.get("/devices/{device_mac}/anomalies")
 async def get_anomalies(
     device_mac: str,
@@ -515,17 +697,37 @@ async def get_anomalies(
     z_thr: float = Query(3.0, ge=2.0, le=20.0),
 ):
     logger.debug(f"[API] /devices/{device_mac}/anomalies hours={hours} z_thr={z_thr}")
+    if rolling.covers(hours):
+        # 메모리 슬라이딩 윈도우에서 바로 응답 (DB 조회 없음)
+        items = rolling.anomalies(device_mac, datetime.now() - timedelta(hours=hours), z_thr)
+        return {
+            "device_mac": device_mac,
+            "hours": hours,
+            "z_threshold": z_thr,
+            "count": len(items),
+            "items": items,
+        }
+
+    row = await fetch_recent_point(device_mac)
+    key = cache_key("anomalies", device_mac, (hours, z_thr), row and row.get("timestamp"))
+    cached = result_cache.get(key)
+    if cached is not None:
+        return cached
+
     df = await fetch_window(device_mac, hours=hours)
     baseline = store.get_baseline(device_mac)
     items = detect_anomalies(df, baseline, z_thr=z_thr)
+    logger.debug(f"[AI] detect_anomalies done rows={len(df)} anomalies={len(items)} baseline={'yes' if baseline else 'no'}")
 
-    return {
+    resp = {
         "device_mac": device_mac,
         "hours": hours,
         "z_threshold": z_thr,
         "count": len(items),
         "items": items,
     }
+    result_cache.put(key, resp)
+    return resp
 
 
 @app.get("/devices/{device_mac}/waste")
@@ -535,39 +737,68 @@ async def get_waste(
     voltage: float = Query(DEFAULT_VOLTAGE, ge=100, le=260),
 ):
     logger.debug(f"[API] /devices/{device_mac}/waste hours={hours} voltage={voltage}")
+    if rolling.covers(hours):
+        # 누적합 차이로 O(log n) 계산 (DB 조회 없음)
+        return {
+            "device_mac": device_mac,
+            "hours": hours,
+            "voltage": float(voltage),
+            "standby_wh": rolling.standby_wh(device_mac, datetime.now() - timedelta(hours=hours), voltage),
+        }
+
+    row = await fetch_recent_point(device_mac)
+    key = cache_key("waste", device_mac, (hours, voltage), row and row.get("timestamp"))
+    cached = result_cache.get(key)
+    if cached is not None:
+        return cached
+
     df = await fetch_window(device_mac, hours=hours)
     thr = store.get_threshold(device_mac)
     standby_wh = compute_standby_wh(df, thr, voltage=voltage)
+    logger.debug(f"[AI] compute_standby_wh done rows={len(df)} thr={thr} standby_wh={standby_wh:.4f}")
 
-    return {
+    resp = {
         "device_mac": device_mac,
         "hours": hours,
         "voltage": float(voltage),
         "standby_wh": float(standby_wh),
     }
+    result_cache.put(key, resp)
+    return resp
 
 
-@app.get("/devices/{device_mac}/report")
-async def get_report(
+def build_report(
     device_mac: str,
-    hours: int = Query(24, ge=1, le=168),
-    voltage: float = Query(DEFAULT_VOLTAGE, ge=100, le=260),
-):
-    logger.debug(f"[API] /devices/{device_mac}/report hours={hours} voltage={voltage}")
-    state_now = await get_state(device_mac)
-    anomalies = await get_anomalies(device_mac, hours=hours, z_thr=3.0)
-    waste = await get_waste(device_mac, hours=hours, voltage=voltage)
-
-    summary = (
-        f"최근 {hours}시간 기준 standby 추정 {waste['standby_wh']:.2f}Wh, "
-        f"이상치 {anomalies['count']}건, 현재 상태 {state_now['state']}."
+    row: Dict[str, Any],
+    window: WindowArrays,
+    hours: int,
+    voltage: float,
+    z_thr: float,
+) -> Dict[str, Any]:
+    """최신 레코드 + 정규화된 윈도우 → 리포트 (단건/일괄 공용)"""
+    state_now = build_state(device_mac, row)
+    result = analyze_window(
+        window,
+        thr=state_now["threshold_amp"],
+        baseline=store.get_baseline(device_mac),
+        z_thr=z_thr,
+        voltage=voltage,
     )
-    if waste["standby_wh"] >= 50:
-        summary += " standby 낭비가 큰 편이라 미사용 시 차단을 권장."
-    if anomalies["count"] >= 3:
-        summary += " 이상치가 반복되어 센서/부하/릴레이 점검 권장."
 
-    logger.info(f"[REPORT] mac={device_mac} -> {summary}")
+    anomalies = {
+        "device_mac": device_mac,
+        "hours": hours,
+        "z_threshold": z_thr,
+        "count": len(result["anomalies"]),
+        "items": result["anomalies"],
+    }
+    waste = {
+        "device_mac": device_mac,
+        "hours": hours,
+        "voltage": float(voltage),
+        "standby_wh": float(result["standby_wh"]),
+    }
+    summary = build_summary(hours, waste["standby_wh"], anomalies["count"], state_now["state"])
 
     return {
         "device_mac": device_mac,
@@ -579,6 +810,94 @@ async def get_report(
     }
 
 
+@app.get("/devices/{device_mac}/report")
+async def get_report(
+    device_mac: str,
+    hours: int = Query(24, ge=1, le=168),
+    voltage: float = Query(DEFAULT_VOLTAGE, ge=100, le=260),
+):
+    logger.debug(f"[API] /devices/{device_mac}/report hours={hours} voltage={voltage}")
+
+    # 최신 레코드(=워터마크)로 캐시 확인 후, miss일 때만 윈도우 조회
+    row = await fetch_recent_point(device_mac)
+    if not row:
+        raise HTTPException(status_code=404, detail="device_mac 데이터 없음 (public.devices)")
+
+    key = cache_key("report", device_mac, (hours, voltage), row.get("timestamp"))
+    cached = result_cache.get(key)
+    if cached is not None:
+        return cached
+
+    # 한 번 정규화한 배열로 상태/이상치/standby를 함께 계산 (가능하면 메모리 윈도우 사용)
+    window = None
+    if rolling.covers(hours):
+        window = rolling.window(device_mac, datetime.now() - timedelta(hours=hours))
+    if window is None:
+        window = prepare_window(await fetch_window(device_mac, hours=hours))
+    report = build_report(device_mac, row, window, hours, voltage, z_thr=REPORT_Z_THRESHOLD)
+
+    logger.info(f"[REPORT] mac={device_mac} rows={len(window)} -> {report['summary']}")
+    result_cache.put(key, report)
+    return report
+
+
+@app.get("/reports")
+async def get_reports(
+    hours: int = Query(24, ge=1, le=168),
+    voltage: float = Query(DEFAULT_VOLTAGE, ge=100, le=260),
+    limit: int = Query(200, ge=1, le=2000),
+    include_items: bool = Query(False, description="이상치 개별 항목 포함 여부"),
+):
+    """
+    전체 디바이스 리포트를 한 번에 반환
+    - 최신 레코드(DISTINCT ON) 1쿼리로 워터마크 확인 → miss면 전체 윈도우 1쿼리
+    - 윈도우는 한 번 정규화한 뒤 device_mac별 배열 슬라이스로 나눠 계산
+    """
+    logger.debug(f"[API] /reports hours={hours} voltage={voltage} limit={limit} include_items={include_items}")
+
+    latest = await fetch_latest_points(limit=limit)
+    # 어느 디바이스든 새 레코드가 들어오면 워터마크가 바뀜
+    watermark = hash(tuple((r["device_mac"], str(r.get("timestamp"))) for r in latest))
+    key = cache_key("reports", None, (hours, voltage, limit, include_items), watermark)
+    cached = result_cache.get(key)
+    if cached is not None:
+        return cached
+
+    empty = prepare_window(pd.DataFrame())
+    if rolling.covers(hours):
+        start_ts = datetime.now() - timedelta(hours=hours)
+        windows = {r["device_mac"]: rolling.window(r["device_mac"], start_ts) or empty for r in latest}
+    else:
+        windows = prepare_windows(await fetch_fleet_window(hours=hours))
+    rows = sum(len(w) for w in windows.values())
+
+    items = []
+    total_anomalies = 0
+    total_standby_wh = 0.0
+    for row in latest:
+        mac = row["device_mac"]
+        report = build_report(mac, row, windows.get(mac, empty), hours, voltage, z_thr=REPORT_Z_THRESHOLD)
+        if not include_items:
+            report["anomalies"].pop("items")
+        total_anomalies += report["anomalies"]["count"]
+        total_standby_wh += report["waste"]["standby_wh"]
+        items.append(report)
+
+    logger.info(f"[REPORTS] devices={len(items)} rows={rows} anomalies={total_anomalies} standby_wh={total_standby_wh:.2f}")
+
+    resp = {
+        "hours": hours,
+        "voltage": float(voltage),
+        "z_threshold": REPORT_Z_THRESHOLD,
+        "count": len(items),
+        "total_anomaly_count": total_anomalies,
+        "total_standby_wh": total_standby_wh,
+        "items": items,
+    }
+    result_cache.put(key, resp)
+    return resp
+
+
 @app.get("/devices/{device_mac}/auto-control-recommendation")
 async def get_auto_control_recommendation(device_mac: str):
     """
@@ -587,40 +906,11 @@ async def get_auto_control_recommendation(device_mac: str):
     - on_rate < 0.5: OFF (미사용 시간, 대기전력 차단)
     """
     logger.debug(f"[API] /devices/{device_mac}/auto-control-recommendation")
-    
-    profile = store.get_profile(device_mac)
-    if not profile or "on_rate" not in profile:
-        return {
-            "device_mac": device_mac,
-            "action": "OFF",
-            "reason": "프로파일 없음 (기본 OFF)",
-            "on_rate": 0.0
-        }
-    
-    now = datetime.now()
-    dow = now.weekday()  # 0=월요일
-    hour = now.hour
-    
-    on_rate = profile["on_rate"][dow][hour]
-    
-    # 0.5 기준으로 ON/OFF 결정
-    if on_rate >= 0.5:
-        action = "ON"
-        reason = f"사용률 {on_rate*100:.0f}% - 사용 예정 시간"
-    else:
-        action = "OFF"
-        reason = f"사용률 {on_rate*100:.0f}% - 미사용 시간 (대기전력 차단)"
-    
-    logger.info(f"[AUTO_CONTROL] {device_mac} -> {action} ({reason})")
-    
-    return {
-        "device_mac": device_mac,
-        "device_name": profile.get("device_name", "Unknown"),
-        "current_hour": hour,
-        "on_rate": round(on_rate, 2),
-        "action": action,
-        "reason": reason
-    }
+
+    # 판정 로직은 profile_model(백엔드와 공유)에 있음
+    rec = store.profile_model.recommend_all([device_mac])[0]
+    logger.info(f"[AUTO_CONTROL] {device_mac} -> {rec['action']} ({rec['reason']})")
+    return rec
 
 
 @app.get("/auto-control/recommendations")
@@ -628,17 +918,11 @@ async def get_all_auto_control_recommendations():
     """모든 디바이스에 대한 자동 제어 추천"""
     logger.debug("[API] /auto-control/recommendations")
     
-    if not store.profiles:
+    if not len(store.profile_model):
         return {"items": [], "total": 0}
     
-    recommendations = []
-    for device_mac in store.profiles.keys():
-        try:
-            rec = await get_auto_control_recommendation(device_mac)
-            recommendations.append(rec)
-        except Exception as e:
-            logger.warning(f"추천 생성 실패 {device_mac}: {e}")
-            continue
+    # 전체 디바이스를 배열 연산 한 번으로 판정
+    recommendations = store.profile_model.recommend_all()
     
     action_counts = {"ON": 0, "OFF": 0}
     for rec in recommendations:
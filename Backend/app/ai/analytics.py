@@ -0,0 +1,239 @@
+"""
+analytics.py
+- ai_server.py / 벤치마크 스크립트에서 공유하는 분석 함수 (DB 접근 없음)
+- 행 단위 루프 없이 NumPy 배열 연산으로 처리
+
+  robust z-score = (x - median) / (1.4826 * MAD)
+  상태: relay off → IDLE / on & amp < thr → STANDBY / on & amp >= thr → LOAD
+  standby Wh = Σ V × amp × (다음 샘플까지 초 / 3600)  (STANDBY 샘플만)
+
+리포트는 prepare_window()로 한 번만 정규화한 배열에서 analyze_window()로
+이상치/standby를 함께 계산합니다.
+"""
+
+import logging
+import math
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger("ai_server")
+
+
+def robust_zscore(x: float, median: float, mad: float) -> float:
+    denom = (1.4826 * mad) if mad and mad > 1e-12 else 1e-12
+    return (x - median) / denom
+
+
+def robust_denominator(mad: float) -> float:
+    return (1.4826 * mad) if mad and mad > 1e-12 else 1e-12
+
+
+def factorize(values: pd.Series) -> tuple[np.ndarray, pd.Index]:
+    """(코드 배열, 고유값). category 타입이면 이미 있는 코드를 그대로 사용."""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values.cat.codes.to_numpy(), values.cat.categories
+    return pd.factorize(values, use_na_sentinel=True)
+
+
+def relay_on_mask(relay_status: pd.Series) -> np.ndarray:
+    """relay_status == "on" (대소문자 무시) 마스크. 고유값만 소문자로 바꿔 비교."""
+    codes, uniques = factorize(relay_status)
+    on_codes = [i for i, u in enumerate(uniques) if str(u).lower() == "on"]
+    return np.isin(codes, on_codes)
+
+
+def _timestamps(values: pd.Series) -> np.ndarray:
+    # 이미 datetime64면 to_datetime(캐시용 unique 계산 포함)을 건너뜀
+    if isinstance(values.dtype, np.dtype) and values.dtype.kind == "M":
+        return values.to_numpy(dtype="datetime64[ns]")
+    return pd.to_datetime(values, errors="coerce").to_numpy(dtype="datetime64[ns]")
+
+
+def _records(ts: np.ndarray, amp: np.ndarray, z: np.ndarray, z_thr: float) -> List[Dict[str, Any]]:
+    """이상치 배열 → 응답 레코드"""
+    reason = f"amp_outlier_robust_z>={z_thr}"
+    ts_str = np.datetime_as_string(ts, unit="s")
+    # float32로 읽은 값도 DB 값과 같은 자릿수로 표시
+    amp = np.round(amp.astype(np.float64), 6)
+    return [
+        {"timestamp": t, "energy_amp": a, "z": zz, "reason": reason}
+        for t, a, zz in zip(ts_str.tolist(), amp.tolist(), z.tolist())
+    ]
+
+
+@dataclass(frozen=True)
+class WindowArrays:
+    """정규화된 한 디바이스의 윈도우 (timestamp 오름차순, timestamp 결측 제거)"""
+    ts: np.ndarray     # datetime64[ns]
+    amp: np.ndarray    # float64 (결측은 0.0)
+    is_on: np.ndarray  # bool (relay_status == "on")
+
+    def __len__(self) -> int:
+        return len(self.ts)
+
+
+def prepare_window(df: pd.DataFrame) -> WindowArrays:
+    """DataFrame → 타입이 정리된 배열 (to_datetime / to_numeric / 소문자 비교를 한 번만 수행)"""
+    if df.empty:
+        return WindowArrays(
+            ts=np.empty(0, dtype="datetime64[ns]"),
+            amp=np.empty(0, dtype=np.float64),
+            is_on=np.empty(0, dtype=bool),
+        )
+
+    ts = _timestamps(df["timestamp"])
+    amp = pd.to_numeric(df["energy_amp"], errors="coerce").fillna(0.0).to_numpy(dtype=np.float64)
+    is_on = relay_on_mask(df["relay_status"])
+
+    keep = ~np.isnat(ts)
+    if not keep.all():
+        ts, amp, is_on = ts[keep], amp[keep], is_on[keep]
+
+    # DB에서 timestamp 오름차순으로 오므로 보통은 정렬 생략
+    if len(ts) > 1 and (ts[1:] < ts[:-1]).any():
+        order = np.argsort(ts, kind="stable")
+        ts, amp, is_on = ts[order], amp[order], is_on[order]
+
+    return WindowArrays(ts=ts, amp=amp, is_on=is_on)
+
+
+def prepare_windows(df: pd.DataFrame) -> Dict[str, WindowArrays]:
+    """
+    여러 디바이스의 행이 섞인 DataFrame → device_mac별 WindowArrays
+    정규화는 전체에 대해 한 번만 하고, 디바이스별로는 배열 슬라이스만 만듦
+    """
+    if df.empty:
+        return {}
+
+    codes, macs = factorize(df["device_mac"])
+    ts = _timestamps(df["timestamp"])
+    amp = pd.to_numeric(df["energy_amp"], errors="coerce").fillna(0.0).to_numpy(dtype=np.float64)
+    is_on = relay_on_mask(df["relay_status"])
+
+    keep = (codes >= 0) & ~np.isnat(ts)
+    # (디바이스, timestamp) 순으로 정렬 → 디바이스별 연속 구간
+    order = np.flatnonzero(keep)
+    order = order[np.lexsort((ts[order], codes[order]))]
+    codes, ts, amp, is_on = codes[order], ts[order], amp[order], is_on[order]
+
+    groups, starts = np.unique(codes, return_index=True)
+    bounds = list(starts[1:]) + [len(codes)]
+    return {
+        str(macs[code]): WindowArrays(ts=ts[lo:hi], amp=amp[lo:hi], is_on=is_on[lo:hi])
+        for code, lo, hi in zip(groups.tolist(), starts.tolist(), bounds)
+    }
+
+
+def _anomaly_mask(w: WindowArrays, baseline: Optional[Dict[str, Any]], z_thr: float) -> tuple[np.ndarray, np.ndarray]:
+    if not baseline or len(w) == 0:
+        return np.zeros(len(w), dtype=bool), np.zeros(len(w))
+    med = float(baseline.get("amp_median", 0.0))
+    mad = float(baseline.get("amp_mad", 0.0))
+    z = (w.amp - med) / robust_denominator(mad)
+    # on일 때만 검사
+    return w.is_on & (np.abs(z) >= z_thr), z
+
+
+def anomalies_from_window(w: WindowArrays, baseline: Optional[Dict[str, Any]], z_thr: float = 6.0) -> List[Dict[str, Any]]:
+    hit, z = _anomaly_mask(w, baseline, z_thr)
+    return _records(w.ts[hit], w.amp[hit], z[hit], z_thr)
+
+
+def standby_wh_from_window(w: WindowArrays, thr: float, voltage: float) -> float:
+    if len(w) == 0:
+        return 0.0
+
+    # 각 샘플이 다음 샘플까지 유지된다고 보고 적분 (마지막 샘플은 0초)
+    dt = np.zeros(len(w), dtype=np.float64)
+    dt[:-1] = np.diff(w.ts).astype("timedelta64[ns]").astype(np.int64) / 1e9
+    standby = w.is_on & (w.amp < thr)
+
+    wh = float(np.sum(voltage * w.amp[standby] * (dt[standby] / 3600.0)))
+    if not math.isfinite(wh):
+        logger.warning("[AI] standby wh non-finite -> returning 0")
+        return 0.0
+    return max(0.0, wh)
+
+
+def analyze_window(
+    w: WindowArrays,
+    thr: float,
+    baseline: Optional[Dict[str, Any]],
+    z_thr: float,
+    voltage: float,
+) -> Dict[str, Any]:
+    """한 번 정규화한 윈도우에서 이상치 + standby Wh를 함께 계산"""
+    return {
+        "anomalies": anomalies_from_window(w, baseline, z_thr=z_thr),
+        "standby_wh": standby_wh_from_window(w, thr, voltage),
+    }
+
+
+def detect_anomalies(df: pd.DataFrame, baseline: Optional[Dict[str, Any]], z_thr: float = 6.0) -> List[Dict[str, Any]]:
+    """릴레이 on 구간에서 |robust z| >= z_thr 인 샘플을 이상치로 반환"""
+    if df.empty or not baseline:
+        return []
+    return anomalies_from_window(prepare_window(df), baseline, z_thr=z_thr)
+
+
+def compute_standby_wh(df: pd.DataFrame, thr: float, voltage: float = 220.0) -> float:
+    """STANDBY 상태로 소비한 전력량(Wh) 추정"""
+    return standby_wh_from_window(prepare_window(df), thr, voltage)
+
+
+def detect_anomalies_batch(
+    df: pd.DataFrame,
+    baselines: Dict[str, Dict[str, Any]],
+    z_thr: float = 6.0,
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    여러 디바이스의 행이 섞인 DataFrame을 한 번에 검사 (결과는 디바이스별 detect_anomalies와 같음)
+    반환: baseline이 있는 device_mac → 이상치 목록 (이상치가 없으면 빈 목록)
+
+    전체 행에는 amp 숫자 비교만 하고, 문자열 열(device_mac / relay_status)은
+    어느 디바이스 기준으로든 이상치가 될 수 있는 후보 행에서만 읽음
+    """
+    known = {str(mac): base for mac, base in baselines.items() if base}
+    out: Dict[str, List[Dict[str, Any]]] = {mac: [] for mac in known}
+    if df.empty or not known:
+        return out
+
+    macs = list(known)
+    med = np.array([float(known[m].get("amp_median", 0.0)) for m in macs])
+    denom = np.array([robust_denominator(float(known[m].get("amp_mad", 0.0))) for m in macs])
+
+    # |amp - med| >= z_thr * denom 을 만족할 수 있는 행만 후보 (경계 반올림 여유를 두고 아래에서 z로 다시 판정)
+    amp = pd.to_numeric(df["energy_amp"], errors="coerce").fillna(0.0).to_numpy(dtype=np.float64)
+    slack = 1e-9 * (np.abs(med).max() + z_thr * denom.max() + 1.0)
+    lo = (med - z_thr * denom).max() + slack
+    hi = (med + z_thr * denom).min() - slack
+    cand = np.flatnonzero((amp <= lo) | (amp >= hi))
+    if len(cand) == 0:
+        return out
+
+    sub = df.iloc[cand]
+    codes, uniques = factorize(sub["device_mac"])
+    index = {m: i for i, m in enumerate(macs)}
+    to_known = np.array([index.get(str(u), -1) for u in uniques] + [-1])
+    dev = to_known[codes]  # 결측 코드(-1)는 마지막 -1로 매핑
+    ts = _timestamps(sub["timestamp"])
+    amp = amp[cand]
+
+    ok = (dev >= 0) & ~np.isnat(ts) & relay_on_mask(sub["relay_status"])
+    safe = np.where(ok, dev, 0)
+    z = (amp - med[safe]) / denom[safe]
+    hit = np.flatnonzero(ok & (np.abs(z) >= z_thr))
+    if len(hit) == 0:
+        return out
+
+    # 디바이스별로 묶고 그 안에서는 detect_anomalies처럼 timestamp 오름차순
+    order = hit[np.lexsort((ts[hit], dev[hit]))]
+    groups, starts = np.unique(dev[order], return_index=True)
+    bounds = list(starts[1:]) + [len(order)]
+    for d, s, e in zip(groups.tolist(), starts.tolist(), bounds):
+        sel = order[s:e]
+        out[macs[d]] = _records(ts[sel], amp[sel], z[sel], z_thr)
+    return out
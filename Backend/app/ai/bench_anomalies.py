@@ -0,0 +1,112 @@
+"""
+bench_anomalies.py
+- detect_anomalies(배열 연산) 디바이스당 지연시간 측정 (DB 불필요, 합성 데이터)
+- 3초 샘플링 기준 1일/7일/30일 윈도우, 단일 디바이스와 다중 디바이스 배치를 비교
+- 배치 결과는 디바이스별 detect_anomalies 결과와 같은지 확인
+- --legacy 를 주면 기존 iterrows 구현과 결과/속도를 함께 비교 (30일은 오래 걸림)
+
+실행 예시)
+  cd Backend/app/ai
+  python bench_anomalies.py
+  python bench_anomalies.py --devices 20 --legacy
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from analytics import detect_anomalies, detect_anomalies_batch, robust_zscore
+
+SAMPLE_SEC = 3
+BASELINE = {"amp_median": 0.5, "amp_mad": 0.05}
+
+
+def make_device_frame(mac: str, days: int, seed: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    n = days * 24 * 3600 // SAMPLE_SEC
+    ts = pd.date_range("2026-01-01", periods=n, freq=f"{SAMPLE_SEC}s")
+    amp = rng.normal(0.5, 0.07, n)
+    spikes = rng.random(n) < 0.001
+    amp[spikes] += rng.uniform(1.0, 3.0, spikes.sum())
+    relay = np.where(rng.random(n) < 0.8, "on", "off")
+    return pd.DataFrame({
+        "device_mac": mac,
+        "device_name": "bench",
+        "relay_status": relay,
+        "energy_amp": amp,
+        "temperature": 24.0,
+        "humidity": 40.0,
+        "timestamp": ts,
+    })
+
+
+def legacy_detect_anomalies(df: pd.DataFrame, baseline, z_thr: float = 6.0):
+    """변경 전 구현 (행 단위 iterrows)"""
+    med = float(baseline.get("amp_median", 0.0))
+    mad = float(baseline.get("amp_mad", 0.0))
+    d = df.copy()
+    d["timestamp"] = pd.to_datetime(d["timestamp"], errors="coerce")
+    d["relay_status"] = d["relay_status"].astype(str).str.lower()
+    d["energy_amp"] = pd.to_numeric(d["energy_amp"], errors="coerce").fillna(0.0)
+    d = d.dropna(subset=["timestamp"])
+    d = d[d["relay_status"] == "on"]
+    out = []
+    for _, r in d.iterrows():
+        amp = float(r["energy_amp"])
+        z = robust_zscore(amp, med, mad)
+        if abs(z) >= z_thr:
+            out.append({"timestamp": r["timestamp"].isoformat(), "energy_amp": amp, "z": float(z)})
+    return out
+
+
+def timed(fn, repeat: int = 3) -> tuple[float, object]:
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000, result
+
+
+def parse_args():
+    p = argparse.ArgumentParser()
+    p.add_argument("--days", type=int, nargs="+", default=[1, 7, 30], help="윈도우 길이(일)")
+    p.add_argument("--devices", type=int, default=10, help="배치 측정 시 디바이스 수")
+    p.add_argument("--z-thr", type=float, default=3.0)
+    p.add_argument("--legacy", action="store_true", help="기존 iterrows 구현도 측정")
+    return p.parse_args()
+
+
+def main():
+    args = parse_args()
+    print(f"{'days':>5} {'rows/dev':>10} {'single ms':>10} {'batch ms/dev':>13} {'legacy ms':>10} {'anoms':>6}")
+
+    for days in args.days:
+        single = make_device_frame("AA:00:00:00:00:00", days, seed=days)
+        single_ms, items = timed(lambda: detect_anomalies(single, BASELINE, z_thr=args.z_thr))
+
+        fleet = pd.concat(
+            [make_device_frame(f"AA:00:00:00:00:{i:02X}", days, seed=days * 100 + i) for i in range(args.devices)],
+            ignore_index=True,
+        )
+        baselines = {mac: BASELINE for mac in fleet["device_mac"].unique()}
+        batch_ms, batch = timed(lambda: detect_anomalies_batch(fleet, baselines, z_thr=args.z_thr))
+        for mac, rows in fleet.groupby("device_mac", sort=False):
+            assert batch[mac] == detect_anomalies(rows, BASELINE, z_thr=args.z_thr), f"{mac}: batch/single 결과 불일치"
+
+        legacy_col = "-"
+        if args.legacy:
+            legacy_ms, legacy_items = timed(lambda: legacy_detect_anomalies(single, BASELINE, z_thr=args.z_thr), repeat=1)
+            assert [i["timestamp"] for i in legacy_items] == [i["timestamp"] for i in items], "legacy/vectorised 결과 불일치"
+            legacy_col = f"{legacy_ms:.1f}"
+
+        print(
+            f"{days:>5} {len(single):>10} {single_ms:>10.1f} "
+            f"{batch_ms / args.devices:>13.1f} {legacy_col:>10} {len(items):>6}"
+        )
+
+
+if __name__ == "__main__":
+    main()
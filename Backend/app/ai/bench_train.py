@@ -0,0 +1,105 @@
+"""
+bench_train.py
+- train_models.py 학습 방식 비교 (DB 불필요, 합성 데이터)
+  serial : 전체 fleet을 DataFrame 하나로 만든 뒤 groupby로 순차 학습 (변경 전 방식)
+  sharded: 디바이스 단위로 ProcessPoolExecutor에 나누고, 워커가 자기 디바이스 데이터만 생성/학습
+- 3초 샘플링 기준, 시간과 최대 RSS(부모/워커)를 출력
+
+실행 예시)
+  cd Backend/app/ai
+  python bench_train.py
+  python bench_train.py --devices 200 --days 14 --workers 8
+"""
+
+import argparse
+import os
+import resource
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from train_models import fit_device
+
+SAMPLE_SEC = 3
+
+
+def make_device_rows(seed: int, days: int) -> tuple[np.ndarray, np.ndarray]:
+    """(energy_amp float32, relay on 여부)"""
+    rng = np.random.default_rng(seed)
+    n = days * 24 * 3600 // SAMPLE_SEC
+    load = rng.random(n) < 0.4
+    amp = np.where(load, rng.normal(1.2, 0.2, n), rng.normal(0.03, 0.01, n)).astype(np.float32)
+    on = rng.random(n) < 0.8
+    return amp, on
+
+
+def train_serial(devices: int, days: int) -> int:
+    frames = []
+    for i in range(devices):
+        amp, on = make_device_rows(i, days)
+        frames.append(pd.DataFrame({
+            "device_mac": f"AA:00:00:00:{i // 256:02X}:{i % 256:02X}",
+            "device_name": "bench",
+            "energy_amp": amp.astype(np.float64),
+            "relay_status": np.where(on, "on", "off"),
+        }))
+    df = pd.concat(frames, ignore_index=True)
+    del frames
+
+    trained = 0
+    for _, g in df.groupby("device_mac"):
+        amps = g.loc[g["relay_status"] == "on", "energy_amp"].to_numpy(dtype=np.float64)
+        fit_device(amps, str(g["device_name"].iloc[-1]))
+        trained += 1
+    return trained
+
+
+def _train_one(seed: int, days: int) -> int:
+    amp, on = make_device_rows(seed, days)
+    fit_device(amp[on].astype(np.float64), "bench")
+    return len(amp)
+
+
+def train_sharded(devices: int, days: int, workers: int) -> int:
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return len(list(pool.map(_train_one, range(devices), [days] * devices)))
+
+
+def max_rss_mb(who: int) -> float:
+    return resource.getrusage(who).ru_maxrss / 1024
+
+
+def parse_args():
+    p = argparse.ArgumentParser()
+    p.add_argument("--devices", type=int, default=100)
+    p.add_argument("--days", type=int, default=14)
+    p.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    p.add_argument("--mode", choices=["both", "serial", "sharded"], default="both")
+    return p.parse_args()
+
+
+def main():
+    args = parse_args()
+    rows = args.devices * args.days * 24 * 3600 // SAMPLE_SEC
+    print(f"devices={args.devices} days={args.days} rows={rows:,} workers={args.workers}")
+
+    # RSS는 프로세스 최대값이므로 sharded를 먼저 측정 (부모 RSS가 serial 영향 안 받게)
+    if args.mode in ("both", "sharded"):
+        t0 = time.perf_counter()
+        train_sharded(args.devices, args.days, args.workers)
+        print(
+            f"sharded : {time.perf_counter() - t0:7.2f}s  "
+            f"parent max RSS {max_rss_mb(resource.RUSAGE_SELF):7.1f}MB  "
+            f"worker max RSS {max_rss_mb(resource.RUSAGE_CHILDREN):7.1f}MB"
+        )
+
+    if args.mode in ("both", "serial"):
+        t0 = time.perf_counter()
+        train_serial(args.devices, args.days)
+        print(f"serial  : {time.perf_counter() - t0:7.2f}s  max RSS {max_rss_mb(resource.RUSAGE_SELF):7.1f}MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+check_incremental_trainer.py
+- incremental_trainer.TrainerState 결과가 전체 재학습(train_models.fit_device / train_profiles.build_profiles)과
+  모듈 docstring 의 오차 한계 안에서 같은지 확인 (DB 불필요)
+- parity   : dummy_devices.csv 를 배치 3개로 나눠 반영한 결과 vs CSV 전체로 재학습
+- null-amp : relay on 인데 energy_amp 가 NULL 인 행이 섞여도 amp 통계는 값이 있는 샘플만으로 계산되는지
+  (on_rate / sample_cnt 에는 NULL 행도 그대로 들어감)
+
+실행 예시)
+  cd Backend/app/ai
+  python check_incremental_trainer.py
+
+하나라도 어긋나면 AssertionError 로 종료 코드 1
+"""
+
+import numpy as np
+import pandas as pd
+
+from analytics import relay_on_mask
+from incremental_trainer import TrainerState
+from train_models import fit_device
+from train_profiles import build_profiles, load_from_csv
+
+MEDIAN_REL = 0.0014   # 구간 폭 0.27% 의 절반 (기하 중심)
+MEDIAN_ABS = 0.0005   # 1mA 미만 첫 구간
+
+
+def feed(df: pd.DataFrame, batches: int = 3) -> TrainerState:
+    state = TrainerState.empty()
+    df = df.reset_index(drop=True).assign(id=np.arange(1, len(df) + 1))
+    step = -(-len(df) // batches)
+    for i in range(batches):
+        state.update(df.iloc[i * step:(i + 1) * step])
+    return state
+
+
+def assert_median(name: str, inc: float, ref: float):
+    err = abs(inc - ref)
+    assert err <= max(MEDIAN_REL * abs(ref), MEDIAN_ABS), f"{name}: {inc:.6f} vs {ref:.6f}"
+
+
+def compare(label: str, df: pd.DataFrame):
+    state = feed(df)
+    thresholds, baselines = state.thresholds_and_baselines()
+    ref_profiles, inc_profiles = build_profiles(df), state.profiles()
+    assert sorted(ref_profiles) == sorted(inc_profiles), f"{label}: 디바이스 목록이 다름"
+
+    on = relay_on_mask(df["relay_status"])
+    amp_all = pd.to_numeric(df["energy_amp"], errors="coerce").to_numpy(dtype=np.float64)
+    worst_thr = worst_med = 0.0
+    for mac in sorted(ref_profiles):
+        amps = amp_all[(df["device_mac"] == mac).to_numpy() & on]
+        t_ref, b_ref = fit_device(amps, "")
+        finite = amps[np.isfinite(amps)]
+
+        # Otsu: 같은 결과이거나 [min, max] 선형 구간 한 칸 차이
+        t1, t2 = t_ref["standby_load_threshold_amp"], thresholds[mac]["standby_load_threshold_amp"]
+        bin_w = (finite.max() - finite.min()) / 128 if len(finite) else 0.0
+        assert abs(t2 - t1) <= bin_w + 1e-9, f"{label} {mac} threshold: {t2:.6f} vs {t1:.6f} (bin {bin_w:.6f})"
+        worst_thr = max(worst_thr, abs(t2 - t1) / max(abs(t1), 1e-9))
+
+        assert (b_ref is None) == (mac not in baselines), f"{label} {mac}: baseline 유무가 다름"
+        if b_ref:
+            b = baselines[mac]
+            assert_median(f"{label} {mac} amp_median", b["amp_median"], b_ref["amp_median"])
+            mad_bound = MEDIAN_REL * (b_ref["amp_median"] + finite.max()) + MEDIAN_ABS
+            assert abs(b["amp_mad"] - b_ref["amp_mad"]) <= mad_bound, (
+                f"{label} {mac} amp_mad: {b['amp_mad']:.6f} vs {b_ref['amp_mad']:.6f}"
+            )
+
+        r, i = ref_profiles[mac], inc_profiles[mac]
+        assert r["sample_cnt"] == i["sample_cnt"], f"{label} {mac}: sample_cnt 다름"
+        assert np.allclose(r["on_rate"], i["on_rate"]), f"{label} {mac}: on_rate 다름"
+        for ref_m, inc_m in zip(np.ravel(r["amp_median_on"]), np.ravel(i["amp_median_on"])):
+            assert_median(f"{label} {mac} amp_median_on", inc_m, ref_m)
+            worst_med = max(worst_med, abs(inc_m - ref_m) / ref_m if ref_m else 0.0)
+
+    print(f"✅ {label}: devices={len(ref_profiles)} threshold 최대 상대오차={worst_thr:.4%} median 최대 상대오차={worst_med:.4%}")
+
+
+def null_amp_frame(seed: int = 0) -> pd.DataFrame:
+    """on 샘플 2000개(amp ~ N(1, 0.2)) + energy_amp 가 NULL 인 on 샘플 800개"""
+    rng = np.random.default_rng(seed)
+    n_amp, n_null = 2000, 800
+    amp = np.concatenate([rng.normal(1.0, 0.2, n_amp), np.full(n_null, np.nan)])
+    ts = pd.Timestamp("2026-01-05") + pd.to_timedelta(rng.integers(0, 14 * 86400, n_amp + n_null), unit="s")
+    df = pd.DataFrame({
+        "device_mac": "NU:LL:00:00:00:01",
+        "device_name": "null-amp",
+        "relay_status": "on",
+        "energy_amp": amp,
+        "timestamp": ts,
+    })
+    return df.iloc[rng.permutation(len(df))]
+
+
+def main():
+    compare("parity", load_from_csv("dummy_devices.csv"))
+
+    df = null_amp_frame()
+    compare("null-amp", df)
+    thresholds, baselines = feed(df).thresholds_and_baselines()
+    mac = "NU:LL:00:00:00:01"
+    # 0A 로 채우면 threshold ~0.5 / median ~0.8 / MAD ~0.39 로 무너짐
+    assert thresholds[mac]["standby_load_threshold_amp"] > 0.8, thresholds[mac]
+    assert abs(baselines[mac]["amp_median"] - 1.0) < 0.05, baselines[mac]
+    assert baselines[mac]["amp_mad"] < 0.2, baselines[mac]
+    print(f"✅ null-amp: threshold={thresholds[mac]['standby_load_threshold_amp']:.3f} "
+          f"median={baselines[mac]['amp_median']:.3f} mad={baselines[mac]['amp_mad']:.3f}")
+
+
+if __name__ == "__main__":
+    main()
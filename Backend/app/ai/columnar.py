@@ -0,0 +1,162 @@
+"""
+columnar.py
+- public.devices 조회 결과를 Row 객체 없이 바로 컬럼 배열로 읽는 로더
+- asyncpg COPY (SELECT ...) TO STDOUT (CSV) → pandas C 파서로 타입 지정 디코딩
+- ai_server.py / train_models.py / train_profiles.py 에서 공유
+
+  energy_amp / temperature / humidity : float32
+  timestamp                           : int64 epoch(µs) → datetime64
+  device_mac / device_name / relay_status : category
+  id                                  : int64
+
+SQLAlchemy 엔진의 커넥션 풀을 그대로 쓰고, 그 안의 asyncpg 커넥션으로 COPY만 실행합니다.
+
+사용 예)
+  sql = build_select(["device_mac", "energy_amp", "timestamp"], where='"timestamp" >= $1')
+  async with engine.connect() as conn:
+      df = await copy_frame(conn, sql, [start_ts], ["device_mac", "energy_amp", "timestamp"])
+"""
+
+import io
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+DEVICE_COLUMNS = ["device_mac", "device_name", "relay_status", "energy_amp", "temperature", "humidity", "timestamp"]
+
+# 컬럼 → (SELECT 식, 디코딩 dtype)
+_COLUMN_SPEC: Dict[str, tuple[str, str]] = {
+    "id": ("id", "int64"),
+    "device_mac": ("device_mac", "category"),
+    "device_name": ("device_name", "category"),
+    "relay_status": ("relay_status", "category"),
+    "energy_amp": ("energy_amp", "float32"),
+    "temperature": ("temperature", "float32"),
+    "humidity": ("humidity", "float32"),
+    # KST naive timestamp를 그대로 epoch(µs)로 → 되돌려도 같은 벽시계 시각
+    "timestamp": ('(EXTRACT(EPOCH FROM "timestamp") * 1000000)::bigint', "int64"),
+}
+
+
+def build_select(
+    columns: Sequence[str],
+    where: str = "",
+    order_by: str = '"timestamp" ASC',
+    limit: Optional[int] = None,
+) -> str:
+    """
+    public.devices SELECT 문 생성 (파라미터는 asyncpg 형식 $1, $2 ...)
+    timestamp 컬럼은 NULL 이면 안 되므로 항상 NOT NULL 조건을 붙임
+    """
+    unknown = [c for c in columns if c not in _COLUMN_SPEC]
+    if unknown:
+        raise ValueError(f"unknown columns: {unknown}")
+
+    exprs = ", ".join(_COLUMN_SPEC[c][0] for c in columns)
+    conds = ['"timestamp" IS NOT NULL'] + ([where] if where else [])
+    sql = f"SELECT {exprs} FROM public.devices WHERE {' AND '.join(conds)}"
+    if order_by:
+        sql += f" ORDER BY {order_by}"
+    if limit:
+        sql += f" LIMIT {int(limit)}"
+    return sql
+
+
+def _dtypes(columns: Sequence[str], overrides: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    return {c: (overrides or {}).get(c, _COLUMN_SPEC[c][1]) for c in columns}
+
+
+def empty_frame(columns: Sequence[str], dtypes: Optional[Dict[str, str]] = None) -> pd.DataFrame:
+    """결과가 없을 때도 같은 dtype의 빈 DataFrame"""
+    data = {}
+    for c, dtype in _dtypes(columns, dtypes).items():
+        data[c] = pd.Series([], dtype="datetime64[us]" if c == "timestamp" else dtype)
+    return pd.DataFrame(data)
+
+
+def decode_csv(data: bytes, columns: Sequence[str], dtypes: Optional[Dict[str, str]] = None) -> pd.DataFrame:
+    """
+    COPY CSV 출력 → 타입이 지정된 DataFrame
+    dtypes 로 기본 dtype을 컬럼별로 덮어쓸 수 있음 (예: 내보내기는 energy_amp 를 float64 로)
+    """
+    if not data:
+        return empty_frame(columns, dtypes)
+
+    df = pd.read_csv(
+        io.BytesIO(data),
+        names=list(columns),
+        header=None,
+        dtype=_dtypes(columns, dtypes),
+        keep_default_na=False,  # 디바이스 이름 "NA" 등을 결측으로 보지 않음
+        na_values=[""],
+    )
+    if "timestamp" in df.columns:
+        df["timestamp"] = df["timestamp"].to_numpy(dtype=np.int64).astype("datetime64[us]")
+    return df
+
+
+async def copy_frame(
+    conn: AsyncConnection,
+    query: str,
+    args: Sequence[Any],
+    columns: Sequence[str],
+    dtypes: Optional[Dict[str, str]] = None,
+) -> pd.DataFrame:
+    """SQLAlchemy AsyncConnection 안의 asyncpg 커넥션으로 COPY 실행"""
+    raw = await conn.get_raw_connection()
+    driver_conn = raw.driver_connection
+
+    # 파일 객체를 넘기면 청크마다 executor를 타므로, 코루틴으로 받아서 모음
+    chunks: List[bytes] = []
+
+    async def _write(data: bytes) -> None:
+        chunks.append(data)
+
+    await driver_conn.copy_from_query(query, *args, output=_write, format="csv")
+    return decode_csv(b"".join(chunks), columns, dtypes)
+
+
+# 워터마크 아래 비어 있는 id 를 다시 확인하는 범위 (id 차이). 이보다 오래된 빈칸은 롤백 등으로 보고 버림
+ID_GAP_WINDOW = 10_000
+
+
+def after_watermark(watermark: int, pending_ids: Sequence[int], first_param: int = 1) -> tuple[str, List[Any]]:
+    """
+    id 워터마크 증분 조회 조건과 파라미터 ($first_param 부터)
+    pending_ids(워터마크 아래인데 아직 못 본 id)도 같이 다시 조회
+    """
+    if len(pending_ids) == 0:
+        return f"id > ${first_param}", [int(watermark)]
+    return (
+        f"(id > ${first_param} OR id = ANY(${first_param + 1}::bigint[]))",
+        [int(watermark), [int(i) for i in pending_ids]],
+    )
+
+
+def update_pending_ids(
+    watermark: int,
+    ids: np.ndarray,
+    pending_ids: np.ndarray,
+    window: int = ID_GAP_WINDOW,
+) -> np.ndarray:
+    """
+    after_watermark 조회로 받은 ids 를 반영한 뒤의 pending_ids
+    MQTT 저장은 세션마다 따로 커밋하므로 큰 id 가 작은 id 보다 먼저 보일 수 있음
+    → 새 워터마크 아래 빈 id 를 기억해 두고 다음 조회에서 다시 확인 (window 밖으로 밀려나면 버림)
+    처음 조회(워터마크 0)는 첫 id 앞을 빈칸으로 보지 않음
+    """
+    ids = np.unique(np.asarray(ids, dtype=np.int64))
+    pending_ids = np.asarray(pending_ids, dtype=np.int64)
+    if not len(ids):
+        return pending_ids
+    top = max(int(watermark), int(ids[-1]))
+    lo = max(int(watermark), top - window, int(ids[0]) - 1 if watermark == 0 else 0)
+    missing = np.setdiff1d(np.arange(lo + 1, top + 1, dtype=np.int64), ids, assume_unique=True)
+    pending = np.union1d(np.setdiff1d(pending_ids, ids), missing)
+    return pending[pending > top - window]
+
+
+def column_list(include_id: bool = False) -> List[str]:
+    return (["id"] if include_id else []) + list(DEVICE_COLUMNS)
@@ -2,7 +2,21 @@
 export_devices.py
 - .env에서 DATABASE_URL을 읽어서 Postgres(iotcoss) 접속
 - public.devices 테이블에서 최근 N일 데이터 조회
-- CSV 또는 JSON으로 내보내기
+- CSV / CSV.GZ / JSON / JSONL / Parquet 으로 내보내기
+
+전체 결과를 메모리에 올리지 않고 id 순서로 --chunk-rows 씩 COPY 해서 바로 파일에 씀
+(메모리 사용량은 청크 하나 크기로 고정, 30일치 전체 장비도 그대로 내보낼 수 있음)
+
+  .csv      : utf-8-sig (엑셀 한글 깨짐 방지)
+  .csv.gz   : 청크마다 독립 gzip 멤버 (gzip / pandas 로 그대로 읽힘)
+  .json     : 레코드 배열 (기존 형식)
+  .jsonl    : 한 줄에 레코드 하나
+  .parquet  : zstd 압축, 청크 하나 = row group 하나 (pyarrow 필요: pip install pyarrow)
+
+이어받기)
+  진행 상황은 <out>.state.json 에 파일별 마지막 id / 쓴 바이트 수로 저장
+  중간에 끊기면 --resume 으로 같은 기간을 마지막 id 이후부터 이어서 씀 (완료되면 상태 파일 삭제)
+  parquet 는 파일을 닫아야 완성되므로 파일 단위로만 이어받음
 
 실행 예시)
   # 기본: 최근 7일치 -> devices.csv
@@ -16,18 +30,59 @@ export_devices.py
 
   # JSON으로
   python export_devices.py --days 7 --out devices.json
+
+  # 30일치를 날짜별 parquet 로 (devices.2026-01-01.parquet ...), 4개 동시
+  python export_devices.py --days 30 --out exports/devices.parquet --split day --jobs 4
+
+  # 장비별 gzip CSV, 끊기면 이어받기
+  python export_devices.py --days 30 --out exports/devices.csv.gz --split device
+  python export_devices.py --days 30 --out exports/devices.csv.gz --split device --resume
+
+  # 지난번에 내보낸 마지막 id 이후만
+  python export_devices.py --days 30 --after-id 123456 --out new_rows.jsonl
+
+  # DB 대신 local_store.py 로 받아 둔 ai/data/ 캐시에서 (이어받기 / --jobs 는 무시)
+  python export_devices.py --days 30 --out devices.parquet --source local
 """
 
 import argparse
 import asyncio
+import gzip
+import json
 import os
+import time
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from pathlib import Path
+from typing import Any, Dict, List, Optional
 
 import pandas as pd
 from dotenv import load_dotenv
 from sqlalchemy import text
-from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from columnar import build_select, copy_frame
+from local_store import DEFAULT_DATA_DIR, LocalStore
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+EXPORT_COLUMNS = [
+    "id",
+    "device_name",
+    "device_mac",
+    "temperature",
+    "humidity",
+    "energy_amp",
+    "relay_status",
+    "timestamp",
+]
+# 내보내기는 DB 값 그대로 (columnar 기본값 float32 대신 float64)
+EXPORT_DTYPES = {"temperature": "float64", "humidity": "float64", "energy_amp": "float64"}
+FORMATS = (".csv.gz", ".csv", ".jsonl", ".json", ".parquet")
 
 
 def load_env() -> Path | None:
@@ -70,78 +125,458 @@ def get_database_url() -> str:
     return db_url
 
 
-async def fetch_devices(days: int = 7, limit: int = 0, device_mac: str | None = None) -> pd.DataFrame:
-    db_url = get_database_url()
+def output_format(path: Path) -> str:
+    """파일 이름 끝 → 포맷 (.csv.gz 처럼 두 단계 확장자 포함). 모르는 확장자는 csv"""
+    name = path.name.lower()
+    return next((f for f in FORMATS if name.endswith(f)), ".csv")
 
-    engine = create_async_engine(
-        db_url,
-        echo=False,
-        pool_pre_ping=True,
-    )
-    SessionLocal = async_sessionmaker(engine, expire_on_commit=False)
-
-    start_ts = datetime.now() - timedelta(days=days)
-
-    sql = """
-    SELECT
-        id,
-        device_name,
-        device_mac,
-        temperature,
-        humidity,
-        energy_amp,
-        relay_status,
-        "timestamp"
-    FROM public.devices
-    WHERE "timestamp" >= :start_ts
+
+# -----------------------
+# 출력 파일
+# -----------------------
+class ByteSink:
+    """
+    csv / csv.gz / json / jsonl: 청크를 인코딩해서 파일 끝에 바이트로 덧붙임
+    offset(쓴 바이트 수)을 상태에 저장해 두면, 이어받을 때 거기까지 잘라내고 계속 쓸 수 있음
     """
 
-    params: dict = {"start_ts": start_ts}
+    resumable = True
+
+    def __init__(self, path: Path, fmt: str, offset: int = 0):
+        self.fmt = fmt
+        resume = offset > 0 and path.exists()
+        self._f = open(path, "r+b" if resume else "wb")
+        if resume:
+            self._f.truncate(offset)
+            self._f.seek(offset)
+        elif fmt == ".csv":
+            self._f.write(b"\xef\xbb\xbf")
+        elif fmt == ".json":
+            self._f.write(b"[")
+        self._first = not resume
+
+    @property
+    def offset(self) -> int:
+        return self._f.tell()
+
+    def _encode(self, df: pd.DataFrame) -> bytes:
+        if self.fmt in (".csv", ".csv.gz"):
+            data = df.to_csv(index=False, header=self._first)
+        elif self.fmt == ".jsonl":
+            data = df.to_json(orient="records", lines=True, force_ascii=False, date_format="iso")
+            data = data if data.endswith("\n") else data + "\n"
+        else:
+            body = df.to_json(orient="records", force_ascii=False, date_format="iso")[1:-1]
+            data = body if self._first else "," + body
+
+        raw = data.encode("utf-8")
+        return gzip.compress(raw, compresslevel=6) if self.fmt == ".csv.gz" else raw
+
+    def write(self, df: pd.DataFrame) -> None:
+        self._f.write(self._encode(df))
+        self._f.flush()
+        self._first = False
+
+    def close(self, empty: pd.DataFrame) -> None:
+        if self._first and self.fmt in (".csv", ".csv.gz"):
+            # 결과가 없어도 헤더는 남김
+            self._f.write(self._encode(empty))
+        if self.fmt == ".json":
+            self._f.write(b"]")
+        self._f.close()
+
+
+class ParquetSink:
+    """
+    청크 하나를 row group 하나로 기록 (zstd). 임시 파일에 쓰고 닫을 때 이름을 바꿈
+    parquet 는 footer 가 있어야 읽히므로 중간 상태에서는 이어받지 않음
+    """
 
+    resumable = False
+
+    def __init__(self, path: Path):
+        if pq is None:
+            raise SystemExit("❌ parquet 출력에는 pyarrow가 필요합니다. pip install pyarrow")
+        self.path = path
+        self.tmp = path.with_name(path.name + ".tmp")
+        self.schema = pa.schema([
+            ("id", pa.int64()),
+            ("device_name", pa.string()),
+            ("device_mac", pa.string()),
+            ("temperature", pa.float64()),
+            ("humidity", pa.float64()),
+            ("energy_amp", pa.float64()),
+            ("relay_status", pa.string()),
+            ("timestamp", pa.timestamp("us")),
+        ])
+        self._writer = pq.ParquetWriter(self.tmp, self.schema, compression="zstd")
+
+    @property
+    def offset(self) -> int:
+        return 0
+
+    def write(self, df: pd.DataFrame) -> None:
+        # category 는 청크마다 코드 dtype이 달라질 수 있으므로 일반 문자열로 넘김 (parquet 가 알아서 dictionary 인코딩)
+        df = df.astype({c: object for c in df.columns if isinstance(df[c].dtype, pd.CategoricalDtype)})
+        self._writer.write_table(pa.Table.from_pandas(df, schema=self.schema, preserve_index=False))
+
+    def close(self, empty: pd.DataFrame) -> None:
+        self._writer.close()
+        os.replace(self.tmp, self.path)
+
+
+def open_sink(path: Path, fmt: str, offset: int):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if fmt == ".parquet":
+        return ParquetSink(path)
+    return ByteSink(path, fmt, offset)
+
+
+# -----------------------
+# 분할 / 상태
+# -----------------------
+@dataclass
+class Partition:
+    key: str
+    path: Path
+    where: List[str]
+    args: List[Any]
+
+
+def partition_path(out: Path, fmt: str, key: str) -> Path:
+    """devices.csv.gz + 2026-01-03 → devices.2026-01-03.csv.gz"""
+    stem = out.name[: len(out.name) - len(fmt)] if out.name.lower().endswith(fmt) else out.name
+    return out.with_name(f"{stem}.{key}{fmt}")
+
+
+async def fetch_device_macs(engine, start_ts: datetime) -> List[str]:
+    sql = 'SELECT DISTINCT device_mac FROM public.devices WHERE "timestamp" >= :start_ts AND device_mac IS NOT NULL'
+    async with engine.connect() as conn:
+        res = await conn.execute(text(sql), {"start_ts": start_ts})
+        return sorted(r[0] for r in res.fetchall())
+
+
+async def build_partitions(engine, out: Path, fmt: str, split: str, start_ts: datetime, device_mac: Optional[str]) -> List[Partition]:
+    where = ['"timestamp" >= $1']
+    args: List[Any] = [start_ts]
     if device_mac:
-        sql += " AND device_mac = :device_mac"
-        params["device_mac"] = device_mac
-
-    sql += ' ORDER BY "timestamp" ASC'
-
-    if limit and limit > 0:
-        sql += " LIMIT :limit"
-        params["limit"] = limit
-
-    async with SessionLocal() as session:
-        result = await session.execute(text(sql), params)
-        rows = result.fetchall()
-        cols = result.keys()
-
-    await engine.dispose()
+        where.append(f"device_mac = ${len(args) + 1}")
+        args.append(device_mac)
+
+    if split == "none":
+        return [Partition("all", out, where, args)]
+
+    if split == "device":
+        macs = [device_mac] if device_mac else await fetch_device_macs(engine, start_ts)
+        n = len(args) + 1
+        return [
+            Partition(mac, partition_path(out, fmt, mac.replace(":", "")), where + [f"device_mac = ${n}"], args + [mac])
+            for mac in macs
+        ]
+
+    # split == "day": [max(start_ts, 자정), 다음 자정)
+    parts = []
+    day = datetime.combine(start_ts.date(), datetime.min.time())
+    n = len(args) + 1
+    while day <= datetime.now():
+        nxt = day + timedelta(days=1)
+        lo = max(day, start_ts)
+        parts.append(Partition(
+            day.strftime("%Y-%m-%d"),
+            partition_path(out, fmt, day.strftime("%Y-%m-%d")),
+            where + [f'"timestamp" >= ${n}', f'"timestamp" < ${n + 1}'],
+            args + [lo, nxt],
+        ))
+        day = nxt
+    return parts
+
+
+class ExportState:
+    """<out>.state.json: 실행 조건 + 파일별 {last_id, rows, offset, done}"""
+
+    def __init__(self, path: Path, meta: Dict[str, Any], files: Dict[str, Dict[str, Any]]):
+        self.path = path
+        self.meta = meta
+        self.files = files
+
+    @classmethod
+    def load(cls, path: Path) -> Optional["ExportState"]:
+        if not path.exists():
+            return None
+        obj = json.loads(path.read_text(encoding="utf-8"))
+        return cls(path, obj["meta"], obj["files"])
+
+    def file(self, key: str) -> Dict[str, Any]:
+        return self.files.setdefault(
+            key, {"last_id": self.meta["after_id"], "rows": 0, "offset": 0, "done": False}
+        )
 
-    return pd.DataFrame(rows, columns=cols)
+    @property
+    def rows(self) -> int:
+        return sum(f["rows"] for f in self.files.values())
+
+    def save(self) -> None:
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(json.dumps({"meta": self.meta, "files": self.files}, ensure_ascii=False, indent=2), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+
+class Progress:
+    def __init__(self, total_files: int, rows: int = 0, interval_sec: float = 2.0):
+        self.total_files = total_files
+        self.files_done = 0
+        self.rows = rows
+        self.new_rows = 0
+        self.interval_sec = interval_sec
+        self.started = time.perf_counter()
+        self._last_print = 0.0
+
+    def add(self, rows: int) -> None:
+        self.rows += rows
+        self.new_rows += rows
+        self.maybe_print()
+
+    def file_done(self) -> None:
+        self.files_done += 1
+        self.maybe_print(force=self.total_files > 1)
+
+    def maybe_print(self, force: bool = False) -> None:
+        now = time.perf_counter()
+        if not force and now - self._last_print < self.interval_sec:
+            return
+        self._last_print = now
+        rate = self.new_rows / max(now - self.started, 1e-9)
+        print(f"  ⏳ rows={self.rows:,} ({rate:,.0f} rows/s) files={self.files_done}/{self.total_files}", flush=True)
+
+
+# -----------------------
+# 내보내기
+# -----------------------
+class Exporter:
+    def __init__(self, engine, state: ExportState, fmt: str, chunk_rows: int, limit: int, progress: Progress):
+        self.engine = engine
+        self.state = state
+        self.fmt = fmt
+        self.chunk_rows = chunk_rows
+        # --limit 은 전체 파일 합계 기준
+        self.remaining = max(0, limit - state.rows) if limit > 0 else None
+        self.progress = progress
+        self.preview: Optional[pd.DataFrame] = None
+
+    def _reserve(self) -> int:
+        if self.remaining is None:
+            return self.chunk_rows
+        n = min(self.chunk_rows, self.remaining)
+        self.remaining -= n
+        return n
+
+    def _release(self, n: int) -> None:
+        if self.remaining is not None:
+            self.remaining += n
+
+    async def export(self, part: Partition) -> None:
+        st = self.state.file(part.key)
+        if st["done"]:
+            self.progress.file_done()
+            return
+
+        if self.fmt == ".parquet" and st["rows"]:
+            # parquet: 끝나지 않은 파일은 처음부터 다시
+            if self.remaining is not None:
+                self.remaining += st["rows"]
+            st.update(last_id=self.state.meta["after_id"], rows=0, offset=0)
+        sink = await asyncio.to_thread(open_sink, part.path, self.fmt, st["offset"])
+
+        while True:
+            n = self._reserve()
+            if n == 0:
+                break
+
+            k = len(part.args)
+            sql = build_select(
+                EXPORT_COLUMNS,
+                where=" AND ".join(part.where + [f"id > ${k + 1}"]),
+                order_by="id ASC",
+                limit=n,
+            )
+            async with self.engine.connect() as conn:
+                df = await copy_frame(conn, sql, part.args + [st["last_id"]], EXPORT_COLUMNS, EXPORT_DTYPES)
+            self._release(n - len(df))
+            if df.empty:
+                break
+
+            await asyncio.to_thread(sink.write, df)
+            if self.preview is None:
+                self.preview = df.head(5)
+
+            st["last_id"] = int(df["id"].iloc[-1])
+            st["rows"] += len(df)
+            if sink.resumable:
+                st["offset"] = sink.offset
+                self.state.save()
+            self.progress.add(len(df))
+
+            if len(df) < n:
+                break
+
+        await asyncio.to_thread(sink.close, pd.DataFrame(columns=EXPORT_COLUMNS))
+        st["done"] = True
+        self.state.save()
+        self.progress.file_done()
+
+
+def export_local(
+    store: LocalStore,
+    out: Path,
+    fmt: str,
+    split: str,
+    start_ts: datetime,
+    device_mac: Optional[str],
+    after_id: int,
+    limit: int,
+) -> tuple[int, int, Optional[pd.DataFrame]]:
+    """로컬 캐시의 날짜 파티션을 순서대로 읽어 기록. 반환: (행 수, 파일 수, 미리보기)"""
+    sinks: Dict[str, Any] = {}
+    progress = Progress(total_files=0)
+    preview = None
+    rows = 0
+
+    def sink_for(key: str) -> Any:
+        if key not in sinks:
+            path = out if split == "none" else partition_path(out, fmt, key)
+            sinks[key] = open_sink(path, fmt, 0)
+            progress.total_files = len(sinks)
+        return sinks[key]
+
+    macs = [device_mac] if device_mac else None
+    for day, df in store.iter_days(start=start_ts, columns=EXPORT_COLUMNS, device_macs=macs):
+        if after_id:
+            df = df[df["id"].to_numpy() > after_id]
+        if limit > 0:
+            df = df.head(limit - rows)
+        if df.empty:
+            continue
+
+        if split == "none":
+            groups = [("all", df)]
+        elif split == "day":
+            groups = [(day, df)]
+        else:
+            groups = [(str(mac).replace(":", ""), g) for mac, g in df.groupby("device_mac", observed=True, sort=True)]
+        for key, g in groups:
+            sink_for(key).write(g)
+
+        if preview is None:
+            preview = df.head(5)
+        rows += len(df)
+        progress.add(len(df))
+        if limit > 0 and rows >= limit:
+            break
+
+    if split == "none":
+        sink_for("all")
+    empty = pd.DataFrame(columns=EXPORT_COLUMNS)
+    for sink in sinks.values():
+        sink.close(empty)
+    return rows, len(sinks), preview
 
 
 def parse_args():
     p = argparse.ArgumentParser()
     p.add_argument("--days", type=int, default=7, help="최근 N일 데이터 조회")
-    p.add_argument("--limit", type=int, default=0, help="0이면 제한 없음")
+    p.add_argument("--limit", type=int, default=0, help="0이면 제한 없음 (분할 시 전체 합계)")
     p.add_argument("--device-mac", type=str, default=None, help="특정 device_mac만 필터")
-    p.add_argument("--out", type=str, default="devices.csv", help="저장 파일명(.csv/.json)")
+    p.add_argument("--out", type=str, default="devices.csv", help="저장 파일명(.csv/.csv.gz/.json/.jsonl/.parquet)")
+    p.add_argument("--split", choices=["none", "device", "day"], default="none", help="장비별/날짜별 파일로 나누기")
+    p.add_argument("--jobs", type=int, default=4, help="분할 시 동시에 내보낼 파일 수")
+    p.add_argument("--chunk-rows", type=int, default=100_000, help="한 번에 조회/기록할 행 수")
+    p.add_argument("--after-id", type=int, default=0, help="이 id 이후 행만 (증분 내보내기)")
+    p.add_argument("--resume", action="store_true", help="<out>.state.json 기준으로 이어받기")
+    p.add_argument("--source", choices=["db", "local"], default="db", help="db: Postgres 조회 / local: ai/data/ 캐시")
+    p.add_argument("--data-dir", type=str, default=str(DEFAULT_DATA_DIR), help="--source local 캐시 폴더")
     return p.parse_args()
 
 
 async def main():
     args = parse_args()
-
-    df = await fetch_devices(days=args.days, limit=args.limit, device_mac=args.device_mac)
-
-    out_lower = args.out.lower()
-    if out_lower.endswith(".json"):
-        df.to_json(args.out, orient="records", force_ascii=False, date_format="iso")
+    out = Path(args.out)
+    fmt = output_format(out)
+    if fmt == ".parquet" and pq is None:
+        raise SystemExit("❌ parquet 출력에는 pyarrow가 필요합니다. pip install pyarrow")
+
+    if args.source == "local":
+        store = LocalStore(Path(args.data_dir))
+        start_ts = datetime.now() - timedelta(days=args.days)
+        if not store.covers(start_ts):
+            raise SystemExit(
+                f"❌ 로컬 캐시가 최근 {args.days}일을 덮지 않음: {store.stats()}\n"
+                f"   python local_store.py --days {args.days} 로 먼저 동기화하세요."
+            )
+        t0 = time.perf_counter()
+        out.parent.mkdir(parents=True, exist_ok=True)
+        rows, files, preview = export_local(store, out, fmt, args.split, start_ts, args.device_mac, args.after_id, args.limit)
+        target = out if args.split == "none" else partition_path(out, fmt, "*")
+        print(f"✅ exported rows: {rows} -> {target} ({files} files, local watermark_id={store.watermark_id}, {time.perf_counter() - t0:.1f}s)")
+        if preview is not None:
+            print(preview.to_string(index=False))
+        return
+
+    state_path = out.with_name(out.name + ".state.json")
+    meta = {
+        "start_ts": (datetime.now() - timedelta(days=args.days)).isoformat(),
+        "device_mac": args.device_mac,
+        "split": args.split,
+        "format": fmt,
+        "after_id": args.after_id,
+    }
+    state = ExportState.load(state_path) if args.resume else None
+    if state is not None:
+        changed = [k for k in ("device_mac", "split", "format") if state.meta.get(k) != meta[k]]
+        if changed:
+            raise SystemExit(f"❌ {state_path} 와 실행 옵션이 다릅니다: {changed}")
+        print(f"↪️  resume from {state_path} (start_ts={state.meta['start_ts']}, rows={state.rows:,})")
     else:
-        # 엑셀/윈도우에서 한글 깨짐 방지: utf-8-sig
-        df.to_csv(args.out, index=False, encoding="utf-8-sig")
+        state = ExportState(state_path, meta, {})
+    start_ts = datetime.fromisoformat(state.meta["start_ts"])
 
-    print(f"✅ exported rows: {len(df)} -> {args.out}")
-    if len(df) > 0:
-        print(df.head(5).to_string(index=False))
+    engine = create_async_engine(
+        get_database_url(),
+        echo=False,
+        pool_pre_ping=True,
+        pool_size=max(1, args.jobs),
+        max_overflow=0,
+    )
+    t0 = time.perf_counter()
+    try:
+        out.parent.mkdir(parents=True, exist_ok=True)
+        parts = await build_partitions(engine, out, fmt, args.split, start_ts, args.device_mac)
+        progress = Progress(len(parts), rows=state.rows)
+        exporter = Exporter(engine, state, fmt, args.chunk_rows, args.limit, progress)
+        state.save()
+
+        sem = asyncio.Semaphore(max(1, args.jobs))
+
+        async def run(part: Partition) -> None:
+            async with sem:
+                await exporter.export(part)
+
+        tasks = [asyncio.ensure_future(run(p)) for p in parts]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            # 하나가 실패하면 나머지도 멈추고 상태 파일은 남겨 둠 (--resume)
+            for t in tasks:
+                t.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+    finally:
+        await engine.dispose()
+
+    state_path.unlink(missing_ok=True)
+    target = out if args.split == "none" else partition_path(out, fmt, "*")
+    print(f"✅ exported rows: {state.rows} -> {target} ({len(parts)} files, {time.perf_counter() - t0:.1f}s)")
+    if exporter.preview is not None:
+        print(exporter.preview.to_string(index=False))
 
 
 if __name__ == "__main__":
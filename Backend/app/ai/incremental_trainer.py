@@ -0,0 +1,449 @@
+"""
+incremental_trainer.py
+- train_models.py / train_profiles.py 를 매번 N일 전체 재조회 없이 갱신하는 증분 학습기
+- 디바이스별로 병합 가능한 누적 통계만 들고 있다가, id 워터마크 이후 새 행만 반영
+  (워터마크 아래 늦게 커밋된 id 는 pending_ids 로 남겨 다음 실행에서 다시 조회)
+- 반영 후 models/thresholds.json, baselines.json, profiles.json 을 다시 씀
+  (ai_server 는 파일 변경을 감지해서 자동으로 스냅샷 교체)
+
+누적 통계 (models/trainer_state.npz)
+  amp_hist  : (N, 4096) relay on 샘플의 energy_amp 로그 구간 히스토그램 → median / MAD, Otsu
+  amp_min/max: (N,) relay on 샘플 energy_amp 최소/최대 → Otsu 선형 구간 범위 (train_models 와 동일)
+  sample_cnt: (N, 7, 24) 요일×시간 샘플 수
+  on_cnt    : (N, 7, 24) 요일×시간 on 샘플 수 → on_rate
+  cell_keys / cell_counts: 요일×시간별 on 샘플 amp 히스토그램 (amp_hist 와 같은 구간, 값이 있는 칸만)
+              → amp_median_on
+  (amp 통계는 energy_amp 가 있는 on 샘플만, NULL 인 on 샘플은 on_cnt 에만 들어감)
+
+오차 (전체 재학습 대비)
+  - 구간 폭 0.27%(1mA ~ 64A), 대표값은 구간의 기하 중심
+    → median / amp_median_on 은 상대 오차 0.14% 이하 (1mA 미만은 절대 오차 0.5mA 이하)
+    짝수 개일 때도 가운데 두 값이 든 구간 대표값의 평균이라 같은 한계
+  - MAD 는 |x - median| 을 대표값으로 계산 → 절대 오차 0.0014 × (median + 해당 샘플 amp) 이하
+  - Otsu 는 같은 [min, max] 128 선형 구간으로 다시 나누되, 로그 구간 안은 균등 분포로 가정해 나눔
+    → 선형 구간 경계에 걸친 로그 구간의 샘플만 옆 구간으로 갈 수 있음.
+      클래스 간 분산 최대 구간이 바뀌지 않으면 결과가 같고, 바뀌어도 선형 구간 한 칸
+      ((max - min) / 128) 이내 차이
+
+--half-life-days 를 주면 실행할 때마다 경과 시간만큼 기존 통계를 감쇠시켜
+"최근 N일" 학습과 비슷하게 오래된 데이터 비중을 줄입니다.
+샘플 반 개 미만으로 줄어든 히스토그램 칸은 비우고, Otsu 범위(amp_min/max)도 남은 칸 안으로 좁힙니다
+(좁힌 경우 범위 끝은 구간 경계값이라 Otsu 오차 한계에 로그 구간 한 칸(0.27%)이 더해짐).
+가져온 행이 없으면 모델 파일은 다시 쓰지 않습니다 (bootstrap 이면 상태 파일도 그대로).
+
+실행 예시)
+  cd Backend/app/ai
+  python incremental_trainer.py                      # 상태가 없으면 최근 14일로 시작, 있으면 새 행만
+  python incremental_trainer.py --loop 300           # 5분마다 반복
+  python incremental_trainer.py --reset --bootstrap-days 30
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from analytics import _timestamps, factorize, relay_on_mask
+from columnar import after_watermark, build_select, copy_frame, update_pending_ids
+from train_models import get_db_url, otsu_from_bins
+from train_profiles import CELLS, ProfileArrays, profiles_from_arrays
+
+MODELS_DIR = Path(__file__).resolve().parent / "models"
+STATE_PATH = MODELS_DIR / "trainer_state.npz"
+
+# 저장 형식 버전 (구간 구성이 바뀌면 올림 → 예전 상태 파일은 버리고 bootstrap 부터)
+STATE_VERSION = 2
+
+# 감쇠 후 이 값 미만으로 줄어든 히스토그램 칸은 비움 (샘플 1개짜리 칸은 반감기 1번 뒤 사라짐)
+PRUNE_BELOW = 0.5
+
+# 0 ~ 64A 로그 구간 (첫 구간은 [0, 1mA)), 64A 초과는 마지막 구간
+AMP_EDGES = np.concatenate([[0.0], np.geomspace(1e-3, 64.0, 4096)])
+FETCH_COLUMNS = ["id", "device_mac", "device_name", "relay_status", "energy_amp", "timestamp"]
+
+
+def _bin_index(edges: np.ndarray, values: np.ndarray) -> np.ndarray:
+    idx = np.searchsorted(edges, values, side="right") - 1
+    return np.clip(idx, 0, len(edges) - 2)
+
+
+# 구간 대표값: 기하 중심 (첫 구간은 0.5mA) → 구간 안 어느 값이든 상대 오차가 가장 작음
+AMP_CENTERS = np.concatenate([[AMP_EDGES[1] / 2.0], np.sqrt(AMP_EDGES[1:-1] * AMP_EDGES[2:])])
+N_BINS = len(AMP_CENTERS)
+
+
+def grouped_median(groups: np.ndarray, values: np.ndarray, weights: np.ndarray, n_groups: int) -> np.ndarray:
+    """
+    (그룹, 값) 순으로 정렬된 가중 샘플 → 그룹별 중앙값 (샘플이 없으면 0)
+    np.median 처럼 가운데 두 값(누적 ≥ 절반 / > 절반 첫 위치)의 평균
+    """
+    total = np.bincount(groups, weights=weights, minlength=n_groups)
+    cum = np.cumsum(weights) - (np.cumsum(total) - total)[groups]
+    half = total[groups] / 2.0
+
+    lower = np.zeros(n_groups)
+    idx = np.flatnonzero(cum >= half)
+    g, first = np.unique(groups[idx], return_index=True)
+    lower[g] = values[idx[first]]
+
+    upper = lower.copy()
+    idx = np.flatnonzero(cum > half)
+    g, first = np.unique(groups[idx], return_index=True)
+    upper[g] = values[idx[first]]
+    return (lower + upper) / 2.0
+
+
+def hist_medians(hist: np.ndarray) -> np.ndarray:
+    """(N, N_BINS) 히스토그램 → 행별 중앙값"""
+    keys = np.flatnonzero(hist)
+    return grouped_median(keys // N_BINS, AMP_CENTERS[keys % N_BINS], hist.ravel()[keys], len(hist))
+
+
+def hist_mad(counts: np.ndarray, median: float) -> float:
+    """|x - median| 의 가중 중앙값"""
+    nz = np.flatnonzero(counts)
+    if len(nz) == 0:
+        return 0.0
+    dev = np.abs(AMP_CENTERS[nz] - median)
+    order = np.argsort(dev, kind="stable")
+    return float(grouped_median(np.zeros(len(nz), dtype=np.int64), dev[order], counts[nz][order], 1)[0])
+
+
+def otsu_from_hist(counts: np.ndarray, vmin: float, vmax: float, nbins: int = 128) -> float:
+    """
+    로그 구간 히스토그램을 train_models.otsu_threshold 와 같은 [min, max] 선형 nbins 구간으로 다시 나눠 Otsu
+    로그 구간 하나가 선형 구간 여러 개에 걸치면 겹치는 길이 비율로 나눔 (구간 안 균등 분포 가정)
+    """
+    if counts.sum() < 50 or not vmax > vmin:
+        return float(np.nan)
+
+    lin_edges = np.linspace(vmin, vmax, nbins + 1)
+    # 첫/마지막 로그 구간은 0 미만 / 64A 초과 값도 담고 있으므로 실제 min/max 까지 늘림
+    edges = AMP_EDGES.copy()
+    edges[0], edges[-1] = min(edges[0], vmin), max(edges[-1], vmax)
+
+    # 선형 구간 경계마다 누적 샘플 수 = 앞 로그 구간 합 + 걸친 로그 구간의 [vmin, vmax] 안 비율
+    j = _bin_index(AMP_EDGES, lin_edges)
+    lo = np.maximum(edges[j], vmin)
+    hi = np.minimum(edges[j + 1], vmax)
+    frac = np.where(hi > lo, np.clip((lin_edges - lo) / np.where(hi > lo, hi - lo, 1.0), 0.0, 1.0), 1.0)
+    cdf = np.concatenate([[0.0], np.cumsum(counts)])
+    cum = cdf[j] + counts[j] * frac
+    return otsu_from_bins(np.diff(cum), lin_edges)
+
+
+@dataclass
+class TrainerState:
+    macs: List[str]
+    device_names: List[str]
+    amp_hist: np.ndarray     # (N, N_BINS) float64
+    amp_min: np.ndarray      # (N,) float64, on 샘플이 없으면 inf
+    amp_max: np.ndarray      # (N,) float64, on 샘플이 없으면 -inf
+    sample_cnt: np.ndarray   # (N, 7, 24) float64
+    on_cnt: np.ndarray       # (N, 7, 24) float64
+    cell_keys: np.ndarray    # (K,) int64 오름차순, (행 * CELLS + 요일*24 + 시) * N_BINS + 구간
+    cell_counts: np.ndarray  # (K,) float64
+    watermark_id: int = 0
+    updated_at: float = 0.0  # epoch 초
+    # 워터마크 아래인데 아직 못 본 id (늦게 커밋된 행, 다음 실행에서 다시 조회)
+    pending_ids: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.int64))
+
+    @classmethod
+    def empty(cls) -> "TrainerState":
+        return cls(
+            macs=[],
+            device_names=[],
+            amp_hist=np.zeros((0, N_BINS)),
+            amp_min=np.zeros(0),
+            amp_max=np.zeros(0),
+            sample_cnt=np.zeros((0, 7, 24)),
+            on_cnt=np.zeros((0, 7, 24)),
+            cell_keys=np.zeros(0, dtype=np.int64),
+            cell_counts=np.zeros(0),
+        )
+
+    @classmethod
+    def load(cls, path: Path = STATE_PATH) -> "TrainerState":
+        if not path.exists():
+            return cls.empty()
+        with np.load(path, allow_pickle=False) as z:
+            version = int(z["version"]) if "version" in z.files else 1
+            if version != STATE_VERSION:
+                print(f"⚠️ {path.name} 형식이 다름(v{version} → v{STATE_VERSION}), 처음부터 다시 학습", flush=True)
+                return cls.empty()
+            return cls(
+                macs=z["macs"].tolist(),
+                device_names=z["device_names"].tolist(),
+                amp_hist=z["amp_hist"],
+                amp_min=z["amp_min"],
+                amp_max=z["amp_max"],
+                sample_cnt=z["sample_cnt"],
+                on_cnt=z["on_cnt"],
+                cell_keys=z["cell_keys"],
+                cell_counts=z["cell_counts"],
+                watermark_id=int(z["watermark_id"]),
+                updated_at=float(z["updated_at"]),
+                pending_ids=z["pending_ids"] if "pending_ids" in z.files else np.zeros(0, dtype=np.int64),
+            )
+
+    def save(self, path: Path = STATE_PATH) -> None:
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "wb") as f:
+            np.savez_compressed(
+                f,
+                macs=np.array(self.macs, dtype=str),
+                device_names=np.array(self.device_names, dtype=str),
+                version=np.int64(STATE_VERSION),
+                amp_hist=self.amp_hist,
+                amp_min=self.amp_min,
+                amp_max=self.amp_max,
+                sample_cnt=self.sample_cnt,
+                on_cnt=self.on_cnt,
+                cell_keys=self.cell_keys,
+                cell_counts=self.cell_counts,
+                watermark_id=np.int64(self.watermark_id),
+                updated_at=np.float64(self.updated_at),
+                pending_ids=self.pending_ids,
+            )
+        os.replace(tmp, path)
+
+    # -----------------------
+    # 갱신
+    # -----------------------
+    def decay(self, now: float, half_life_days: float) -> None:
+        if half_life_days <= 0 or not self.updated_at:
+            return
+        factor = 0.5 ** (max(0.0, now - self.updated_at) / (half_life_days * 86400.0))
+        self.amp_hist *= factor
+        self.sample_cnt *= factor
+        self.on_cnt *= factor
+        self.cell_counts *= factor
+
+        # 샘플 반 개 미만으로 줄어든 구간은 버림 → 오래된 값이 중앙값/Otsu 범위에 계속 남지 않도록
+        self.amp_hist[self.amp_hist < PRUNE_BELOW] = 0.0
+        keep = self.cell_counts >= PRUNE_BELOW
+        self.cell_keys, self.cell_counts = self.cell_keys[keep], self.cell_counts[keep]
+        self._shrink_amp_range()
+
+    def _shrink_amp_range(self) -> None:
+        """
+        amp_min/max 를 남은 가장 낮은/높은 구간 안으로 좁힘
+        그 구간에 원래 최소/최대값이 남아 있으면 정확한 값 유지, 아니면 구간 경계값
+        """
+        nonempty = self.amp_hist > 0
+        has = nonempty.any(axis=1)
+        lo = np.argmax(nonempty, axis=1)
+        hi = N_BINS - 1 - np.argmax(nonempty[:, ::-1], axis=1)
+        # 첫/마지막 구간은 0 미만 / 64A 초과 값도 담으므로 경계로 자르지 않음
+        lower = np.where(lo == 0, -np.inf, AMP_EDGES[lo])
+        upper = np.where(hi == N_BINS - 1, np.inf, AMP_EDGES[np.minimum(hi + 1, N_BINS)])
+        self.amp_min = np.where(has, np.maximum(self.amp_min, lower), np.inf)
+        self.amp_max = np.where(has, np.minimum(self.amp_max, upper), -np.inf)
+
+    def _device_index(self, macs: pd.Index) -> np.ndarray:
+        """배치의 MAC → 상태 행 번호 (새 MAC이면 행 추가)"""
+        index: Dict[str, int] = {mac: i for i, mac in enumerate(self.macs)}
+        new = [str(m) for m in macs if str(m) not in index]
+        if new:
+            k = len(new)
+            self.macs.extend(new)
+            self.device_names.extend([""] * k)
+            self.amp_hist = np.concatenate([self.amp_hist, np.zeros((k, N_BINS))])
+            self.amp_min = np.concatenate([self.amp_min, np.full(k, np.inf)])
+            self.amp_max = np.concatenate([self.amp_max, np.full(k, -np.inf)])
+            self.sample_cnt = np.concatenate([self.sample_cnt, np.zeros((k, 7, 24))])
+            self.on_cnt = np.concatenate([self.on_cnt, np.zeros((k, 7, 24))])
+            index.update({mac: len(index) + i for i, mac in enumerate(new)})
+        return np.array([index[str(m)] for m in macs], dtype=np.int64)
+
+    def update(self, df: pd.DataFrame) -> int:
+        """id 오름차순 배치 반영. 반환: 반영한 행 수"""
+        if df.empty:
+            return 0
+
+        codes, uniques = factorize(df["device_mac"])
+        ts = _timestamps(df["timestamp"])
+        valid = (codes >= 0) & ~np.isnat(ts)
+        rows = self._device_index(uniques)[codes[valid]]
+        n = len(self.macs)
+
+        amp = pd.to_numeric(df["energy_amp"], errors="coerce").to_numpy(dtype=np.float64)[valid]
+        on = relay_on_mask(df["relay_status"])[valid]
+        # amp 가 NULL/비정상인 on 샘플은 on_rate 에만 세고 amp 통계에서는 뺌 (train_models.fit_device 와 동일)
+        measured = on & np.isfinite(amp)
+        hours = ts[valid].astype("datetime64[h]").astype(np.int64)
+        days = np.floor_divide(hours, 24)
+        cell = rows * CELLS + ((days + 3) % 7) * 24 + (hours - days * 24)
+
+        self.sample_cnt += np.bincount(cell, minlength=n * CELLS).reshape(n, 7, 24)
+        self.on_cnt += np.bincount(cell[on], minlength=n * CELLS).reshape(n, 7, 24)
+
+        on_amp = amp[measured]
+        on_bin = _bin_index(AMP_EDGES, on_amp)
+        self.amp_hist += np.bincount(rows[measured] * N_BINS + on_bin, minlength=n * N_BINS).reshape(n, N_BINS)
+        np.minimum.at(self.amp_min, rows[measured], on_amp)
+        np.maximum.at(self.amp_max, rows[measured], on_amp)
+
+        # 셀 히스토그램은 값이 있는 칸만 (키, 개수)로 병합
+        keys, inv = np.unique(
+            np.concatenate([self.cell_keys, cell[measured] * N_BINS + on_bin]), return_inverse=True
+        )
+        weights = np.concatenate([self.cell_counts, np.ones(len(on_amp))])
+        self.cell_keys = keys
+        self.cell_counts = np.bincount(inv.ravel(), weights=weights, minlength=len(keys))
+
+        # 디바이스별 마지막 device_name
+        names = df["device_name"].to_numpy(dtype=object)[valid]
+        for row, name in zip(rows.tolist(), names.tolist()):
+            if name is not None and name == name:
+                self.device_names[row] = str(name)
+
+        ids = df["id"].to_numpy(dtype=np.int64)
+        self.pending_ids = update_pending_ids(self.watermark_id, ids, self.pending_ids)
+        self.watermark_id = max(self.watermark_id, int(ids.max()))
+        return int(valid.sum())
+
+    # -----------------------
+    # 모델 출력 (train_models / train_profiles 와 같은 형식)
+    # -----------------------
+    def thresholds_and_baselines(self) -> tuple[dict, dict]:
+        thresholds, baselines = {}, {}
+        medians = hist_medians(self.amp_hist)
+        totals = self.sample_cnt.sum(axis=(1, 2))
+        on_totals = self.amp_hist.sum(axis=1)
+
+        for i in np.argsort(self.macs):
+            if totals[i] < 0.5:
+                continue
+            mac, name = self.macs[i], self.device_names[i]
+            thr = otsu_from_hist(self.amp_hist[i], self.amp_min[i], self.amp_max[i])
+            if not np.isfinite(thr):
+                thr = float(medians[i]) if on_totals[i] >= 0.5 else 0.05
+            thresholds[mac] = {"device_name": name, "standby_load_threshold_amp": float(thr)}
+
+            if on_totals[i] >= 30:
+                med = float(medians[i])
+                baselines[mac] = {
+                    "device_name": name,
+                    "amp_median": med,
+                    "amp_mad": hist_mad(self.amp_hist[i], med),
+                }
+        return thresholds, baselines
+
+    def profiles(self) -> dict:
+        sample_cnt = np.rint(self.sample_cnt).astype(np.int64)
+        on_rate = np.divide(self.on_cnt, self.sample_cnt, out=np.zeros_like(self.on_cnt), where=self.sample_cnt > 0)
+        n_cells = len(self.macs) * CELLS
+        amp_median_on = grouped_median(
+            self.cell_keys // N_BINS, AMP_CENTERS[self.cell_keys % N_BINS], self.cell_counts, n_cells
+        )
+        return profiles_from_arrays(ProfileArrays(
+            macs=list(self.macs),
+            device_names=list(self.device_names),
+            on_rate=on_rate,
+            amp_median_on=amp_median_on.reshape(len(self.macs), 7, 24),
+            sample_cnt=sample_cnt,
+        ))
+
+
+def write_json_atomic(path: Path, obj: dict) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(obj, ensure_ascii=False, indent=2), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+async def fetch_batches(engine, state: TrainerState, start_ts: Optional[datetime], batch_rows: int):
+    """워터마크 이후 행 + 아직 못 본 pending_ids 를 id 순으로 batch_rows 씩 조회"""
+    while True:
+        where, args = after_watermark(state.watermark_id, state.pending_ids)
+        if start_ts is not None:
+            where += f' AND "timestamp" >= ${len(args) + 1}'
+            args.append(start_ts)
+        sql = build_select(FETCH_COLUMNS, where=where, order_by="id ASC", limit=batch_rows)
+
+        async with engine.connect() as conn:
+            df = await copy_frame(conn, sql, args, FETCH_COLUMNS)
+        if df.empty:
+            return
+        yield df
+        if len(df) < batch_rows:
+            return
+
+
+async def run_once(args) -> None:
+    t0 = time.perf_counter()
+    state = TrainerState.empty() if args.reset else TrainerState.load(STATE_PATH)
+    bootstrap = state.watermark_id == 0
+    start_ts = datetime.now() - timedelta(days=args.bootstrap_days) if bootstrap else None
+
+    now = time.time()
+    state.decay(now, args.half_life_days)
+
+    engine = create_async_engine(get_db_url(), echo=False, pool_pre_ping=True, pool_size=1, max_overflow=0)
+    rows = 0
+    try:
+        async for df in fetch_batches(engine, state, start_ts, args.batch_rows):
+            rows += state.update(df)
+            print(f"  + {len(df)} rows (watermark_id={state.watermark_id})", flush=True)
+    finally:
+        await engine.dispose()
+
+    if rows == 0 and bootstrap:
+        # DB 주소가 틀렸거나 기간 안에 데이터가 없으면 빈 모델로 덮어쓰지 않음 (상태 파일도 그대로)
+        print(f"⚠️ bootstrap {args.bootstrap_days}d: 가져온 행이 없어 모델/상태를 그대로 둠", flush=True)
+        return
+
+    state.updated_at = now
+    MODELS_DIR.mkdir(parents=True, exist_ok=True)
+    state.save(STATE_PATH)
+
+    if rows == 0:
+        print(f"✅ no new rows (watermark_id={state.watermark_id})", flush=True)
+        return
+
+    thresholds, baselines = state.thresholds_and_baselines()
+    write_json_atomic(MODELS_DIR / "thresholds.json", thresholds)
+    write_json_atomic(MODELS_DIR / "baselines.json", baselines)
+    if not args.skip_profiles:
+        write_json_atomic(MODELS_DIR / "profiles.json", state.profiles())
+
+    mode = f"bootstrap {args.bootstrap_days}d" if bootstrap else "incremental"
+    print(
+        f"✅ {mode}: rows={rows} devices={len(state.macs)} thresholds={len(thresholds)} "
+        f"baselines={len(baselines)} watermark_id={state.watermark_id} ({time.perf_counter() - t0:.1f}s)",
+        flush=True,
+    )
+
+
+def parse_args():
+    p = argparse.ArgumentParser()
+    p.add_argument("--bootstrap-days", type=int, default=14, help="상태가 없을 때 처음 학습할 기간(일)")
+    p.add_argument("--half-life-days", type=float, default=14.0, help="누적 통계 반감기(일), 0이면 감쇠 없음")
+    p.add_argument("--batch-rows", type=int, default=500_000, help="한 번에 조회할 최대 행 수")
+    p.add_argument("--skip-profiles", action="store_true", help="profiles.json 은 갱신하지 않음")
+    p.add_argument("--reset", action="store_true", help="저장된 상태를 버리고 처음부터")
+    p.add_argument("--loop", type=int, default=0, help="N초마다 반복 (0이면 1회)")
+    return p.parse_args()
+
+
+async def main():
+    args = parse_args()
+    while True:
+        await run_once(args)
+        if args.loop <= 0:
+            break
+        args.reset = False
+        await asyncio.sleep(args.loop)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
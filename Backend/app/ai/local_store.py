@@ -0,0 +1,431 @@
+"""
+local_store.py
+- public.devices 를 날짜별 컬럼 파일(.npy)로 떠 두는 로컬 분석 캐시 (ai/data/)
+- DB에서는 id 워터마크 이후 행만 가져와 해당 날짜 파티션 끝에 덧붙임
+  (워터마크 아래 늦게 커밋된 id 는 pending_ids 로 남겨 다음 동기화에서 다시 조회 → 파티션 안은 대체로 id 순)
+- 읽을 때는 np.load(mmap_mode="r") 로 파일을 그대로 매핑 (CSV 파싱 / Row 객체 없음)
+- train_models.py / train_profiles.py / export_devices.py / ai_server.py 가 공유
+
+  data/
+    meta.json          : watermark_id, pending_ids, start_ts(보관 시작 시각), days{날짜: 행 수}, synced_at
+    dictionary.json    : device_mac / device_name / relay_status 값 목록 (코드 = 인덱스, 뒤에 추가만 함)
+    2026-01-26/
+      id.npy           : int64
+      timestamp.npy    : int64 epoch µs (KST naive 벽시계 그대로)
+      energy_amp.npy   : float64
+      temperature.npy  : float64
+      humidity.npy     : float64
+      device_mac.npy   : int32 코드 (-1 = NULL)
+      device_name.npy  : int32 코드
+      relay_status.npy : int32 코드
+
+.npy 헤더는 shape 자릿수가 늘어도 길이가 같으므로, 파일 끝에 바이트를 붙이고 헤더만 고쳐 씀
+행 수의 기준은 meta.json → 컬럼 파일이 더 길어도(쓰는 중 / 중단) 앞부분만 읽으므로 항상 일관됨
+
+실행 예시)
+  cd Backend/app/ai
+  python local_store.py --days 30                # 처음엔 최근 30일, 이후엔 새 행만
+  python local_store.py --loop 300 --keep-days 30 # 5분마다 동기화, 30일 지난 파티션 삭제
+  python train_models.py --source local           # DB 없이 로컬 캐시로 학습
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from numpy.lib import format as npy_format
+
+from columnar import DEVICE_COLUMNS, after_watermark, build_select, copy_frame, update_pending_ids
+
+logger = logging.getLogger("ai_server")
+
+DEFAULT_DATA_DIR = Path(__file__).resolve().parent / "data"
+STORE_COLUMNS = ["id"] + DEVICE_COLUMNS
+CODED_COLUMNS = ("device_mac", "device_name", "relay_status")
+FILE_DTYPES: Dict[str, np.dtype] = {
+    "id": np.dtype(np.int64),
+    "timestamp": np.dtype(np.int64),
+    "energy_amp": np.dtype(np.float64),
+    "temperature": np.dtype(np.float64),
+    "humidity": np.dtype(np.float64),
+    **{c: np.dtype(np.int32) for c in CODED_COLUMNS},
+}
+# DB 값 그대로 보관 (columnar 기본값 float32 대신 float64)
+SYNC_DTYPES = {"energy_amp": "float64", "temperature": "float64", "humidity": "float64"}
+_US_PER_DAY = 86_400 * 1_000_000
+
+
+def _write_json_atomic(path: Path, obj: Any) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(obj, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def _append_npy(path: Path, keep_rows: int, values: np.ndarray) -> None:
+    """path 의 앞 keep_rows 행 뒤에 values 를 붙임 (파일이 없으면 새로 만듦)"""
+    header = {"descr": npy_format.dtype_to_descr(values.dtype), "fortran_order": False}
+    if not path.exists() or keep_rows == 0:
+        with open(path, "wb") as f:
+            npy_format.write_array_header_1_0(f, {**header, "shape": (len(values),)})
+            f.write(values.tobytes())
+        return
+
+    with open(path, "r+b") as f:
+        npy_format.read_magic(f)
+        npy_format.read_array_header_1_0(f)
+        offset = f.tell()
+        f.truncate(offset + keep_rows * values.dtype.itemsize)
+        f.seek(0, os.SEEK_END)
+        f.write(values.tobytes())
+        f.seek(0)
+        npy_format.write_array_header_1_0(f, {**header, "shape": (keep_rows + len(values),)})
+        if f.tell() != offset:
+            raise RuntimeError(f"npy header size changed: {path}")
+
+
+def concat_frames(frames: Sequence[pd.DataFrame]) -> pd.DataFrame:
+    """category 컬럼은 범주를 합쳐서 이어 붙임 (object 로 풀리지 않게)"""
+    nonempty = [f for f in frames if len(f)]
+    if len(nonempty) <= 1:
+        return nonempty[0] if nonempty else (frames[0] if len(frames) else pd.DataFrame())
+    frames = nonempty
+    out = {}
+    for c in frames[0].columns:
+        if all(isinstance(f[c].dtype, pd.CategoricalDtype) for f in frames):
+            out[c] = pd.api.types.union_categoricals([f[c] for f in frames], ignore_order=True)
+        else:
+            out[c] = np.concatenate([f[c].to_numpy() for f in frames])
+    return pd.DataFrame(out)
+
+
+class LocalStore:
+    def __init__(self, root: Path = DEFAULT_DATA_DIR):
+        self.root = Path(root)
+        self.meta: Dict[str, Any] = {"watermark_id": 0, "pending_ids": [], "start_ts": None, "days": {}, "synced_at": None}
+        self.dictionary: Dict[str, List[str]] = {c: [] for c in CODED_COLUMNS}
+        self._lookup: Dict[str, Dict[str, int]] = {c: {} for c in CODED_COLUMNS}
+        self._categories: Dict[str, pd.Index] = {}
+        self._meta_mtime = 0.0
+        self._lock = threading.Lock()
+        self.refresh()
+
+    # -----------------------
+    # 상태
+    # -----------------------
+    @property
+    def meta_path(self) -> Path:
+        return self.root / "meta.json"
+
+    @property
+    def dictionary_path(self) -> Path:
+        return self.root / "dictionary.json"
+
+    def refresh(self) -> bool:
+        """다른 프로세스(동기화 작업)가 meta.json 을 바꿨으면 다시 읽음. 반환: 바뀌었는지"""
+        try:
+            mtime = os.stat(self.meta_path).st_mtime
+        except OSError:
+            return False
+        if mtime == self._meta_mtime:
+            return False
+        # dictionary 는 meta 보다 먼저 쓰므로 meta 를 기준으로 필요한 코드는 항상 들어 있음
+        meta = json.loads(self.meta_path.read_text(encoding="utf-8"))
+        dictionary = json.loads(self.dictionary_path.read_text(encoding="utf-8"))
+        self.meta = meta
+        self.dictionary = {c: list(dictionary.get(c, [])) for c in CODED_COLUMNS}
+        self._lookup = {c: {v: i for i, v in enumerate(vals)} for c, vals in self.dictionary.items()}
+        self._categories = {}
+        self._meta_mtime = mtime
+        return True
+
+    @property
+    def ready(self) -> bool:
+        return self.meta["start_ts"] is not None
+
+    @property
+    def watermark_id(self) -> int:
+        return int(self.meta["watermark_id"])
+
+    @property
+    def pending_ids(self) -> List[int]:
+        """워터마크 아래인데 아직 못 본 id (예전 meta.json 에는 없음)"""
+        return list(self.meta.get("pending_ids", []))
+
+    @property
+    def start_ts(self) -> Optional[datetime]:
+        return datetime.fromisoformat(self.meta["start_ts"]) if self.meta["start_ts"] else None
+
+    @property
+    def rows(self) -> int:
+        return sum(self.meta["days"].values())
+
+    def covers(self, start: datetime) -> bool:
+        """start 이후 데이터가 (워터마크까지) 전부 로컬에 있는지"""
+        return self.ready and self.start_ts <= start
+
+    def stats(self) -> Dict[str, Any]:
+        days = sorted(self.meta["days"])
+        return {
+            "ready": self.ready,
+            "root": str(self.root),
+            "start_ts": self.meta["start_ts"],
+            "days": len(days),
+            "first_day": days[0] if days else None,
+            "last_day": days[-1] if days else None,
+            "rows": self.rows,
+            "devices": len(self.dictionary["device_mac"]),
+            "watermark_id": self.watermark_id,
+            "pending_ids": len(self.pending_ids),
+            "synced_at": self.meta["synced_at"],
+        }
+
+    # -----------------------
+    # 읽기
+    # -----------------------
+    def _category_index(self, column: str) -> pd.Index:
+        idx = self._categories.get(column)
+        if idx is None or len(idx) != len(self.dictionary[column]):
+            idx = self._categories[column] = pd.Index(self.dictionary[column], dtype=object)
+        return idx
+
+    def day_arrays(self, day: str, columns: Sequence[str] = STORE_COLUMNS) -> Dict[str, np.ndarray]:
+        """날짜 파티션의 컬럼 배열 (읽기 전용 memmap, meta 의 행 수만큼)"""
+        n = int(self.meta["days"].get(day, 0))
+        out = {}
+        for c in columns:
+            if n == 0:
+                out[c] = np.empty(0, dtype=FILE_DTYPES[c])
+            else:
+                out[c] = np.load(self.root / day / f"{c}.npy", mmap_mode="r")[:n]
+        return out
+
+    def _frame(self, arrays: Dict[str, np.ndarray], sel: Optional[np.ndarray]) -> pd.DataFrame:
+        data = {}
+        for c, arr in arrays.items():
+            values = arr if sel is None else arr[sel]
+            if c == "timestamp":
+                data[c] = values.view("datetime64[us]")
+            elif c in CODED_COLUMNS:
+                data[c] = pd.Categorical.from_codes(values, categories=self._category_index(c), validate=False)
+            else:
+                data[c] = values
+        return pd.DataFrame(data, copy=False)
+
+    def iter_days(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        columns: Sequence[str] = DEVICE_COLUMNS,
+        device_macs: Optional[Sequence[str]] = None,
+    ) -> Iterator[Tuple[str, pd.DataFrame]]:
+        """[start, end) 구간을 날짜 파티션 단위 DataFrame 으로 (대체로 id 순, 늦게 커밋된 행은 뒤쪽)"""
+        lo = np.datetime64(start, "us").astype(np.int64) if start else None
+        hi = np.datetime64(end, "us").astype(np.int64) if end else None
+        first = start.strftime("%Y-%m-%d") if start else ""
+        last = end.strftime("%Y-%m-%d") if end else "9999-12-31"
+        mac_codes = None
+        if device_macs is not None:
+            mac_codes = np.array([self._lookup["device_mac"][m] for m in device_macs if m in self._lookup["device_mac"]], dtype=np.int32)
+            if not len(mac_codes):
+                return
+
+        need = list(dict.fromkeys([*columns, *(["timestamp"] if lo is not None or hi is not None else []), *(["device_mac"] if mac_codes is not None else [])]))
+        for day in sorted(d for d in self.meta["days"] if first <= d <= last):
+            arrays = self.day_arrays(day, need)
+            mask = None
+            if lo is not None:
+                mask = arrays["timestamp"] >= lo
+            if hi is not None:
+                m = arrays["timestamp"] < hi
+                mask = m if mask is None else mask & m
+            if mac_codes is not None:
+                m = np.isin(arrays["device_mac"], mac_codes)
+                mask = m if mask is None else mask & m
+            sel = None
+            if mask is not None and not mask.all():
+                sel = np.flatnonzero(mask)
+                if not len(sel):
+                    continue
+            yield day, self._frame({c: arrays[c] for c in columns}, sel)
+
+    def read(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        columns: Sequence[str] = DEVICE_COLUMNS,
+        device_macs: Optional[Sequence[str]] = None,
+    ) -> pd.DataFrame:
+        """columnar.copy_frame 과 같은 컬럼 구성의 DataFrame (시간 순 정렬은 보장하지 않음)"""
+        frames = [df for _, df in self.iter_days(start, end, columns, device_macs)]
+        if not frames:
+            return self._frame({c: np.empty(0, dtype=FILE_DTYPES[c]) for c in columns}, None)
+        return concat_frames(frames)
+
+    def read_covering(
+        self,
+        start: datetime,
+        columns: Sequence[str] = DEVICE_COLUMNS,
+        device_macs: Optional[Sequence[str]] = None,
+    ) -> Tuple[Optional[pd.DataFrame], int, List[int]]:
+        """
+        refresh → covers → read 를 한 번에 (여러 스레드에서 불러도 같은 meta 기준)
+        반환: (start 이후 로컬 데이터, 그 데이터의 워터마크 id, 워터마크 아래인데 로컬에 없는 id)
+        덮지 못하면 (None, 0, [])
+        """
+        with self._lock:
+            self.refresh()
+            if not self.covers(start):
+                return None, 0, []
+            return self.read(start, None, columns, device_macs), self.watermark_id, self.pending_ids
+
+    # -----------------------
+    # 쓰기
+    # -----------------------
+    def _encode(self, column: str, values: pd.Series) -> np.ndarray:
+        """값 → 전역 코드 (새 값은 dictionary 뒤에 추가)"""
+        if not isinstance(values.dtype, pd.CategoricalDtype):
+            values = values.astype("category")
+        lookup, vocab = self._lookup[column], self.dictionary[column]
+        mapping = np.empty(len(values.cat.categories), dtype=np.int32)
+        for i, v in enumerate(values.cat.categories):
+            key = str(v)
+            code = lookup.get(key)
+            if code is None:
+                code = lookup[key] = len(vocab)
+                vocab.append(key)
+            mapping[i] = code
+        codes = values.cat.codes.to_numpy()
+        return np.where(codes >= 0, mapping[np.maximum(codes, 0)], -1).astype(np.int32)
+
+    def append(self, df: pd.DataFrame) -> int:
+        """copy_frame(STORE_COLUMNS) 결과를 날짜 파티션에 덧붙이고 meta 갱신"""
+        if df.empty:
+            return 0
+
+        self.root.mkdir(parents=True, exist_ok=True)
+        ts = df["timestamp"].to_numpy(dtype="datetime64[us]").astype(np.int64)
+        columns = {
+            "id": df["id"].to_numpy(dtype=np.int64),
+            "timestamp": ts,
+            **{c: df[c].to_numpy(dtype=np.float64) for c in ("energy_amp", "temperature", "humidity")},
+            **{c: self._encode(c, df[c]) for c in CODED_COLUMNS},
+        }
+        _write_json_atomic(self.dictionary_path, self.dictionary)
+
+        day_no = np.floor_divide(ts, _US_PER_DAY)
+        order = np.argsort(day_no, kind="stable")
+        groups, starts = np.unique(day_no[order], return_index=True)
+        bounds = list(starts[1:]) + [len(order)]
+        days = dict(self.meta["days"])
+        for d, lo, hi in zip(groups.tolist(), starts.tolist(), bounds):
+            key = str(np.datetime64(d, "D"))
+            part = self.root / key
+            part.mkdir(parents=True, exist_ok=True)
+            idx = order[lo:hi]
+            n_old = int(days.get(key, 0))
+            for c, values in columns.items():
+                _append_npy(part / f"{c}.npy", n_old, np.ascontiguousarray(values[idx], dtype=FILE_DTYPES[c]))
+            days[key] = n_old + len(idx)
+
+        self.meta["days"] = days
+        self.meta["pending_ids"] = update_pending_ids(self.watermark_id, columns["id"], np.array(self.pending_ids, dtype=np.int64)).tolist()
+        self.meta["watermark_id"] = max(self.watermark_id, int(columns["id"].max()))
+        return len(df)
+
+    def save_meta(self) -> None:
+        _write_json_atomic(self.meta_path, self.meta)
+        self._meta_mtime = os.stat(self.meta_path).st_mtime
+
+    def prune(self, keep_days: int) -> List[str]:
+        """keep_days 보다 오래된 날짜 파티션 삭제 (start_ts 도 같이 당김)"""
+        cutoff = datetime.combine((datetime.now() - timedelta(days=keep_days)).date(), datetime.min.time())
+        old = [d for d in self.meta["days"] if d < cutoff.strftime("%Y-%m-%d")]
+        if not old:
+            return []
+        self.meta["days"] = {d: n for d, n in self.meta["days"].items() if d not in old}
+        if self.start_ts is None or self.start_ts < cutoff:
+            self.meta["start_ts"] = cutoff.isoformat()
+        self.save_meta()
+        for d in old:
+            shutil.rmtree(self.root / d, ignore_errors=True)
+        return old
+
+    async def sync(self, engine, days: int = 14, batch_rows: int = 500_000) -> int:
+        """
+        DB → 로컬. 처음이면 최근 days일, 이후엔 id 워터마크 다음 행 + pending_ids
+        배치마다 meta 를 저장하므로 중간에 끊겨도 다음 실행이 이어서 받음
+        """
+        self.refresh()
+        start_ts = None
+        if not self.ready:
+            start_ts = datetime.now() - timedelta(days=days)
+            self.meta["start_ts"] = start_ts.isoformat()
+
+        total = 0
+        while True:
+            where, args = after_watermark(self.watermark_id, self.pending_ids)
+            if start_ts is not None:
+                where += f' AND "timestamp" >= ${len(args) + 1}'
+                args.append(start_ts)
+            sql = build_select(STORE_COLUMNS, where=where, order_by="id ASC", limit=batch_rows)
+            async with engine.connect() as conn:
+                df = await copy_frame(conn, sql, args, STORE_COLUMNS, SYNC_DTYPES)
+            n = self.append(df)
+            total += n
+            self.meta["synced_at"] = datetime.now().isoformat()
+            self.save_meta()
+            if n:
+                logger.info(f"[LOCAL] +{n} rows watermark_id={self.watermark_id}")
+            if n < batch_rows:
+                return total
+
+
+async def main():
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    from train_models import get_db_url
+
+    p = argparse.ArgumentParser()
+    p.add_argument("--data-dir", type=str, default=str(DEFAULT_DATA_DIR), help="캐시 폴더")
+    p.add_argument("--days", type=int, default=14, help="처음 동기화할 기간(일)")
+    p.add_argument("--keep-days", type=int, default=0, help="이보다 오래된 날짜 파티션 삭제 (0이면 유지)")
+    p.add_argument("--batch-rows", type=int, default=500_000, help="한 번에 조회할 최대 행 수")
+    p.add_argument("--loop", type=int, default=0, help="N초마다 반복 (0이면 1회)")
+    args = p.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s | %(levelname)s | %(message)s")
+    store = LocalStore(Path(args.data_dir))
+    engine = create_async_engine(get_db_url(), echo=False, pool_pre_ping=True, pool_size=1, max_overflow=0)
+    try:
+        while True:
+            t0 = time.perf_counter()
+            n = await store.sync(engine, days=args.days, batch_rows=args.batch_rows)
+            if args.keep_days > 0:
+                removed = store.prune(args.keep_days)
+                if removed:
+                    print(f"🧹 pruned {len(removed)} day partitions", flush=True)
+            s = store.stats()
+            print(
+                f"✅ synced +{n} rows ({time.perf_counter() - t0:.1f}s) | rows={s['rows']} days={s['days']} "
+                f"devices={s['devices']} watermark_id={s['watermark_id']}",
+                flush=True,
+            )
+            if args.loop <= 0:
+                break
+            await asyncio.sleep(args.loop)
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,255 @@
+"""
+model_snapshot.py
+- models/ 의 thresholds.json / baselines.json / profiles.json 을 하나의 불변 스냅샷으로 로드
+- 디바이스별 값은 MAC 인덱스로 접근하는 NumPy 배열 (딕셔너리/리스트 중첩 없음)
+- 같은 폴더에 models.npz 캐시를 두고, JSON 파일이 그대로면 npz만 읽어서 빠르게 시작
+
+  threshold  : (N,) float64  (없으면 NaN → fallback)
+  amp_median : (N,) float64  (baseline 없으면 NaN)
+  amp_mad    : (N,) float64
+  on_rate    : (N, 7, 24) float32 (has_profile=False 인 행은 0)
+
+ai_server.py 는 요청 처리 중 store.snapshot 을 한 번만 읽으므로,
+리로드는 새 스냅샷을 만든 뒤 참조만 바꿔 끼우면 됩니다 (중간에 빈 모델이 보이지 않음).
+
+npz 캐시 미리 만들기)
+  cd Backend/app/ai
+  python model_snapshot.py
+"""
+
+import hashlib
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from profile_model import ProfileModel
+
+logger = logging.getLogger("ai_server")
+
+DEFAULT_MODELS_DIR = Path(__file__).resolve().parent / "models"
+SOURCE_FILES = ("thresholds.json", "baselines.json", "profiles.json")
+NPZ_NAME = "models.npz"
+
+
+def source_signature(models_dir: Path) -> np.ndarray:
+    """(mtime, size) × 원본 JSON 3개. 파일이 없으면 (0, -1)"""
+    sig = np.zeros((len(SOURCE_FILES), 2), dtype=np.float64)
+    for i, name in enumerate(SOURCE_FILES):
+        try:
+            st = os.stat(models_dir / name)
+            sig[i] = (st.st_mtime, st.st_size)
+        except OSError:
+            sig[i] = (0.0, -1.0)
+    return sig
+
+
+def _version_of(sig: np.ndarray) -> str:
+    return hashlib.sha1(sig.tobytes()).hexdigest()[:12]
+
+
+@dataclass(frozen=True)
+class ModelSnapshot:
+    version: str
+    signature: np.ndarray
+    macs: List[str]
+    device_names: List[str]
+    threshold: np.ndarray
+    amp_median: np.ndarray
+    amp_mad: np.ndarray
+    has_profile: np.ndarray
+    on_rate: np.ndarray
+    profile_model: ProfileModel
+    index: Dict[str, int]
+    source: str = "json"  # json / npz / empty
+    loaded_at: float = field(default_factory=time.time)
+
+    @property
+    def thresholds_loaded(self) -> int:
+        return int(np.count_nonzero(~np.isnan(self.threshold)))
+
+    @property
+    def baselines_loaded(self) -> int:
+        return int(np.count_nonzero(~np.isnan(self.amp_median)))
+
+    def get_threshold(self, mac: str, fallback: float = 0.05) -> float:
+        i = self.index.get(mac)
+        if i is None or np.isnan(self.threshold[i]):
+            return fallback
+        return float(self.threshold[i])
+
+    def get_baseline(self, mac: str) -> Optional[Dict[str, Any]]:
+        i = self.index.get(mac)
+        if i is None or np.isnan(self.amp_median[i]):
+            return None
+        return {
+            "device_name": self.device_names[i],
+            "amp_median": float(self.amp_median[i]),
+            "amp_mad": float(self.amp_mad[i]),
+        }
+
+    # -----------------------
+    # 생성 / 저장
+    # -----------------------
+    @classmethod
+    def from_arrays(
+        cls,
+        signature: np.ndarray,
+        macs: List[str],
+        device_names: List[str],
+        threshold: np.ndarray,
+        amp_median: np.ndarray,
+        amp_mad: np.ndarray,
+        has_profile: np.ndarray,
+        on_rate: np.ndarray,
+        source: str,
+    ) -> "ModelSnapshot":
+        prof_idx = np.flatnonzero(has_profile)
+        profile_model = ProfileModel(
+            [macs[i] for i in prof_idx],
+            [device_names[i] for i in prof_idx],
+            on_rate[prof_idx],
+        )
+        return cls(
+            version=_version_of(signature),
+            signature=signature,
+            macs=macs,
+            device_names=device_names,
+            threshold=threshold,
+            amp_median=amp_median,
+            amp_mad=amp_mad,
+            has_profile=has_profile,
+            on_rate=on_rate,
+            profile_model=profile_model,
+            index={mac: i for i, mac in enumerate(macs)},
+            source=source,
+        )
+
+    @classmethod
+    def empty(cls) -> "ModelSnapshot":
+        return cls.from_arrays(
+            np.zeros((len(SOURCE_FILES), 2)),
+            [],
+            [],
+            np.zeros(0),
+            np.zeros(0),
+            np.zeros(0),
+            np.zeros(0, dtype=bool),
+            np.zeros((0, 7, 24), dtype=np.float32),
+            "empty",
+        )
+
+    @classmethod
+    def from_json(cls, models_dir: Path, signature: np.ndarray) -> "ModelSnapshot":
+        def read(name: str) -> Dict[str, Dict[str, Any]]:
+            p = models_dir / name
+            if not p.exists():
+                logger.warning(f"⚠️ {name} not found")
+                return {}
+            return json.loads(p.read_text(encoding="utf-8"))
+
+        thresholds = read("thresholds.json")
+        baselines = read("baselines.json")
+        profiles = read("profiles.json")
+
+        macs = list(dict.fromkeys([*thresholds, *baselines, *profiles]))
+        n = len(macs)
+        names: List[str] = []
+        threshold = np.full(n, np.nan)
+        amp_median = np.full(n, np.nan)
+        amp_mad = np.full(n, np.nan)
+        has_profile = np.zeros(n, dtype=bool)
+        on_rate = np.zeros((n, 7, 24), dtype=np.float32)
+
+        for i, mac in enumerate(macs):
+            thr, base, prof = thresholds.get(mac), baselines.get(mac), profiles.get(mac)
+            name = next((str(d["device_name"]) for d in (prof, thr, base) if d and "device_name" in d), "Unknown")
+            names.append(name)
+            if thr and "standby_load_threshold_amp" in thr:
+                threshold[i] = float(thr["standby_load_threshold_amp"])
+            if base is not None:
+                amp_median[i] = float(base.get("amp_median", 0.0))
+                amp_mad[i] = float(base.get("amp_mad", 0.0))
+            if prof and "on_rate" in prof:
+                has_profile[i] = True
+                on_rate[i] = np.asarray(prof["on_rate"], dtype=np.float32)
+
+        return cls.from_arrays(signature, macs, names, threshold, amp_median, amp_mad, has_profile, on_rate, "json")
+
+    @classmethod
+    def from_npz(cls, path: Path) -> "ModelSnapshot":
+        with np.load(path, allow_pickle=False) as z:
+            return cls.from_arrays(
+                z["signature"],
+                z["macs"].tolist(),
+                z["device_names"].tolist(),
+                z["threshold"],
+                z["amp_median"],
+                z["amp_mad"],
+                z["has_profile"],
+                z["on_rate"],
+                "npz",
+            )
+
+    def save_npz(self, path: Path) -> None:
+        """임시 파일에 쓴 뒤 os.replace 로 교체 (읽는 쪽이 반쯤 쓰인 파일을 보지 않음)"""
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "wb") as f:
+            np.savez(
+                f,
+                signature=self.signature,
+                macs=np.array(self.macs, dtype=str),
+                device_names=np.array(self.device_names, dtype=str),
+                threshold=self.threshold,
+                amp_median=self.amp_median,
+                amp_mad=self.amp_mad,
+                has_profile=self.has_profile,
+                on_rate=self.on_rate,
+            )
+        os.replace(tmp, path)
+
+
+def load_snapshot(models_dir: Path = DEFAULT_MODELS_DIR, write_cache: bool = True) -> ModelSnapshot:
+    """
+    npz 캐시의 signature 가 현재 JSON 파일과 같으면 npz 를, 아니면 JSON 을 읽고 npz 를 갱신
+    """
+    models_dir = Path(models_dir)
+    t0 = time.perf_counter()
+    sig = source_signature(models_dir)
+    npz_path = models_dir / NPZ_NAME
+
+    snap = None
+    if npz_path.exists():
+        try:
+            cached = ModelSnapshot.from_npz(npz_path)
+            if np.array_equal(cached.signature, sig):
+                snap = cached
+        except Exception as e:
+            logger.warning(f"⚠️ {NPZ_NAME} unreadable, falling back to JSON: {e}")
+
+    if snap is None:
+        snap = ModelSnapshot.from_json(models_dir, sig)
+        if write_cache and len(snap.macs):
+            try:
+                snap.save_npz(npz_path)
+            except OSError as e:
+                logger.warning(f"⚠️ {NPZ_NAME} write failed: {e}")
+
+    ms = (time.perf_counter() - t0) * 1000
+    logger.info(
+        f"✅ models loaded from {snap.source}: version={snap.version} devices={len(snap.macs)} "
+        f"thresholds={snap.thresholds_loaded} baselines={snap.baselines_loaded} "
+        f"profiles={len(snap.profile_model)} ({ms:.1f}ms)"
+    )
+    return snap
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s | %(levelname)s | %(message)s")
+    s = load_snapshot()
+    print(f"✅ {DEFAULT_MODELS_DIR / NPZ_NAME} version={s.version} devices={len(s.macs)}")
@@ -0,0 +1,134 @@
+"""
+profile_model.py
+- models/profiles.json(요일×시간대 사용 패턴)을 NumPy 배열로 로드하는 라이브러리
+- ai_server.py(독립 실행)와 백엔드 AI 자동 제어 서비스가 같은 로직을 공유
+
+  on_rate : (디바이스 수, 7, 24) float32 배열
+  추천 규칙: on_rate[dow][hour] >= 0.5 이면 ON, 아니면 OFF
+
+사용 예)
+  model = ProfileModel.load(PROFILE_PATH)
+  model.reload_if_changed()          # 파일이 바뀌었으면 다시 로드
+  recs = model.recommend_all(["AA:BB:..", ...])
+"""
+
+import json
+import logging
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+ON_RATE_THRESHOLD = 0.5
+DEFAULT_PROFILE_PATH = Path(__file__).resolve().parent / "models" / "profiles.json"
+
+
+def recommendation_reason(action: str, on_rate: float) -> str:
+    """추천 사유 문구 (ai_server 단건 추천과 동일한 표현)"""
+    if action == "ON":
+        return f"사용률 {on_rate*100:.0f}% - 사용 예정 시간"
+    return f"사용률 {on_rate*100:.0f}% - 미사용 시간 (대기전력 차단)"
+
+
+class ProfileModel:
+    """디바이스별 요일×시간대 on_rate 프로파일 (NumPy 배열)"""
+
+    def __init__(
+        self,
+        macs: List[str],
+        device_names: List[str],
+        on_rate: np.ndarray,
+        path: Optional[Path] = None,
+        mtime: float = 0.0,
+    ):
+        self.macs = macs
+        self.device_names = device_names
+        self.on_rate = on_rate  # (N, 7, 24) float32
+        self.index: Dict[str, int] = {mac: i for i, mac in enumerate(macs)}
+        self.path = path
+        self.mtime = mtime
+
+    def __len__(self) -> int:
+        return len(self.macs)
+
+    @classmethod
+    def from_profiles(cls, profiles: Dict[str, Dict[str, Any]], path: Optional[Path] = None, mtime: float = 0.0) -> "ProfileModel":
+        """profiles.json 딕셔너리 → 배열 모델 (on_rate가 없는 디바이스는 제외)"""
+        macs = [mac for mac, p in profiles.items() if "on_rate" in p]
+        on_rate = np.zeros((len(macs), 7, 24), dtype=np.float32)
+        for i, mac in enumerate(macs):
+            on_rate[i] = np.asarray(profiles[mac]["on_rate"], dtype=np.float32)
+        names = [str(profiles[mac].get("device_name", "Unknown")) for mac in macs]
+        return cls(macs, names, on_rate, path=path, mtime=mtime)
+
+    @classmethod
+    def load(cls, path: Path = DEFAULT_PROFILE_PATH) -> "ProfileModel":
+        """파일에서 로드 (파일이 없으면 빈 모델)"""
+        path = Path(path)
+        if not path.exists():
+            logger.warning(f"⚠️ profiles not found: {path}")
+            return cls([], [], np.zeros((0, 7, 24), dtype=np.float32), path=path)
+        mtime = os.stat(path).st_mtime
+        profiles = json.loads(path.read_text(encoding="utf-8"))
+        model = cls.from_profiles(profiles, path=path, mtime=mtime)
+        logger.info(f"✅ profile model loaded: {len(model)} devices ({path})")
+        return model
+
+    def reload_if_changed(self) -> "ProfileModel":
+        """파일 수정 시각이 바뀌었으면 새로 로드한 모델을, 아니면 자기 자신을 반환"""
+        if self.path is None:
+            return self
+        try:
+            mtime = os.stat(self.path).st_mtime if self.path.exists() else 0.0
+        except OSError:
+            return self
+        if mtime == self.mtime:
+            return self
+        return ProfileModel.load(self.path)
+
+    def on_rates_at(self, macs: List[str], when: datetime) -> tuple[np.ndarray, np.ndarray]:
+        """
+        주어진 시각의 on_rate를 한 번에 조회
+        반환: (on_rate 배열, 프로파일 존재 여부 마스크)
+        """
+        idx = np.fromiter((self.index.get(mac, -1) for mac in macs), dtype=np.int64, count=len(macs))
+        found = idx >= 0
+        rates = np.zeros(len(macs), dtype=np.float32)
+        if found.any():
+            rates[found] = self.on_rate[idx[found], when.weekday(), when.hour]
+        return rates, found
+
+    def recommend_all(self, macs: Optional[List[str]] = None, when: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """
+        여러 디바이스의 ON/OFF 추천을 한 번에 계산 (ai_server 응답과 같은 형식)
+        macs가 None이면 프로파일이 있는 전체 디바이스
+        """
+        when = when or datetime.now()
+        macs = list(self.macs) if macs is None else list(macs)
+        rates, found = self.on_rates_at(macs, when)
+        is_on = rates >= ON_RATE_THRESHOLD
+
+        items = []
+        for mac, rate, ok, on in zip(macs, rates.tolist(), found.tolist(), is_on.tolist()):
+            if not ok:
+                items.append({
+                    "device_mac": mac,
+                    "action": "OFF",
+                    "reason": "프로파일 없음 (기본 OFF)",
+                    "on_rate": 0.0,
+                })
+                continue
+            action = "ON" if on else "OFF"
+            items.append({
+                "device_mac": mac,
+                "device_name": self.device_names[self.index[mac]],
+                "current_hour": when.hour,
+                "on_rate": round(rate, 2),
+                "action": action,
+                "reason": recommendation_reason(action, rate),
+            })
+        return items
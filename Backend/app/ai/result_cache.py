@@ -0,0 +1,72 @@
+"""
+result_cache.py
+- ai_server.py 분석 엔드포인트(/anomalies, /waste, /report, /reports) 결과 캐시
+- LRU + TTL, 키에 데이터 워터마크(최신 timestamp)와 모델 버전을 포함
+
+  key = (endpoint, device_mac, params, watermark, model_version)
+
+새 레코드가 들어오면 워터마크가 바뀌어 자연스럽게 miss가 나고,
+/models/reload 시에는 clear()로 전부 비웁니다.
+캐시된 응답은 여러 요청이 공유하므로 꺼낸 뒤 수정하면 안 됩니다.
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+
+class ResultCache:
+    def __init__(self, max_entries: int = 512, ttl_sec: float = 30.0):
+        self.max_entries = max_entries
+        self.ttl_sec = ttl_sec
+        self._items: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl_sec > 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        if not self.enabled:
+            return None
+        item = self._items.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            del self._items[key]
+            self.misses += 1
+            return None
+        self._items.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        if not self.enabled:
+            return
+        self._items[key] = (time.monotonic() + self.ttl_sec, value)
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_entries:
+            self._items.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._items.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._items),
+            "max_entries": self.max_entries,
+            "ttl_sec": self.ttl_sec,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
@@ -0,0 +1,280 @@
+"""
+rolling.py
+- ai_server.py 가 메모리에 들고 있는 디바이스별 최근 N시간 슬라이딩 윈도우
+- 새 레코드는 id 워터마크 이후만 폴링해서 뒤에 붙이고, 보존 기간이 지난 앞부분은 잘라냄
+  (늦게 커밋된 작은 id 는 pending_ids 로 기억해 두고 다음 폴링에서 다시 조회, columnar.update_pending_ids)
+- 누적합(prefix sum)으로 standby 전류·초와 이상치 수를 유지 → 임의 시작 시각의 합계가 O(log n)
+
+  standby_as[i] : 샘플 i 이전까지의 standby amp·초 누적 (Wh = V × 차이 / 3600)
+  hits_before[i]: 샘플 i 이전까지의 이상치 수 누적 (z_thr 고정)
+
+threshold / baseline 이 바뀌면(/models/reload) rebuild()로 파생 값만 다시 계산합니다.
+"""
+
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from analytics import WindowArrays, _records, anomalies_from_window, prepare_windows, robust_denominator
+from columnar import update_pending_ids
+
+logger = logging.getLogger("ai_server")
+
+_MIN_CAPACITY = 1024
+
+
+class DeviceWindow:
+    """한 디바이스의 샘플 버퍼 (앞부분은 lo 이동 후 필요할 때 한 번에 당겨서 압축)"""
+
+    def __init__(self, capacity: int = _MIN_CAPACITY):
+        self.lo = 0
+        self.hi = 0
+        self._alloc(capacity)
+
+    def _alloc(self, capacity: int) -> None:
+        self.ts = np.empty(capacity, dtype="datetime64[ns]")
+        self.amp = np.empty(capacity, dtype=np.float32)
+        self.is_on = np.empty(capacity, dtype=bool)
+        self.hit = np.empty(capacity, dtype=bool)
+        self.standby_as = np.empty(capacity, dtype=np.float64)
+        self.hits_before = np.empty(capacity, dtype=np.int32)
+
+    def __len__(self) -> int:
+        return self.hi - self.lo
+
+    @property
+    def last_ts(self) -> Optional[np.datetime64]:
+        return self.ts[self.hi - 1] if self.hi > self.lo else None
+
+    def _reserve(self, extra: int) -> None:
+        """뒤에 extra개를 붙일 공간 확보 (앞쪽 빈 공간 압축 또는 2배 확장)"""
+        n = len(self)
+        capacity = len(self.ts)
+        if self.hi + extra <= capacity:
+            return
+
+        need = n + extra
+        new_capacity = capacity if need <= capacity // 2 else max(_MIN_CAPACITY, 2 * need)
+        old = (self.ts, self.amp, self.is_on, self.hit, self.standby_as, self.hits_before)
+        if new_capacity != capacity:
+            self._alloc(new_capacity)
+        new = (self.ts, self.amp, self.is_on, self.hit, self.standby_as, self.hits_before)
+        for src, dst in zip(old, new):
+            dst[:n] = src[self.lo:self.hi]
+        self.lo, self.hi = 0, n
+
+    def _recompute_from(self, i: int, thr: float, baseline: Optional[Dict[str, Any]], z_thr: float) -> None:
+        """샘플 i부터 끝까지 파생 값(hit, 누적합) 다시 계산. standby_as[i], hits_before[i]는 이미 맞다고 가정"""
+        hi = self.hi
+        if i >= hi:
+            return
+        amp = self.amp[i:hi].astype(np.float64)
+        on = self.is_on[i:hi]
+
+        if baseline:
+            med = float(baseline.get("amp_median", 0.0))
+            denom = robust_denominator(float(baseline.get("amp_mad", 0.0)))
+            self.hit[i:hi] = on & (np.abs((amp - med) / denom) >= z_thr)
+        else:
+            self.hit[i:hi] = False
+
+        # 샘플 k의 standby 기여분 = amp × (다음 샘플까지 초) → k+1 위치의 누적합에 반영
+        if hi - i > 1:
+            dt = np.diff(self.ts[i:hi]).astype("timedelta64[ns]").astype(np.int64) / 1e9
+            standby = on[:-1] & (amp[:-1] < thr)
+            contrib = np.where(standby, amp[:-1] * dt, 0.0)
+            self.standby_as[i + 1:hi] = self.standby_as[i] + np.cumsum(contrib)
+            self.hits_before[i + 1:hi] = self.hits_before[i] + np.cumsum(self.hit[i:hi - 1])
+
+    def rebuild(self, thr: float, baseline: Optional[Dict[str, Any]], z_thr: float) -> None:
+        if self.hi > self.lo:
+            self.standby_as[self.lo] = 0.0
+            self.hits_before[self.lo] = 0
+            self._recompute_from(self.lo, thr, baseline, z_thr)
+
+    def append(self, w: WindowArrays, thr: float, baseline: Optional[Dict[str, Any]], z_thr: float) -> None:
+        """timestamp 오름차순 샘플 추가. 기존 마지막보다 과거 샘플이 섞이면 정렬 후 전체 재계산"""
+        k = len(w)
+        if k == 0:
+            return
+
+        last = self.last_ts
+        in_order = last is None or w.ts[0] >= last
+        if not in_order:
+            merged = WindowArrays(
+                ts=np.concatenate([self.ts[self.lo:self.hi], w.ts]),
+                amp=np.concatenate([self.amp[self.lo:self.hi].astype(np.float64), w.amp]),
+                is_on=np.concatenate([self.is_on[self.lo:self.hi], w.is_on]),
+            )
+            order = np.argsort(merged.ts, kind="stable")
+            self.lo = self.hi = 0
+            self._reserve(len(order))
+            w = WindowArrays(ts=merged.ts[order], amp=merged.amp[order], is_on=merged.is_on[order])
+            k = len(w)
+
+        self._reserve(k)
+        start = self.hi
+        self.ts[start:start + k] = w.ts
+        self.amp[start:start + k] = w.amp
+        self.is_on[start:start + k] = w.is_on
+        self.hi = start + k
+
+        if start == self.lo:
+            self.rebuild(thr, baseline, z_thr)
+        else:
+            # 직전 마지막 샘플의 기여분이 이제야 확정되므로 거기서부터 계산
+            self._recompute_from(start - 1, thr, baseline, z_thr)
+
+    def trim(self, before: np.datetime64) -> None:
+        """before 보다 오래된 샘플 제거 (누적합은 차이만 쓰므로 그대로 둠)"""
+        cut = int(np.searchsorted(self.ts[self.lo:self.hi], before, side="left"))
+        self.lo += cut
+        if self.lo == self.hi:
+            self.lo = self.hi = 0
+
+    def start_index(self, start: np.datetime64) -> int:
+        return self.lo + int(np.searchsorted(self.ts[self.lo:self.hi], start, side="left"))
+
+    def standby_amp_seconds(self, start: np.datetime64) -> float:
+        s = self.start_index(start)
+        if s >= self.hi:
+            return 0.0
+        # 마지막 샘플은 기여분 0 → standby_as[hi-1]까지
+        return float(self.standby_as[self.hi - 1] - self.standby_as[s])
+
+    def hit_indices(self, start: np.datetime64) -> np.ndarray:
+        s = self.start_index(start)
+        return s + np.flatnonzero(self.hit[s:self.hi])
+
+    def anomaly_count(self, start: np.datetime64) -> int:
+        s = self.start_index(start)
+        if s >= self.hi:
+            return 0
+        last = self.hi - 1
+        return int(self.hits_before[last] + self.hit[last] - self.hits_before[s])
+
+    def window(self, start: np.datetime64) -> WindowArrays:
+        s = self.start_index(start)
+        return WindowArrays(
+            ts=self.ts[s:self.hi],
+            amp=self.amp[s:self.hi].astype(np.float64),
+            is_on=self.is_on[s:self.hi],
+        )
+
+
+class RollingStore:
+    """
+    디바이스별 DeviceWindow 모음 + id 워터마크
+    get_threshold / get_baseline 은 ModelStore 메서드를 그대로 넘김
+    """
+
+    def __init__(
+        self,
+        retention_hours: int,
+        z_thr: float,
+        get_threshold: Callable[[str], float],
+        get_baseline: Callable[[str], Optional[Dict[str, Any]]],
+        max_lag_sec: float = 30.0,
+    ):
+        self.retention_hours = retention_hours
+        self.z_thr = z_thr
+        self.get_threshold = get_threshold
+        self.get_baseline = get_baseline
+        self.max_lag_sec = max_lag_sec
+        self.devices: Dict[str, DeviceWindow] = {}
+        self.watermark_id = 0
+        self.pending_ids = np.zeros(0, dtype=np.int64)  # 워터마크 아래인데 아직 못 본 id
+        self.ready = False
+        self.last_sync = 0.0  # time.monotonic()
+
+    @property
+    def enabled(self) -> bool:
+        return self.retention_hours > 0
+
+    def covers(self, hours: int) -> bool:
+        """최근 동기화가 살아 있고 보존 기간 안의 윈도우면 메모리에서 응답 가능"""
+        return (
+            self.enabled
+            and self.ready
+            and hours <= self.retention_hours
+            and time.monotonic() - self.last_sync <= self.max_lag_sec
+        )
+
+    def ingest(self, df: pd.DataFrame) -> int:
+        """id 포함 DataFrame을 디바이스별로 붙이고 워터마크 갱신. 반환: 반영한 행 수"""
+        self.last_sync = time.monotonic()
+        if df.empty:
+            return 0
+
+        for mac, w in prepare_windows(df).items():
+            dev = self.devices.get(mac)
+            if dev is None:
+                dev = self.devices[mac] = DeviceWindow()
+            dev.append(w, self.get_threshold(mac), self.get_baseline(mac), self.z_thr)
+
+        ids = df["id"].to_numpy(dtype=np.int64)
+        self.pending_ids = update_pending_ids(self.watermark_id, ids, self.pending_ids)
+        self.watermark_id = max(self.watermark_id, int(ids.max()))
+        self.trim()
+        return len(df)
+
+    def trim(self, now: Optional[datetime] = None) -> None:
+        cutoff = np.datetime64((now or datetime.now()) - timedelta(hours=self.retention_hours), "ns")
+        for mac in list(self.devices):
+            dev = self.devices[mac]
+            dev.trim(cutoff)
+            if not len(dev):
+                del self.devices[mac]
+
+    def rebuild(self) -> None:
+        """모델(threshold/baseline) 교체 후 파생 값 재계산"""
+        t0 = time.perf_counter()
+        for mac, dev in self.devices.items():
+            dev.rebuild(self.get_threshold(mac), self.get_baseline(mac), self.z_thr)
+        logger.info(f"[ROLLING] rebuilt {len(self.devices)} devices ({(time.perf_counter() - t0) * 1000:.1f}ms)")
+
+    def window(self, mac: str, start: datetime) -> Optional[WindowArrays]:
+        dev = self.devices.get(mac)
+        return dev.window(np.datetime64(start, "ns")) if dev else None
+
+    def standby_wh(self, mac: str, start: datetime, voltage: float) -> float:
+        dev = self.devices.get(mac)
+        if dev is None:
+            return 0.0
+        return max(0.0, voltage * dev.standby_amp_seconds(np.datetime64(start, "ns")) / 3600.0)
+
+    def anomaly_count(self, mac: str, start: datetime) -> int:
+        dev = self.devices.get(mac)
+        return dev.anomaly_count(np.datetime64(start, "ns")) if dev else 0
+
+    def anomalies(self, mac: str, start: datetime, z_thr: float) -> List[Dict[str, Any]]:
+        """z_thr가 유지 중인 값과 같으면 hit 배열을, 아니면 메모리 윈도우로 다시 계산"""
+        dev = self.devices.get(mac)
+        if dev is None:
+            return []
+        start64 = np.datetime64(start, "ns")
+        baseline = self.get_baseline(mac)
+        if z_thr != self.z_thr or not baseline:
+            return anomalies_from_window(dev.window(start64), baseline, z_thr=z_thr)
+
+        idx = dev.hit_indices(start64)
+        amp = dev.amp[idx].astype(np.float64)
+        med = float(baseline.get("amp_median", 0.0))
+        z = (amp - med) / robust_denominator(float(baseline.get("amp_mad", 0.0)))
+        return _records(dev.ts[idx], amp, z, z_thr)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "ready": self.ready,
+            "retention_hours": self.retention_hours,
+            "devices": len(self.devices),
+            "samples": sum(len(d) for d in self.devices.values()),
+            "watermark_id": self.watermark_id,
+            "pending_ids": len(self.pending_ids),
+            "lag_sec": round(time.monotonic() - self.last_sync, 1) if self.last_sync else None,
+        }
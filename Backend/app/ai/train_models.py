@@ -1,16 +1,34 @@
 # train_models.py
+"""
+train_models.py
+- 디바이스별 STANDBY/LOAD 임계값(Otsu)과 이상치 baseline(median/MAD) 학습
+- 디바이스 단위로 ProcessPoolExecutor에 나눠서, 각 워커가 자기 디바이스 행만 조회
+  → 메모리는 가장 큰 디바이스 1대분, 시간은 코어 수에 비례해 단축
+
+실행 예시)
+  cd Backend/app/ai
+  python train_models.py                 # 최근 14일, CPU 수만큼 병렬
+  python train_models.py --days 7 --workers 1
+  python train_models.py --source local  # local_store.py 로 받아 둔 ai/data/ 캐시로 학습 (DB 조회 없음)
+"""
+import argparse
 import asyncio
 import json
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from datetime import datetime, timedelta
 
 import numpy as np
-import pandas as pd
 from dotenv import load_dotenv
 
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from analytics import factorize, relay_on_mask
+from columnar import build_select, copy_frame
+from local_store import DEFAULT_DATA_DIR, LocalStore
 
 
 def load_env() -> Path | None:
@@ -57,7 +75,12 @@ def otsu_threshold(values: np.ndarray, nbins: int = 128) -> float:
         return float(np.nan)
 
     hist, bin_edges = np.histogram(values, bins=nbins, range=(vmin, vmax))
-    hist = hist.astype(np.float64)
+    return otsu_from_bins(hist, bin_edges)
+
+
+def otsu_from_bins(hist: np.ndarray, bin_edges: np.ndarray) -> float:
+    """[min, max] 선형 구간 히스토그램 → 클래스 간 분산이 최대인 구간의 중심"""
+    hist = np.asarray(hist, dtype=np.float64)
 
     prob = hist / (hist.sum() + 1e-12)
     omega = np.cumsum(prob)
@@ -80,86 +103,199 @@ def robust_baseline(values: np.ndarray):
     return {"median": med, "mad": mad}
 
 
-async def fetch_devices(days: int = 14) -> pd.DataFrame:
-    db_url = get_db_url()
-    start_ts = datetime.now() - timedelta(days=days)
+def fit_device(amps: np.ndarray, device_name: str) -> tuple[dict, dict | None]:
+    """relay on 구간 energy_amp 배열 → (threshold 항목, baseline 항목 또는 None)"""
+    thr = otsu_threshold(amps)
+    if not np.isfinite(thr):
+        thr = float(np.nanmedian(amps)) if len(amps) else 0.05
 
-    print(f"📌 fetch_devices() start | days={days} | start_ts={start_ts}", flush=True)
+    thr_item = {
+        "device_name": device_name,
+        "standby_load_threshold_amp": float(thr),
+    }
 
+    base = robust_baseline(amps)
+    base_item = None
+    if base:
+        base_item = {
+            "device_name": device_name,
+            "amp_median": base["median"],
+            "amp_mad": base["mad"],
+        }
+    return thr_item, base_item
+
+
+def make_engine(db_url: str, pool_size: int = 5):
     # ✅ 연결/쿼리 타임아웃(멈춤 방지)
     # - timeout: 커넥션 타임아웃(초)
     # - command_timeout: 쿼리 실행 타임아웃(초)
-    engine = create_async_engine(
+    return create_async_engine(
         db_url,
         echo=False,
         pool_pre_ping=True,
+        pool_size=pool_size,
+        max_overflow=0,
         connect_args={"timeout": 10, "command_timeout": 60},
     )
-    SessionLocal = async_sessionmaker(engine, expire_on_commit=False)
 
-    sql = """
-    SELECT device_mac, device_name, temperature, humidity, energy_amp, relay_status, "timestamp"
-    FROM public.devices
-    WHERE "timestamp" >= :start_ts
-    ORDER BY "timestamp" ASC
-    """
 
-    try:
-        async with SessionLocal() as session:
-            res = await session.execute(text(sql), {"start_ts": start_ts})
-            rows = res.fetchall()
-            cols = res.keys()
-    finally:
-        await engine.dispose()
+async def fetch_device_macs(engine, start_ts: datetime) -> list[str]:
+    """학습 대상 디바이스 목록 (기간 내 데이터가 있는 MAC)"""
+    sql = 'SELECT DISTINCT device_mac FROM public.devices WHERE "timestamp" >= :start_ts AND device_mac IS NOT NULL'
+    async with engine.connect() as conn:
+        res = await conn.execute(text(sql), {"start_ts": start_ts})
+        return sorted(r[0] for r in res.fetchall())
 
-    df = pd.DataFrame(rows, columns=cols)
-    print(f"✅ fetch_devices() done | rows={len(df)}", flush=True)
-    return df
 
+# 임계값/중앙값이 float64 기준 결과와 같도록 (export_devices.EXPORT_DTYPES / local_store.SYNC_DTYPES 와 동일)
+FIT_DTYPES = {"energy_amp": "float64"}
 
-async def main():
-    print("🚀 train_models.py start", flush=True)
 
-    # 혹시라도 “중간에 멈춤”이면 여기서 걸림 → 로그로 확인 가능
-    df = await fetch_devices(days=14)
+async def fetch_device_rows(engine, mac: str, start_ts: datetime) -> tuple[np.ndarray, str]:
+    """디바이스 1대의 relay on 구간 energy_amp(float64)와 최신 device_name(NULL 제외, 없으면 "")만 조회"""
+    amp_sql = build_select(
+        ["energy_amp"],
+        where="device_mac = $1 AND \"timestamp\" >= $2 AND lower(relay_status) = 'on'",
+        order_by="",
+    )
+    name_sql = build_select(
+        ["device_name"],
+        where='device_mac = $1 AND "timestamp" >= $2 AND device_name IS NOT NULL',
+        order_by='"timestamp" DESC',
+        limit=1,
+    )
+    async with engine.connect() as conn:
+        amp_df = await copy_frame(conn, amp_sql, [mac, start_ts], ["energy_amp"], FIT_DTYPES)
+        name_df = await copy_frame(conn, name_sql, [mac, start_ts], ["device_name"])
 
-    if df.empty:
-        raise SystemExit("❌ 학습할 데이터가 없음(최근 14일).")
+    names = name_df["device_name"].dropna()
+    device_name = str(names.iloc[0]) if len(names) else ""
+    return amp_df["energy_amp"].to_numpy(dtype=np.float64), device_name
 
-    print(f"📊 raw df shape = {df.shape}", flush=True)
 
-    # 타입 정리
-    df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce")
-    df["relay_status"] = df["relay_status"].astype(str).str.lower()
+# -----------------------
+# 워커 프로세스 (디바이스 단위로 자기 데이터만 조회해서 학습)
+# -----------------------
+_worker_loop: asyncio.AbstractEventLoop | None = None
+_worker_engine = None
 
-    thresholds = {}
-    baselines = {}
 
-    unique_devices = df["device_mac"].nunique(dropna=True)
-    print(f"🔎 unique device_mac = {unique_devices}", flush=True)
+def _init_worker(db_url: str) -> None:
+    global _worker_loop, _worker_engine
+    _worker_loop = asyncio.new_event_loop()
+    _worker_engine = make_engine(db_url, pool_size=1)
 
-    for mac, g in df.groupby("device_mac"):
-        g_on = g[g["relay_status"] == "on"].copy()
-        amps = g_on["energy_amp"].astype(float).to_numpy()
 
-        thr = otsu_threshold(amps)
-        if not np.isfinite(thr):
-            thr = float(np.nanmedian(amps)) if len(amps) else 0.05
+def _train_one(mac: str, start_ts: datetime) -> tuple[str, dict, dict | None, int]:
+    amps, device_name = _worker_loop.run_until_complete(fetch_device_rows(_worker_engine, mac, start_ts))
+    thr_item, base_item = fit_device(amps, device_name)
+    return mac, thr_item, base_item, len(amps)
 
-        device_name = str(g["device_name"].iloc[-1]) if len(g) else ""
 
-        thresholds[mac] = {
-            "device_name": device_name,
-            "standby_load_threshold_amp": float(thr),
-        }
+async def train_serial(db_url: str, macs: list[str], start_ts: datetime) -> list[tuple[str, dict, dict | None, int]]:
+    engine = make_engine(db_url)
+    try:
+        out = []
+        for mac in macs:
+            amps, device_name = await fetch_device_rows(engine, mac, start_ts)
+            out.append((mac, *fit_device(amps, device_name), len(amps)))
+        return out
+    finally:
+        await engine.dispose()
+
+
+def train_parallel(db_url: str, macs: list[str], start_ts: datetime, workers: int) -> list[tuple[str, dict, dict | None, int]]:
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(db_url,)) as pool:
+        futures = [pool.submit(_train_one, mac, start_ts) for mac in macs]
+        return [f.result() for f in futures]
+
+
+def train_local(store: LocalStore, start_ts: datetime) -> list[tuple[str, dict, dict | None, int]]:
+    """로컬 캐시(memmap)에서 한 번에 읽어 디바이스별로 학습"""
+    df = store.read(start_ts, columns=["device_mac", "device_name", "relay_status", "energy_amp", "timestamp"])
+    codes, macs = factorize(df["device_mac"])
+    ts = df["timestamp"].to_numpy(dtype="datetime64[us]")
+    amp = df["energy_amp"].to_numpy(dtype=np.float64)
+    on = relay_on_mask(df["relay_status"])
+    names = df["device_name"].to_numpy(dtype=object)
+    named = df["device_name"].notna().to_numpy()
+
+    # (디바이스, timestamp) 순 정렬 → 디바이스별 연속 구간, 구간 안의 마지막 이름이 최신 이름
+    order = np.flatnonzero(codes >= 0)
+    order = order[np.lexsort((ts[order], codes[order]))]
+    groups, starts = np.unique(codes[order], return_index=True)
+    bounds = list(starts[1:]) + [len(order)]
 
-        base = robust_baseline(amps)
-        if base:
-            baselines[mac] = {
-                "device_name": device_name,
-                "amp_median": base["median"],
-                "amp_mad": base["mad"],
-            }
+    results = []
+    for code, lo, hi in zip(groups.tolist(), starts.tolist(), bounds):
+        idx = order[lo:hi]
+        amps = amp[idx][on[idx]]
+        named_idx = idx[named[idx]]
+        device_name = str(names[named_idx[-1]]) if len(named_idx) else ""
+        results.append((str(macs[code]), *fit_device(amps, device_name), len(amps)))
+    return sorted(results, key=lambda r: r[0])
+
+
+def parse_args():
+    p = argparse.ArgumentParser()
+    p.add_argument("--days", type=int, default=14, help="최근 N일 데이터로 학습")
+    p.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="병렬 프로세스 수 (1이면 현재 프로세스에서 순차 처리)")
+    p.add_argument("--source", choices=["db", "local"], default="db", help="db: Postgres 조회 / local: ai/data/ 캐시")
+    p.add_argument("--data-dir", type=str, default=str(DEFAULT_DATA_DIR), help="--source local 캐시 폴더")
+    return p.parse_args()
+
+
+async def main():
+    args = parse_args()
+    print(f"🚀 train_models.py start | days={args.days} workers={args.workers} source={args.source}", flush=True)
+
+    start_ts = datetime.now() - timedelta(days=args.days)
+
+    if args.source == "local":
+        store = LocalStore(Path(args.data_dir))
+        if not store.covers(start_ts):
+            raise SystemExit(
+                f"❌ 로컬 캐시가 최근 {args.days}일을 덮지 않음: {store.stats()}\n"
+                f"   python local_store.py --days {args.days} 로 먼저 동기화하세요."
+            )
+        print(f"💾 local cache: rows={store.rows} watermark_id={store.watermark_id} synced_at={store.meta['synced_at']}", flush=True)
+        t0 = time.perf_counter()
+        results = train_local(store, start_ts)
+        macs = [r[0] for r in results]
+        if not macs:
+            raise SystemExit(f"❌ 학습할 데이터가 없음(최근 {args.days}일).")
+    else:
+        db_url = get_db_url()
+        engine = make_engine(db_url, pool_size=1)
+        try:
+            macs = await fetch_device_macs(engine, start_ts)
+        finally:
+            await engine.dispose()
+
+        if not macs:
+            raise SystemExit(f"❌ 학습할 데이터가 없음(최근 {args.days}일).")
+
+        print(f"🔎 unique device_mac = {len(macs)}", flush=True)
+
+        # 디바이스 단위로 나눠서 학습 → 메모리는 가장 큰 디바이스 1대분만 사용
+        t0 = time.perf_counter()
+        workers = max(1, min(args.workers, len(macs)))
+        if workers == 1:
+            results = await train_serial(db_url, macs, start_ts)
+        else:
+            loop = asyncio.get_running_loop()
+            results = await loop.run_in_executor(None, train_parallel, db_url, macs, start_ts, workers)
+
+    thresholds = {}
+    baselines = {}
+    total_rows = 0
+    for mac, thr_item, base_item, n_rows in results:
+        thresholds[mac] = thr_item
+        if base_item:
+            baselines[mac] = base_item
+        total_rows += n_rows
+
+    print(f"📊 trained {len(macs)} devices from {total_rows} relay-on rows ({time.perf_counter() - t0:.1f}s)", flush=True)
 
     out_dir = Path(__file__).resolve().parent / "models"
     out_dir.mkdir(parents=True, exist_ok=True)
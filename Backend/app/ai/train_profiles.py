@@ -12,20 +12,35 @@ train_profiles.py
 
   # 최근 N일 DB에서 가져와 학습 (DATABASE_URL 필요)
   python train_profiles.py --from-db --days 14 --out models/profiles.json
+
+  # local_store.py 로 받아 둔 ai/data/ 캐시로 학습 (DB 조회 없음)
+  python train_profiles.py --from-local --days 14 --out models/profiles.json
 """
 
 import argparse
 import asyncio
 import json
 import os
+from dataclasses import dataclass
 from pathlib import Path
 from datetime import datetime, timedelta
+from typing import List
 
 import numpy as np
 import pandas as pd
 from dotenv import load_dotenv
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
-from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from analytics import _timestamps, factorize, relay_on_mask
+from columnar import DEVICE_COLUMNS, build_select, copy_frame
+from local_store import DEFAULT_DATA_DIR, LocalStore
+
+CELLS = 7 * 24
+DEFAULT_POLICY = {
+    "usually_off_onrate_lt": 0.20,      # 이보다 on_rate 낮으면 '평소 OFF 시간대'로 판단
+    "standby_minutes_ge": 30,           # standby가 이 이상이면 의심
+    "waste_wh_ge": 10.0,                # 낭비(Wh)가 이 이상이면 의심
+}
 
 
 # -----------------------
@@ -71,28 +86,129 @@ def load_from_csv(csv_path: str) -> pd.DataFrame:
 async def load_from_db(days: int = 14) -> pd.DataFrame:
     db_url = get_db_url()
     engine = create_async_engine(db_url, echo=False, pool_pre_ping=True)
-    SessionLocal = async_sessionmaker(engine, expire_on_commit=False)
 
     start_ts = datetime.now() - timedelta(days=days)
-    sql = """
-    SELECT device_mac, device_name, relay_status, energy_amp, temperature, humidity, "timestamp"
-    FROM public.devices
-    WHERE "timestamp" >= :start_ts
-    ORDER BY "timestamp" ASC
-    """
+    sql = build_select(DEVICE_COLUMNS, where='"timestamp" >= $1')
 
-    async with SessionLocal() as session:
-        res = await session.execute(text(sql), {"start_ts": start_ts})
-        rows = res.fetchall()
-        cols = res.keys()
+    # COPY → 타입 지정 컬럼으로 바로 디코딩 (Row 객체 생성 없음)
+    try:
+        async with engine.connect() as conn:
+            return await copy_frame(conn, sql, [start_ts], DEVICE_COLUMNS)
+    finally:
+        await engine.dispose()
 
-    await engine.dispose()
-    return pd.DataFrame(rows, columns=cols)
+
+def load_from_local(days: int = 14, data_dir: str = str(DEFAULT_DATA_DIR)) -> pd.DataFrame:
+    store = LocalStore(Path(data_dir))
+    start_ts = datetime.now() - timedelta(days=days)
+    if not store.covers(start_ts):
+        raise SystemExit(
+            f"❌ 로컬 캐시가 최근 {days}일을 덮지 않음: {store.stats()}\n"
+            f"   python local_store.py --days {days} 로 먼저 동기화하세요."
+        )
+    return store.read(start_ts, columns=DEVICE_COLUMNS)
 
 
 # -----------------------
 # 핵심: 프로파일 생성
 # -----------------------
+@dataclass
+class ProfileArrays:
+    """디바이스 × 요일(0=Mon) × 시간 dense 배열"""
+    macs: List[str]
+    device_names: List[str]
+    on_rate: np.ndarray        # (N, 7, 24) float64
+    amp_median_on: np.ndarray  # (N, 7, 24) float64
+    sample_cnt: np.ndarray     # (N, 7, 24) int64
+
+
+def build_profile_arrays(df: pd.DataFrame) -> ProfileArrays:
+    """
+    (device, dow, hour) 셀 번호 하나로 묶어서 bincount / 정렬 한 번으로 집계
+      - sample_cnt    : 셀별 샘플 수
+      - on_rate       : 셀별 relay_status=on 비율
+      - amp_median_on : 셀별 on 샘플 energy_amp 중앙값 (정렬 후 가운데 값)
+                        energy_amp 가 NULL 인 on 샘플은 on_rate 에만 세고 중앙값에서는 뺌
+                        (0A 로 채우면 중앙값이 내려감, train_models.fit_device 와 같은 기준)
+    """
+    codes, uniques = factorize(df["device_mac"])
+    ts = _timestamps(df["timestamp"])
+    amp = pd.to_numeric(df["energy_amp"], errors="coerce").to_numpy(dtype=np.float64)
+    is_on = relay_on_mask(df["relay_status"])
+
+    valid = (codes >= 0) & ~np.isnat(ts)
+    n_dev = len(uniques)
+    n_cells = n_dev * CELLS
+
+    hours = ts[valid].astype("datetime64[h]").astype(np.int64)
+    days = np.floor_divide(hours, 24)
+    dow = (days + 3) % 7  # 1970-01-01 = 목요일 → 월요일 0
+    cell = codes[valid].astype(np.int64) * CELLS + dow * 24 + (hours - days * 24)
+    on = is_on[valid]
+
+    sample_cnt = np.bincount(cell, minlength=n_cells)
+    on_cnt = np.bincount(cell[on], minlength=n_cells)
+    on_rate = np.divide(on_cnt, sample_cnt, out=np.zeros(n_cells), where=sample_cnt > 0)
+
+    # on 샘플을 (셀, amp) 순으로 정렬하면 셀마다 연속 구간 → 가운데 두 값 평균이 중앙값
+    # (lexsort 대신 amp 순위를 붙인 정수 키 하나로 정렬하는 편이 몇 배 빠름)
+    measured = on & np.isfinite(amp[valid])
+    amp_cnt = np.bincount(cell[measured], minlength=n_cells)
+    on_cell = cell[measured]
+    on_amp = amp[valid][measured]
+    n_on = len(on_amp)
+    rank = np.empty(n_on, dtype=np.int64)
+    rank[np.argsort(on_amp)] = np.arange(n_on)
+    order = np.argsort(on_cell * n_on + rank)
+    sorted_amp = on_amp[order]
+    ends = np.cumsum(amp_cnt)
+    starts = ends - amp_cnt
+    has_on = amp_cnt > 0
+    lo = starts[has_on] + (amp_cnt[has_on] - 1) // 2
+    hi = starts[has_on] + amp_cnt[has_on] // 2
+    amp_median_on = np.zeros(n_cells)
+    amp_median_on[has_on] = (sorted_amp[lo] + sorted_amp[hi]) / 2.0
+
+    # 디바이스별 마지막(가장 뒤 행) device_name
+    names = df["device_name"]
+    named = np.flatnonzero(valid & names.notna().to_numpy())
+    last_row = np.full(n_dev, -1, dtype=np.int64)
+    np.maximum.at(last_row, codes[named], named)
+    name_values = names.to_numpy(dtype=object)
+    device_names = [str(name_values[i]) if i >= 0 else "" for i in last_row]
+
+    shape = (n_dev, 7, 24)
+    return ProfileArrays(
+        macs=[str(m) for m in uniques],
+        device_names=device_names,
+        on_rate=on_rate.reshape(shape),
+        amp_median_on=amp_median_on.reshape(shape),
+        sample_cnt=sample_cnt.reshape(shape),
+    )
+
+
+def profiles_from_arrays(arrays: ProfileArrays) -> dict:
+    """dense 배열 → profiles.json 형식 (샘플이 없는 디바이스는 제외, MAC 순)"""
+    generated_at = datetime.now().isoformat()
+    totals = arrays.sample_cnt.sum(axis=(1, 2))
+
+    profiles = {}
+    for i in sorted(range(len(arrays.macs)), key=lambda k: arrays.macs[k]):
+        if totals[i] == 0:
+            continue
+        profiles[arrays.macs[i]] = {
+            "device_name": arrays.device_names[i],
+            "schema": "dow_hour_profile_v1",
+            "generated_at": generated_at,
+            "on_rate": arrays.on_rate[i].tolist(),
+            "amp_median_on": arrays.amp_median_on[i].tolist(),
+            "sample_cnt": arrays.sample_cnt[i].tolist(),
+            # 추천에 쓰는 기본 정책값(원하면 나중에 기기별로 튜닝 가능)
+            "policy": dict(DEFAULT_POLICY),
+        }
+    return profiles
+
+
 def build_profiles(df: pd.DataFrame) -> dict:
     """
     각 device_mac별로
@@ -102,58 +218,7 @@ def build_profiles(df: pd.DataFrame) -> dict:
 
     나중에 "평소 OFF인 시간대인데 지금 STANDBY로 오래 유지" 같은 판단 근거로 씀.
     """
-    d = df.copy()
-
-    d["timestamp"] = pd.to_datetime(d["timestamp"], errors="coerce")
-    d = d.dropna(subset=["timestamp"])
-
-    d["relay_status"] = d["relay_status"].astype(str).str.lower()
-    d["energy_amp"] = pd.to_numeric(d["energy_amp"], errors="coerce").fillna(0.0)
-
-    d["dow"] = d["timestamp"].dt.dayofweek  # 0=Mon ... 6=Sun
-    d["hour"] = d["timestamp"].dt.hour
-
-    profiles = {}
-
-    for mac, g in d.groupby("device_mac"):
-        device_name = str(g["device_name"].dropna().iloc[-1]) if len(g["device_name"].dropna()) else ""
-
-        # 7x24 init
-        on_rate = [[0.0 for _ in range(24)] for _ in range(7)]
-        amp_median_on = [[0.0 for _ in range(24)] for _ in range(7)]
-        sample_cnt = [[0 for _ in range(24)] for _ in range(7)]
-
-        # 그룹핑(요일/시간대)
-        for (dow, hour), gh in g.groupby(["dow", "hour"]):
-            dow = int(dow)
-            hour = int(hour)
-
-            sample_cnt[dow][hour] = int(len(gh))
-            on_mask = (gh["relay_status"] == "on")
-            on_rate[dow][hour] = float(on_mask.mean()) if len(gh) else 0.0
-
-            if on_mask.any():
-                amps = gh.loc[on_mask, "energy_amp"].to_numpy(dtype=float)
-                amp_median_on[dow][hour] = float(np.median(amps))
-            else:
-                amp_median_on[dow][hour] = 0.0
-
-        profiles[mac] = {
-            "device_name": device_name,
-            "schema": "dow_hour_profile_v1",
-            "generated_at": datetime.now().isoformat(),
-            "on_rate": on_rate,
-            "amp_median_on": amp_median_on,
-            "sample_cnt": sample_cnt,
-            # 추천에 쓰는 기본 정책값(원하면 나중에 기기별로 튜닝 가능)
-            "policy": {
-                "usually_off_onrate_lt": 0.20,      # 이보다 on_rate 낮으면 '평소 OFF 시간대'로 판단
-                "standby_minutes_ge": 30,           # standby가 이 이상이면 의심
-                "waste_wh_ge": 10.0,                # 낭비(Wh)가 이 이상이면 의심
-            },
-        }
-
-    return profiles
+    return profiles_from_arrays(build_profile_arrays(df))
 
 
 def save_json(obj: dict, out_path: str):
@@ -173,7 +238,9 @@ def parse_args():
     p.add_argument("--input", type=str, default="dummy_devices.csv", help="CSV 입력 파일")
     p.add_argument("--out", type=str, default="models/profiles.json", help="저장 파일")
     p.add_argument("--from-db", action="store_true", help="DB에서 최근 데이터로 학습")
-    p.add_argument("--days", type=int, default=14, help="DB 학습 시 최근 N일")
+    p.add_argument("--from-local", action="store_true", help="ai/data/ 로컬 캐시에서 최근 데이터로 학습")
+    p.add_argument("--data-dir", type=str, default=str(DEFAULT_DATA_DIR), help="--from-local 캐시 폴더")
+    p.add_argument("--days", type=int, default=14, help="DB/로컬 캐시 학습 시 최근 N일")
     return p.parse_args()
 
 
@@ -183,6 +250,9 @@ async def main():
     if args.from_db:
         df = await load_from_db(days=args.days)
         src = f"DB(last {args.days} days)"
+    elif args.from_local:
+        df = load_from_local(days=args.days, data_dir=args.data_dir)
+        src = f"local cache(last {args.days} days)"
     else:
         df = load_from_csv(args.input)
         src = f"CSV({args.input})"
@@ -1,26 +1,28 @@
 """
 AI 전력 분석 API 라우터
 외부 AI API에서 이상치/대기전력 데이터를 받아 OpenAI로 분석합니다.
+OpenAI 호출은 openai_service(공유 클라이언트 + 내용 해시 캐시 + 동시 요청 합치기)를 거치고,
+AI 서버 종합 분석은 백그라운드에서 주기적으로 미리 계산해 둡니다.
 """
 
+import asyncio
 import logging
-from typing import List, Optional
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
 from datetime import datetime, timedelta
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy import select, func
 from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 import httpx
 
-from app.database import get_db
+from app.database import get_db, async_session
 from app.models.device import Device
 from app.config import get_settings
-
-try:
-    from openai import AsyncOpenAI
-except ImportError:
-    AsyncOpenAI = None
+from app.services.ai_auto_control_service import get_ai_http_client
+from app.services.openai_service import AsyncOpenAI, chat_completion, get_openai_metrics
 
 router = APIRouter(prefix="/api/ai", tags=["AI 분석"])
 logger = logging.getLogger(__name__)
@@ -104,73 +106,80 @@ async def get_ai_report_data(db: AsyncSession) -> AIReportData:
 
 
 async def detect_anomalies(db: AsyncSession) -> List[AnomalyDevice]:
-    """이상치 탐지: 최근 24시간 데이터에서 급격한 전류 변화 감지"""
-    anomalies = []
-    
+    """
+    이상치 탐지: 최근 24시간 데이터에서 급격한 전류 변화 감지
+    디바이스별 평균/표준편차(윈도우 함수)와 3σ 초과 최신 5건(row_number)을 쿼리 1번으로 조회
+    (idx_devices_mac_timestamp 인덱스 사용)
+    """
     # 최근 24시간 데이터 조회
     since = datetime.now() - timedelta(hours=24)
-    
-    # 디바이스별 평균 전류 계산
-    result = await db.execute(
+
+    # 1) 최근 샘플마다 같은 디바이스의 평균/표준편차를 붙임
+    recent = (
         select(
             Device.device_mac,
-            func.avg(Device.energy_amp).label('avg_amp'),
-            func.stddev(Device.energy_amp).label('stddev_amp'),
-            func.max(Device.energy_amp).label('max_amp'),
+            Device.device_name,
+            Device.energy_amp,
+            Device.timestamp,
+            func.avg(Device.energy_amp).over(partition_by=Device.device_mac).label("avg_amp"),
+            func.stddev(Device.energy_amp).over(partition_by=Device.device_mac).label("stddev_amp"),
         )
         .where(
             Device.timestamp >= since,
             Device.energy_amp.isnot(None),
             Device.energy_amp > 0
         )
-        .group_by(Device.device_mac)
+        .subquery("recent")
     )
-    
-    device_stats = result.all()
-    
-    # 각 디바이스에서 이상치 찾기
-    for mac, avg_amp, stddev_amp, max_amp in device_stats:
-        if not stddev_amp or stddev_amp == 0:
-            continue
-        
-        # 최근 데이터에서 3σ 이상 벗어난 값 찾기
-        threshold = avg_amp + (3 * stddev_amp)
-        
-        anomaly_result = await db.execute(
-            select(Device)
-            .where(
-                Device.device_mac == mac,
-                Device.timestamp >= since,
-                Device.energy_amp > threshold
-            )
-            .order_by(Device.timestamp.desc())
-            .limit(5)
+
+    # 2) 3σ 이상 벗어난 샘플에 디바이스별 최신순 번호
+    outliers = (
+        select(
+            recent,
+            func.row_number().over(
+                partition_by=recent.c.device_mac,
+                order_by=recent.c.timestamp.desc(),
+            ).label("rn"),
         )
-        
-        anomaly_records = anomaly_result.scalars().all()
-        
-        for record in anomaly_records:
-            deviation = ((record.energy_amp - avg_amp) / avg_amp) * 100
-            
-            # 심각도 판단
-            if deviation > 200:
-                severity = "high"
-            elif deviation > 100:
-                severity = "medium"
-            else:
-                severity = "low"
-            
-            anomalies.append(AnomalyDevice(
-                device_mac=record.device_mac,
-                device_name=record.device_name or "Unknown",
-                timestamp=record.timestamp,
-                current_amp=round(record.energy_amp, 2),
-                expected_amp=round(avg_amp, 2),
-                deviation_percent=round(deviation, 1),
-                severity=severity
-            ))
-    
-    return anomalies[:10]  # 상위 10개만 반환
+        .where(
+            recent.c.stddev_amp > 0,
+            recent.c.energy_amp > recent.c.avg_amp + 3 * recent.c.stddev_amp
+        )
+        .subquery("outliers")
+    )
+
+    # 3) 디바이스별 최신 5건, 전체 상위 10개
+    result = await db.execute(
+        select(outliers)
+        .where(outliers.c.rn <= 5)
+        .order_by(outliers.c.device_mac, outliers.c.rn)
+        .limit(10)
+    )
+
+    anomalies = []
+    for record in result.all():
+        avg_amp = record.avg_amp
+        deviation = ((record.energy_amp - avg_amp) / avg_amp) * 100
+
+        # 심각도 판단
+        if deviation > 200:
+            severity = "high"
+        elif deviation > 100:
+            severity = "medium"
+        else:
+            severity = "low"
+
+        anomalies.append(AnomalyDevice(
+            device_mac=record.device_mac,
+            device_name=record.device_name or "Unknown",
+            timestamp=record.timestamp,
+            current_amp=round(record.energy_amp, 2),
+            expected_amp=round(avg_amp, 2),
+            deviation_percent=round(deviation, 1),
+            severity=severity
+        ))
+
+    return anomalies
 
 
 async def analyze_standby_power(db: AsyncSession) -> List[StandbyPowerDevice]:
@@ -244,8 +253,6 @@ async def analyze_with_openai(report_data: AIReportData) -> OpenAIAnalysisRespon
             detail="openai 패키지가 설치되지 않았습니다. pip install openai를 실행하세요."
         )
     
-    client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
-    
     # 프롬프트 생성
     prompt = f"""전력 사용 데이터를 간단히 요약해주세요.
 
@@ -259,8 +266,7 @@ async def analyze_with_openai(report_data: AIReportData) -> OpenAIAnalysisRespon
 마크다운 없이 자연스럽게 2-3문장으로 요약하고, 간단한 조언 2-3개, 절약 가능 금액을 알려주세요. 총 200자 이내로 짧게 작성하세요."""
 
     try:
-        response = await client.chat.completions.create(
-            model="gpt-4o-mini",
+        analysis_text = await chat_completion(
             messages=[
                 {
                     "role": "system",
@@ -279,8 +285,6 @@ async def analyze_with_openai(report_data: AIReportData) -> OpenAIAnalysisRespon
             max_tokens=500
         )
         
-        analysis_text = response.choices[0].message.content
-        
         # 응답 파싱 (구조화된 형태로 변환)
         return _parse_openai_response(analysis_text, report_data)
         
@@ -427,176 +431,304 @@ async def get_full_analysis_report(db: AsyncSession = Depends(get_db)):
     }
 
 
+@router.get("/auto-control/metrics", summary="AI 자동 제어 사이클 지표")
+async def get_auto_control_metrics():
+    """
+    AI 자동 제어 사이클의 실행/건너뜀 횟수, 마지막 소요 시간, 제어한 디바이스 수를 반환합니다.
+    """
+    from app.services.ai_auto_control_service import get_ai_auto_control_metrics
+    return get_ai_auto_control_metrics()
+
+
+@router.get("/openai/metrics", summary="OpenAI 호출/캐시 지표")
+async def get_openai_call_metrics():
+    """
+    OpenAI 실제 호출 수, 캐시 적중 수, 진행 중 호출 합류 수와 종합 분석 미리 계산 상태를 반환합니다.
+    """
+    return {
+        **get_openai_metrics(),
+        "summary_precompute": {
+            str(h): {"computed_at": computed_at.isoformat(), "age_sec": round(time.monotonic() - t, 1)}
+            for h, (t, computed_at, _) in _summary_cache.items()
+        },
+    }
+
+
+async def fetch_hourly_usage(
+    db: AsyncSession,
+    window_hours: int = 24,
+    bucket_hours: int = 3,
+) -> List[Dict[str, Any]]:
+    """
+    최근 window_hours를 bucket_hours 간격으로 나눈 평균 전력(kWh) 목록
+    버킷 번호 = floor((timestamp - since) / bucket) 로 GROUP BY 쿼리 1번에 모든 버킷을 조회
+    (date_bin(bucket, timestamp, since)과 같은 경계, PostgreSQL 14 미만에서도 동작)
+    """
+    since = datetime.now() - timedelta(hours=window_hours)
+    bucket_sec = bucket_hours * 3600
+    bucket_count = -(-window_hours // bucket_hours)
+
+    samples = (
+        select(
+            func.floor(
+                func.extract("epoch", Device.timestamp - since) / bucket_sec
+            ).label("bucket"),
+            Device.energy_amp,
+        )
+        .where(
+            Device.timestamp >= since,
+            Device.energy_amp.isnot(None),
+            Device.energy_amp > 0
+        )
+        .subquery("samples")
+    )
+    result = await db.execute(
+        select(samples.c.bucket, func.avg(samples.c.energy_amp).label("avg_amp"))
+        .group_by(samples.c.bucket)
+    )
+    avg_by_bucket = {int(row.bucket): row.avg_amp for row in result.all()}
+
+    hourly_usage = []
+    for i in range(bucket_count):
+        avg_amp = avg_by_bucket.get(i) or 0
+        avg_watt = avg_amp * 220  # A -> W
+        avg_kwh = round(avg_watt / 1000, 2)  # W -> kWh
+
+        hourly_usage.append({
+            "hour": str(i * bucket_hours),
+            "start": (since + timedelta(hours=i * bucket_hours)).isoformat(),
+            "value": avg_kwh
+        })
+
+    return hourly_usage
+
+
+# ==================== AI 서버 종합 분석 (미리 계산) ====================
+
+# hours → (계산 시각 monotonic, 계산 시각, 결과), 최근에 쓴 hours 순으로 최대 _SUMMARY_CACHE_MAX 개
+_SUMMARY_CACHE_MAX = 8
+_summary_cache: "OrderedDict[int, tuple]" = OrderedDict()
+_summary_inflight: Dict[int, asyncio.Future] = {}
+
+
+def _get_precomputed_summary(hours: int) -> Optional[Dict[str, Any]]:
+    """미리 계산된 결과가 갱신 주기 2배 안쪽으로 신선하면 반환"""
+    item = _summary_cache.get(hours)
+    if item is None or settings.AI_SUMMARY_REFRESH_SEC <= 0:
+        return None
+    computed_mono, _, result = item
+    if time.monotonic() - computed_mono > settings.AI_SUMMARY_REFRESH_SEC * 2:
+        return None
+    _summary_cache.move_to_end(hours)
+    return result
+
+
+async def _compute_summary(hours: int) -> Dict[str, Any]:
+    """
+    종합 분석을 계산해서 저장. 같은 hours 계산이 진행 중이면 그 결과를 함께 기다림
+    (요청 세션 대신 별도 세션 사용 → 백그라운드 작업과 요청이 같은 계산을 공유)
+    """
+    fut = _summary_inflight.get(hours)
+    if fut is None:
+        async def _run() -> Dict[str, Any]:
+            async with async_session() as db:
+                result = await build_ai_server_analysis(db, hours)
+            _summary_cache[hours] = (time.monotonic(), datetime.now(), result)
+            _summary_cache.move_to_end(hours)
+            while len(_summary_cache) > _SUMMARY_CACHE_MAX:
+                _summary_cache.popitem(last=False)
+            return result
+
+        fut = asyncio.ensure_future(_run())
+        _summary_inflight[hours] = fut
+        fut.add_done_callback(lambda _f: _summary_inflight.pop(hours, None))
+    return await asyncio.shield(fut)
+
+
+async def _ai_summary_precompute_loop():
+    hours = settings.AI_SUMMARY_HOURS
+    interval = settings.AI_SUMMARY_REFRESH_SEC
+    while True:
+        t0 = time.perf_counter()
+        try:
+            await _compute_summary(hours)
+            logger.info(f"[AI_SUMMARY] {hours}h 종합 분석 갱신 ({(time.perf_counter() - t0) * 1000:.0f}ms)")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            detail = e.detail if isinstance(e, HTTPException) else str(e)
+            logger.warning(f"[AI_SUMMARY] 종합 분석 갱신 실패: {detail}")
+        await asyncio.sleep(interval)
+
+
+def start_ai_summary_precompute() -> Optional[asyncio.Task]:
+    """AI 서버 종합 분석 미리 계산 백그라운드 태스크를 시작합니다 (주기 0이면 None)."""
+    if settings.AI_SUMMARY_REFRESH_SEC <= 0:
+        return None
+    return asyncio.create_task(_ai_summary_precompute_loop())
+
+
 @router.get("/analyze-ai-server", summary="AI 서버 리포트를 OpenAI로 분석")
-async def analyze_ai_server_report(hours: int = 24, db: AsyncSession = Depends(get_db)):
+async def analyze_ai_server_report(
+    hours: int = Query(default=24, ge=1, le=168, description="리포트 분석 범위 (시간)"),
+    refresh: bool = False,
+    window_hours: int = Query(default=24, ge=1, le=720, description="시간대별 사용량 조회 범위 (시간)"),
+    bucket_hours: int = Query(default=3, ge=1, le=24, description="시간대별 사용량 버킷 간격 (시간)"),
+    db: AsyncSession = Depends(get_db),
+):
     """
     외부 AI 서버에서 모든 디바이스의 리포트를 받아 OpenAI로 종합 분석을 생성합니다.
+    백그라운드에서 미리 계산된 결과가 있으면 바로 반환하고, refresh=true면 새로 계산합니다.
+    hourly_usage는 window_hours/bucket_hours가 기본값(24/3)이 아니면 해당 범위로 다시 집계합니다.
     """
     try:
-        ai_server_url = settings.AI_REPORT_URL or "http://iotcoss.nexcode.kr:8001"
-        
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            # 1. 모든 디바이스 목록 가져오기
-            devices_response = await client.get(f"{ai_server_url}/devices")
-            devices_response.raise_for_status()
-            devices_data = devices_response.json()
-            device_list = devices_data.get("items", [])
-            
-            if not device_list:
-                raise HTTPException(status_code=404, detail="디바이스를 찾을 수 없습니다")
-            
-            # 2. 각 디바이스별로 리포트 가져오기
-            all_reports = []
-            total_anomalies = 0
-            total_standby_wh = 0
-            
-            for device in device_list:
-                device_mac = device["device_mac"]
-                device_name = device.get("device_name", "Unknown")
-                
-                try:
-                    report_response = await client.get(
-                        f"{ai_server_url}/devices/{device_mac}/report",
-                        params={"hours": hours, "voltage": 220}
-                    )
-                    report_response.raise_for_status()
-                    report = report_response.json()
-                    
-                    all_reports.append({
-                        "device_mac": device_mac,
-                        "device_name": device_name,
-                        "anomaly_count": report["anomalies"]["count"],
-                        "standby_wh": report["waste"]["standby_wh"],
-                        "state": report["state_now"]["state"],
-                        "summary": report.get("summary", "")
-                    })
-                    
-                    total_anomalies += report["anomalies"]["count"]
-                    total_standby_wh += report["waste"]["standby_wh"]
-                    
-                except Exception as e:
-                    logger.warning(f"디바이스 {device_name}({device_mac}) 리포트 실패: {e}")
-                    continue
-        
-        if not all_reports:
-            raise HTTPException(status_code=404, detail="유효한 리포트를 가져올 수 없습니다")
-        
-        # 3. 시간대별 평균 전력 사용량 계산 (최근 24시간)
-        since = datetime.now() - timedelta(hours=24)
-        hourly_usage = []
-        
-        for hour in range(0, 24, 3):  # 3시간 간격
-            hour_start = since + timedelta(hours=hour)
-            hour_end = hour_start + timedelta(hours=3)
-            
-            result = await db.execute(
-                select(func.avg(Device.energy_amp))
-                .where(
-                    Device.timestamp >= hour_start,
-                    Device.timestamp < hour_end,
-                    Device.energy_amp.isnot(None),
-                    Device.energy_amp > 0
-                )
-            )
-            avg_amp = result.scalar() or 0
-            avg_watt = avg_amp * 220  # A -> W
-            avg_kwh = round(avg_watt / 1000, 2)  # W -> kWh
-            
-            hourly_usage.append({
-                "hour": str(hour),
-                "value": avg_kwh
+        summary = None if refresh else _get_precomputed_summary(hours)
+        if summary is None:
+            summary = await _compute_summary(hours)
+        if (window_hours, bucket_hours) != (24, 3):
+            summary = {
+                **summary,
+                "hourly_usage": await fetch_hourly_usage(db, window_hours, bucket_hours),
+            }
+        return summary
+    except HTTPException:
+        raise
+    except httpx.HTTPError as e:
+        logger.error(f"AI 서버 연결 실패: {e}")
+        raise HTTPException(
+            status_code=503,
+            detail=f"AI 서버에 연결할 수 없습니다: {str(e)}"
+        )
+    except Exception as e:
+        logger.error(f"분석 중 오류 발생: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"분석 중 오류가 발생했습니다: {str(e)}"
+        )
+
+
+async def build_ai_server_analysis(db: AsyncSession, hours: int = 24) -> Dict[str, Any]:
+    """
+    AI 서버 /reports + DB 집계 + OpenAI 분석을 묶은 종합 분석 결과
+    """
+    # 1. 전체 디바이스 리포트를 한 번에 가져오기 (AI 서버 /reports, 공유 클라이언트)
+    reports_response = await get_ai_http_client().get(
+        "/reports",
+        params={"hours": hours, "voltage": 220},
+        timeout=30.0,
+    )
+    reports_response.raise_for_status()
+    reports_data = reports_response.json()
+
+    report_list = reports_data.get("items", [])
+    if not report_list:
+        raise HTTPException(status_code=404, detail="디바이스를 찾을 수 없습니다")
+
+    # 2. 디바이스별 요약 정리
+    all_reports = []
+    total_anomalies = 0
+    total_standby_wh = 0
+
+    for report in report_list:
+        try:
+            all_reports.append({
+                "device_mac": report["device_mac"],
+                "device_name": report["state_now"].get("device_name") or "Unknown",
+                "anomaly_count": report["anomalies"]["count"],
+                "standby_wh": report["waste"]["standby_wh"],
+                "state": report["state_now"]["state"],
+                "summary": report.get("summary", "")
             })
-        
-        # 4. 상위 전력 소비 디바이스 계산 (최근 24시간)
-        result = await db.execute(
-            select(
-                Device.device_name,
-                func.sum(Device.energy_amp).label('total_amp')
-            )
-            .where(
-                Device.timestamp >= since,
-                Device.energy_amp.isnot(None),
-                Device.energy_amp > 0,
-                Device.device_name.isnot(None)
-            )
-            .group_by(Device.device_name)
-            .order_by(func.sum(Device.energy_amp).desc())
-            .limit(3)
+
+            total_anomalies += report["anomalies"]["count"]
+            total_standby_wh += report["waste"]["standby_wh"]
+
+        except (KeyError, TypeError) as e:
+            logger.warning(f"디바이스 {report.get('device_mac')} 리포트 형식 오류: {e}")
+            continue
+    
+    if not all_reports:
+        raise HTTPException(status_code=404, detail="유효한 리포트를 가져올 수 없습니다")
+    
+    # 3. 시간대별 평균 전력 사용량 계산 (최근 24시간, 3시간 간격)
+    since = datetime.now() - timedelta(hours=24)
+    hourly_usage = await fetch_hourly_usage(db)
+    
+    # 4. 상위 전력 소비 디바이스 계산 (최근 24시간)
+    result = await db.execute(
+        select(
+            Device.device_name,
+            func.sum(Device.energy_amp).label('total_amp')
         )
-        
-        top_devices_data = result.all()
-        total_amp = sum(d.total_amp for d in top_devices_data) or 1
-        
-        top_devices = [
-            {
-                "name": d.device_name,
-                "usage": round((d.total_amp / total_amp) * 100)  # 퍼센트로 표시
-            }
-            for d in top_devices_data
-        ]
-        
-        # 5. 종합 데이터를 AIReportData 형식으로 변환
-        all_anomalies = []
-        all_standby_devices = []
-        
-        for report_item in all_reports:
-            # 이상치가 있는 디바이스만 추가
-            if report_item["anomaly_count"] > 0:
-                all_anomalies.append(AnomalyDevice(
-                    device_mac=report_item["device_mac"],
-                    device_name=report_item["device_name"],
-                    timestamp=datetime.now(),
-                    current_amp=0,
-                    expected_amp=0,
-                    deviation_percent=0,
-                    severity="medium" if report_item["anomaly_count"] >= 10 else "low"
-                ))
-            
-            # 대기전력이 있는 디바이스 추가
-            if report_item["standby_wh"] > 0:
-                avg_standby_watts = report_item["standby_wh"] / hours
-                daily_waste_kwh = round((report_item["standby_wh"] * 24 / hours) / 1000, 3)
-                monthly_standby_kwh = round((report_item["standby_wh"] / hours) * 24 * 30 / 1000, 2)
-                monthly_cost = int(monthly_standby_kwh * 300)
-                
-                all_standby_devices.append(StandbyPowerDevice(
-                    device_mac=report_item["device_mac"],
-                    device_name=report_item["device_name"],
-                    avg_standby_power_watts=avg_standby_watts,
-                    daily_waste_kwh=daily_waste_kwh,
-                    monthly_waste_kwh=monthly_standby_kwh,
-                    monthly_waste_cost=monthly_cost
-                ))
-        
-        # 전체 통계
-        total_monthly_kwh = round((total_standby_wh / hours) * 24 * 30 / 1000, 2)
-        total_monthly_cost = int(total_monthly_kwh * 300)
-        
-        report_data = AIReportData(
-            anomalies=all_anomalies,
-            standby_power_devices=all_standby_devices,
-            total_anomaly_count=total_anomalies,
-            total_standby_waste_kwh=total_monthly_kwh,
-            total_standby_waste_cost=total_monthly_cost
+        .where(
+            Device.timestamp >= since,
+            Device.energy_amp.isnot(None),
+            Device.energy_amp > 0,
+            Device.device_name.isnot(None)
         )
+        .group_by(Device.device_name)
+        .order_by(func.sum(Device.energy_amp).desc())
+        .limit(3)
+    )
+    
+    top_devices_data = result.all()
+    total_amp = sum(d.total_amp for d in top_devices_data) or 1
+    
+    top_devices = [
+        {
+            "name": d.device_name,
+            "usage": round((d.total_amp / total_amp) * 100)  # 퍼센트로 표시
+        }
+        for d in top_devices_data
+    ]
+    
+    # 5. 종합 데이터를 AIReportData 형식으로 변환
+    all_anomalies = []
+    all_standby_devices = []
+    
+    for report_item in all_reports:
+        # 이상치가 있는 디바이스만 추가
+        if report_item["anomaly_count"] > 0:
+            all_anomalies.append(AnomalyDevice(
+                device_mac=report_item["device_mac"],
+                device_name=report_item["device_name"],
+                timestamp=datetime.now(),
+                current_amp=0,
+                expected_amp=0,
+                deviation_percent=0,
+                severity="medium" if report_item["anomaly_count"] >= 10 else "low"
+            ))
         
-        # 6. 기존 프롬프트 엔지니어링 함수 사용
-        if not settings.OPENAI_API_KEY or not AsyncOpenAI:
-            return {
-                "device_count": len(all_reports),
-                "hours": hours,
-                "devices": all_reports,
-                "total_anomaly_count": total_anomalies,
-                "total_standby_wh": total_standby_wh,
-                "total_monthly_kwh": total_monthly_kwh,
-                "total_monthly_cost": total_monthly_cost,
-                "hourly_usage": hourly_usage,
-                "top_devices": top_devices,
-                "openai_available": False
-            }
-        
-        analysis = await analyze_with_openai(report_data)
-        
+        # 대기전력이 있는 디바이스 추가
+        if report_item["standby_wh"] > 0:
+            avg_standby_watts = report_item["standby_wh"] / hours
+            daily_waste_kwh = round((report_item["standby_wh"] * 24 / hours) / 1000, 3)
+            monthly_standby_kwh = round((report_item["standby_wh"] / hours) * 24 * 30 / 1000, 2)
+            monthly_cost = int(monthly_standby_kwh * 300)
+            
+            all_standby_devices.append(StandbyPowerDevice(
+                device_mac=report_item["device_mac"],
+                device_name=report_item["device_name"],
+                avg_standby_power_watts=avg_standby_watts,
+                daily_waste_kwh=daily_waste_kwh,
+                monthly_waste_kwh=monthly_standby_kwh,
+                monthly_waste_cost=monthly_cost
+            ))
+    
+    # 전체 통계
+    total_monthly_kwh = round((total_standby_wh / hours) * 24 * 30 / 1000, 2)
+    total_monthly_cost = int(total_monthly_kwh * 300)
+    
+    report_data = AIReportData(
+        anomalies=all_anomalies,
+        standby_power_devices=all_standby_devices,
+        total_anomaly_count=total_anomalies,
+        total_standby_waste_kwh=total_monthly_kwh,
+        total_standby_waste_cost=total_monthly_cost
+    )
+    
+    # 6. 기존 프롬프트 엔지니어링 함수 사용
+    if not settings.OPENAI_API_KEY or not AsyncOpenAI:
         return {
             "device_count": len(all_reports),
             "hours": hours,
@@ -607,26 +739,28 @@ async def analyze_ai_server_report(hours: int = 24, db: AsyncSession = Depends(g
             "total_monthly_cost": total_monthly_cost,
             "hourly_usage": hourly_usage,
             "top_devices": top_devices,
-            "openai_analysis": {
-                "summary": analysis.summary,
-                "recommendations": analysis.recommendations,
-                "anomaly_insights": analysis.anomaly_insights,
-                "standby_insights": analysis.standby_insights,
-                "estimated_savings": analysis.estimated_savings
-            },
-            "openai_available": True,
-            "generated_at": datetime.now().isoformat()
+            "openai_available": False
         }
     
-    except httpx.HTTPError as e:
-        logger.error(f"AI 서버 연결 실패: {e}")
-        raise HTTPException(
-            status_code=503,
-            detail=f"AI 서버에 연결할 수 없습니다: {str(e)}"
-        )
-    except Exception as e:
-        logger.error(f"분석 중 오류 발생: {e}")
-        raise HTTPException(
-            status_code=500,
-            detail=f"분석 중 오류가 발생했습니다: {str(e)}"
-        )
+    analysis = await analyze_with_openai(report_data)
+    
+    return {
+        "device_count": len(all_reports),
+        "hours": hours,
+        "devices": all_reports,
+        "total_anomaly_count": total_anomalies,
+        "total_standby_wh": total_standby_wh,
+        "total_monthly_kwh": total_monthly_kwh,
+        "total_monthly_cost": total_monthly_cost,
+        "hourly_usage": hourly_usage,
+        "top_devices": top_devices,
+        "openai_analysis": {
+            "summary": analysis.summary,
+            "recommendations": analysis.recommendations,
+            "anomaly_insights": analysis.anomaly_insights,
+            "standby_insights": analysis.standby_insights,
+            "estimated_savings": analysis.estimated_savings
+        },
+        "openai_available": True,
+        "generated_at": datetime.now().isoformat()
+    }
@@ -3,8 +3,12 @@
 사용자 로그인, 회원가입, 내 정보 조회 엔드포인트를 제공합니다.
 """
 
+import asyncio
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Any, Dict, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
@@ -24,6 +28,16 @@ settings = get_settings()
 # 비밀번호 해싱 설정
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# bcrypt는 호출당 100ms 이상 CPU를 쓰므로 이벤트 루프 밖 전용 스레드에서 실행
+# (bcrypt는 해시 중 GIL을 놓아 MQTT 수신/웹소켓 브로드캐스트가 멈추지 않음, 동시 실행 수는 워커 수로 제한)
+_hash_executor = ThreadPoolExecutor(
+    max_workers=max(1, settings.AUTH_HASH_WORKERS),
+    thread_name_prefix="auth-hash",
+)
+
+# 토큰 sub(username) → (만료 시각 monotonic, 사용자 컬럼 값), 변경은 TTL 만료 후 반영 (config 참고)
+_user_cache: "OrderedDict[str, tuple[float, Dict[str, Any]]]" = OrderedDict()
+
 # OAuth2 토큰 인증 스키마
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
@@ -66,6 +80,46 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """verify_password를 해시 전용 스레드에서 실행합니다."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_hash_executor, verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """get_password_hash를 해시 전용 스레드에서 실행합니다."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_hash_executor, get_password_hash, password)
+
+
+def shutdown_hash_executor():
+    """해시 전용 스레드 풀 종료 (앱 종료 시)"""
+    _hash_executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _cached_user(username: str) -> Optional[User]:
+    """캐시된 사용자 값으로 요청마다 새 User 객체를 만들어 반환 (세션에 묶이지 않음)"""
+    item = _user_cache.get(username)
+    if item is None:
+        return None
+    expires_at, values = item
+    if expires_at < time.monotonic():
+        del _user_cache[username]
+        return None
+    _user_cache.move_to_end(username)
+    return User(**values)
+
+
+def _cache_user(user: User):
+    if settings.AUTH_USER_CACHE_TTL_SEC <= 0 or settings.AUTH_USER_CACHE_MAX_ENTRIES <= 0:
+        return
+    values = {c.key: getattr(user, c.key) for c in User.__table__.columns}
+    _user_cache[user.username] = (time.monotonic() + settings.AUTH_USER_CACHE_TTL_SEC, values)
+    _user_cache.move_to_end(user.username)
+    while len(_user_cache) > settings.AUTH_USER_CACHE_MAX_ENTRIES:
+        _user_cache.popitem(last=False)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """JWT 액세스 토큰을 생성합니다."""
     to_encode = data.copy()
@@ -79,7 +133,10 @@ async def get_current_user(
     token: str = Depends(oauth2_scheme),
     db: AsyncSession = Depends(get_db),
 ) -> User:
-    """현재 인증된 사용자를 반환합니다."""
+    """
+    현재 인증된 사용자를 반환합니다.
+    토큰 서명/만료는 매번 검증하고, 사용자 조회만 짧은 TTL 캐시에서 가져옵니다.
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="인증 정보가 유효하지 않습니다.",
@@ -93,10 +150,15 @@ async def get_current_user(
     except JWTError:
         raise credentials_exception
 
+    user = _cached_user(username)
+    if user is not None:
+        return user
+
     result = await db.execute(select(User).where(User.username == username))
     user = result.scalar_one_or_none()
     if user is None:
         raise credentials_exception
+    _cache_user(user)
     return user
 
 
@@ -119,7 +181,7 @@ async def register(user_data: UserRegister, db: AsyncSession = Depends(get_db)):
     new_user = User(
         username=user_data.username,
         email=user_data.email,
-        hashed_password=get_password_hash(user_data.password),
+        hashed_password=await get_password_hash_async(user_data.password),
     )
     db.add(new_user)
     await db.flush()
@@ -137,7 +199,7 @@ async def login(
     result = await db.execute(select(User).where(User.username == form_data.username))
     user = result.scalar_one_or_none()
 
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    if not user or not await verify_password_async(form_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="사용자 이름 또는 비밀번호가 올바르지 않습니다.",
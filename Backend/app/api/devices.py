@@ -4,7 +4,6 @@ MQTT에서 파싱된 디바이스 센서 데이터를 조회하는 엔드포인
 """
 
 import logging
-from datetime import datetime
 
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy import select
@@ -20,7 +19,7 @@ from app.schemas.device import (
     PowerControlResponse,
 )
 from app.services.device_service import DeviceService
-from app.services.mobius_service import mobius_service
+from app.services.power_control_service import apply_power_states
 
 logger = logging.getLogger(__name__)
 
@@ -54,82 +53,28 @@ async def control_device_power(
     예시: mac1을 off로 변경 시 -> {"mac1": "off", "mac2": "on", "mac3": "on"}
     """
     try:
-        # 1. 제어하려는 디바이스가 등록되어 있는지 확인
-        target_device = await db.scalar(
-            select(DeviceMac).where(DeviceMac.device_mac == request.mac_address)
-        )
-        if not target_device:
+        logger.info(f"디바이스 전원 제어 요청: MAC={request.mac_address}, 상태={request.power_state}")
+
+        # 제어 대상은 새 상태로, 나머지 디바이스는 device_switch의 기존 상태로 Mobius에 1건 전송
+        result = await apply_power_states(db, {request.mac_address: request.power_state})
+        if request.mac_address in result.unknown_macs:
             raise HTTPException(
                 status_code=404,
                 detail=f"MAC 주소 '{request.mac_address}'는 등록되지 않은 디바이스입니다."
             )
-        
-        # 2. 모든 등록된 디바이스 조회
-        result = await db.execute(select(DeviceMac))
-        all_devices = result.scalars().all()
-        
-        # 3. 각 디바이스의 desired_state 조회 (device_switch 테이블)
-        device_control_map = {}
-        
-        for device in all_devices:
-            if device.device_mac == request.mac_address:
-                # 제어 대상 디바이스는 요청받은 새 상태로 설정
-                device_control_map[device.device_mac] = request.power_state
-            else:
-                # 나머지 디바이스는 device_switch에서 현재 상태 조회
-                switch_state = await db.scalar(
-                    select(DeviceSwitch.desired_state)
-                    .where(DeviceSwitch.device_mac == device.device_mac)
-                )
-                device_control_map[device.device_mac] = switch_state if switch_state else "off"
-        
-        # 4. Mobius switch 컨테이너에 전송할 데이터 구성
-        # oneM2M ContentInstance의 con 필드는 문자열이어야 합니다
-        payload = {
-            "m2m:cin": {
-                "con": device_control_map,
-                "lbl": ["smart_plug"]
-            }
-        }
-        
-        logger.info(f"디바이스 전원 제어 요청: MAC={request.mac_address}, 상태={request.power_state}")
-        logger.debug(f"전체 디바이스 상태 전송: {device_control_map}")
-        
-        # 5. device_switch 테이블에 제어 명령 상태 저장/업데이트
-        existing_switch = await db.scalar(
-            select(DeviceSwitch).where(DeviceSwitch.device_mac == request.mac_address)
-        )
-        
-        if existing_switch:
-            # 기존 레코드 업데이트
-            existing_switch.desired_state = request.power_state
-            existing_switch.updated_at = datetime.utcnow()
-        else:
-            # 새 레코드 생성
-            new_switch = DeviceSwitch(
-                device_mac=request.mac_address,
-                desired_state=request.power_state,
-            )
-            db.add(new_switch)
-        
-        await db.commit()
-        logger.info(f"제어 명령 상태 저장: {request.mac_address} → desired_state={request.power_state}")
-        
-        # 6. Mobius에 ContentInstance 생성 (switch 컨테이너에 명령 전송)
-        response = await mobius_service.create_cin("ae_nexcode", "switch", payload)
-        
-        if response.get("status") in [200, 201]:
+
+        if result.success:
             return PowerControlResponse(
                 success=True,
                 message=f"디바이스 {request.mac_address}의 전원을 {request.power_state}로 제어했습니다.",
-                controlled_devices=len(all_devices),
-                device_list=list(device_control_map.keys()),
-                mobius_response=response.get("body")
+                controlled_devices=len(result.control_map),
+                device_list=list(result.control_map.keys()),
+                mobius_response=result.mobius_body
             )
         else:
             raise HTTPException(
                 status_code=500,
-                detail=f"Mobius 전원 제어 실패: {response.get('body')}"
+                detail=f"Mobius 전원 제어 실패: {result.mobius_body}"
             )
             
     except HTTPException:
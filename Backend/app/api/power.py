@@ -62,6 +62,30 @@ async def get_power_summary(db: AsyncSession = Depends(get_db)):
     )
 
 
+@router.get("/realtime", summary="디바이스/위치별 실시간 누적 전력량 조회")
+async def get_realtime_energy(
+    device_mac: Optional[str] = Query(None, description="특정 디바이스 MAC 주소 (없으면 전체)"),
+    location: Optional[str] = Query(None, description="특정 위치 (없으면 전체)"),
+):
+    """
+    서버 누적기에 있는 오늘/이번 달 전력량(kWh)을 DB 조회 없이 반환합니다.
+    device_mac 이 있으면 해당 디바이스(+위치 합계), location 이 있으면 해당 위치만 남깁니다.
+    """
+    from app.api.websocket import get_device_energy, get_energy_breakdown
+
+    if device_mac:
+        data = get_device_energy(device_mac)
+        if data is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="누적 기록이 없는 디바이스입니다.")
+        return data
+
+    breakdown = get_energy_breakdown()
+    if location:
+        breakdown["devices"] = [d for d in breakdown["devices"] if d["location"] == location]
+        breakdown["locations"] = [l for l in breakdown["locations"] if l["location"] == location]
+    return breakdown
+
+
 @router.get("/daily", summary="일별 총 전력량 조회")
 async def get_daily_power(
     days: int = Query(default=7, ge=1, le=30, description="조회할 일수 (기본: 7일)"),
@@ -69,7 +93,7 @@ async def get_daily_power(
     db: AsyncSession = Depends(get_db)
 ):
     """일별 총 전력량(kWh)을 반환합니다. device_mac이 있으면 해당 디바이스만, 없으면 전체 합계를 반환합니다."""
-    from app.api.websocket import calculate_energy_kwh
+    from app.api.websocket import calculate_energy_kwh, get_device_energy, KST
     
     end_date = datetime.now().date()
     start_date = end_date - timedelta(days=days - 1)
@@ -82,7 +106,11 @@ async def get_daily_power(
         date_str = current_date.strftime("%m/%d")
         
         # 디바이스별 또는 전체 전력량 계산
-        if device_mac:
+        device_today = get_device_energy(device_mac) if device_mac and current_date == datetime.now(KST).date() else None
+        if device_today is not None:
+            # 오늘은 누적기 값 사용 (원본 행 스캔 생략)
+            kwh = device_today["today_energy_kwh"]
+        elif device_mac:
             # 특정 디바이스만 계산 - devices 테이블에서 직접 계산
             VOLTAGE = 220.0
             start_dt = datetime.combine(current_date, datetime.min.time())
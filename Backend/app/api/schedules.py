@@ -11,6 +11,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database import get_db
 from app.models.schedule import Schedule
+from app.models.schedule_run import ScheduleRun
 from app.models.device_mac import DeviceMac
 from app.schemas.schedule import ScheduleCreate, ScheduleUpdate, ScheduleResponse
 from datetime import datetime, timezone, timedelta
@@ -31,12 +32,15 @@ async def get_schedule_debug_status(
     
     now = datetime.now(KST)
     
-    # 모든 스케줄 조회
+    # 모든 스케줄 + 마지막 실행 기록 조회
     result = await db.execute(select(Schedule))
     all_schedules = result.scalars().all()
+    runs_result = await db.execute(select(ScheduleRun))
+    last_runs = {r.schedule_id: r for r in runs_result.scalars().all()}
     
     schedule_info = []
     for s in all_schedules:
+        last_run = last_runs.get(s.id)
         schedule_info.append({
             "id": s.id,
             "name": s.schedule_name,
@@ -44,7 +48,9 @@ async def get_schedule_debug_status(
             "start": str(s.start_time),
             "end": str(s.end_time),
             "enabled": s.enabled,
-            "days": s.days_of_week
+            "days": s.days_of_week,
+            "last_action": last_run.last_action if last_run else None,
+            "last_occurrence": str(last_run.last_occurrence) if last_run else None,
         })
     
     return {
@@ -194,6 +200,9 @@ async def delete_schedule(
         await db.execute(
             delete(Schedule).where(Schedule.id == schedule_id)
         )
+        await db.execute(
+            delete(ScheduleRun).where(ScheduleRun.schedule_id == schedule_id)
+        )
         await db.commit()
         
         logger.info(f"스케줄 삭제: ID={schedule_id}")
@@ -6,8 +6,11 @@ WebSocket 엔드포인트
 import asyncio
 import json
 import logging
+import os
 import time
+from array import array
 from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
 from typing import List
 
 # 한국 표준시 (UTC+9)
@@ -15,6 +18,7 @@ KST = timezone(timedelta(hours=9))
 
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 from sqlalchemy import select, desc, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 
 from app.database import async_session
 from app.models.device import Device
@@ -175,8 +179,8 @@ def calculate_kepco_bill(kwh: float, month: int) -> int:
 
 # ── 전력량 계산 ──
 
-async def calculate_energy_kwh(from_date: date, to_date: date | None = None) -> float:
-    """주어진 날짜 범위의 총 전력량(kWh)을 사다리꼴 적분으로 계산합니다.
+async def calculate_device_energy_wh(from_date: date, to_date: date | None = None) -> dict[str, float]:
+    """주어진 날짜 범위의 디바이스별 전력량(Wh)을 사다리꼴 적분으로 계산합니다.
     서버 시간 기준 일자(DATE)만 비교하여 레코드를 필터링합니다.
     to_date가 None이면 from_date 하루만 계산합니다."""
     if to_date is None:
@@ -199,9 +203,9 @@ async def calculate_energy_kwh(from_date: date, to_date: date | None = None) ->
 
     if not rows:
         logger.info(f"전력량 계산: {from_date}~{to_date} → 레코드 0건")
-        return 0.0
+        return {}
 
-    total_wh = 0.0
+    device_wh: dict[str, float] = {}
     prev_mac = None
     prev_amp = 0.0
     prev_ts = None
@@ -211,18 +215,24 @@ async def calculate_energy_kwh(from_date: date, to_date: date | None = None) ->
         if mac == prev_mac and prev_ts is not None:
             dt_hours = (ts - prev_ts).total_seconds() / 3600
             if 0 < dt_hours < 6:
-                total_wh += ((prev_amp + amp) / 2) * VOLTAGE * dt_hours
+                device_wh[mac] = device_wh.get(mac, 0.0) + ((prev_amp + amp) / 2) * VOLTAGE * dt_hours
                 intervals += 1
         prev_mac = mac
         prev_amp = amp
         prev_ts = ts
 
-    kwh = total_wh / 1000
     logger.info(
         f"전력량 계산: {from_date}~{to_date} → "
-        f"레코드 {len(rows)}건, 유효구간 {intervals}개, 결과 {kwh:.4f} kWh"
+        f"레코드 {len(rows)}건, 유효구간 {intervals}개, 결과 {sum(device_wh.values()) / 1000:.4f} kWh"
     )
-    return kwh
+    return device_wh
+
+
+async def calculate_energy_kwh(from_date: date, to_date: date | None = None) -> float:
+    """주어진 날짜 범위의 총 전력량(kWh)을 사다리꼴 적분으로 계산합니다.
+    to_date가 None이면 from_date 하루만 계산합니다."""
+    device_wh = await calculate_device_energy_wh(from_date, to_date)
+    return sum(device_wh.values()) / 1000
 
 
 async def get_power_summary() -> dict:
@@ -255,6 +265,148 @@ _monthly_bill: int = 0
 _today_date: object = None  # date
 _last_energy_readings: dict[str, tuple[float, datetime]] = {}
 
+# 빠른 시작: 스냅샷 복원 후 백그라운드 보정이 끝날 때까지 새 샘플은 보관했다가 순서대로 반영
+_accumulator_ready: bool = True
+_pending_samples: list[tuple[str, float, datetime]] = []
+
+SNAPSHOT_PATH = (
+    Path(settings.ENERGY_SNAPSHOT_PATH) if settings.ENERGY_SNAPSHOT_PATH
+    else Path(__file__).resolve().parent.parent / "data" / "energy_snapshot.json"
+)
+SNAPSHOT_VERSION = 2
+
+
+# ── 디바이스별 / 위치별 누적기 ──
+# 키(MAC, location)마다 슬롯 번호를 한 번 배정하고 오늘/월간 Wh 는 array('d') 에 슬롯 순서로 보관
+# 샘플 1건당 배열 원소 몇 개만 더하므로 O(1), 디바이스/위치별 위젯은 DB를 조회하지 않음
+
+class EnergyTable:
+    """키 → 슬롯, 슬롯별 오늘/월간 Wh (array('d'))"""
+
+    def __init__(self):
+        self.index: dict[str, int] = {}
+        self.keys: list[str] = []
+        self.today_wh = array("d")
+        self.month_wh = array("d")
+
+    def slot(self, key: str) -> int:
+        i = self.index.get(key)
+        if i is None:
+            i = self.index[key] = len(self.keys)
+            self.keys.append(key)
+            self.today_wh.append(0.0)
+            self.month_wh.append(0.0)
+        return i
+
+    def add(self, i: int, month_wh: float, today_wh: float) -> None:
+        self.month_wh[i] += month_wh
+        self.today_wh[i] += today_wh
+
+    def reset(self, month: bool = False) -> None:
+        """오늘 값(month=True면 월간 값도) 0으로 (슬롯은 유지)"""
+        self.today_wh = array("d", bytes(8 * len(self.keys)))
+        if month:
+            self.month_wh = array("d", bytes(8 * len(self.keys)))
+
+
+_devices = EnergyTable()
+_locations = EnergyTable()
+_device_location = array("i")  # 디바이스 슬롯 → 위치 슬롯 (-1 = 위치 미확인)
+
+
+def _assign_location(i: int, location: str) -> None:
+    """디바이스 슬롯 i 의 위치 지정 (바뀌면 그 디바이스의 누적값을 이전 위치에서 새 위치로 옮김)"""
+    new = _locations.slot(location)
+    old = _device_location[i]
+    if old == new:
+        return
+    month_wh, today_wh = _devices.month_wh[i], _devices.today_wh[i]
+    if old >= 0:
+        _locations.add(old, -month_wh, -today_wh)
+    _locations.add(new, month_wh, today_wh)
+    _device_location[i] = new
+
+
+def _device_slot(mac: str) -> int:
+    """MAC 의 디바이스 슬롯 (device_mac 캐시에 위치가 있으면 위치도 맞춤)"""
+    i = _devices.slot(mac)
+    if i == len(_device_location):
+        _device_location.append(-1)
+    info = _device_mac_cache.get(mac)
+    if info and info.get("location"):
+        _assign_location(i, info["location"])
+    return i
+
+
+def _add_device_energy(mac: str, month_wh: float, today_wh: float) -> None:
+    """디바이스별/위치별 월간·오늘 누적값에 증분을 더합니다."""
+    i = _device_slot(mac)
+    _devices.add(i, month_wh, today_wh)
+    loc = _device_location[i]
+    if loc >= 0:
+        _locations.add(loc, month_wh, today_wh)
+
+
+def _reset_breakdown(month: bool) -> None:
+    _devices.reset(month)
+    _locations.reset(month)
+
+
+async def preload_device_mac_cache() -> None:
+    """device_mac 테이블 전체를 캐시에 올리고 디바이스 슬롯의 위치를 맞춥니다."""
+    async with async_session() as session:
+        result = await session.execute(select(DeviceMac))
+        for entry in result.scalars().all():
+            _device_mac_cache[entry.device_mac] = {"device_name": entry.device_name, "location": entry.location}
+    for mac in list(_devices.keys):
+        _device_slot(mac)
+
+
+def _energy_kwh(table: EnergyTable, i: int, today_valid: bool) -> dict:
+    return {
+        "today_energy_kwh": round(table.today_wh[i] / 1000, 4) if today_valid else 0.0,
+        "monthly_energy_kwh": round(table.month_wh[i] / 1000, 4),
+    }
+
+
+def get_device_energy(mac: str) -> dict | None:
+    """디바이스와 그 위치의 오늘/월간 누적 전력량(kWh) (누적 기록이 없으면 None)"""
+    i = _devices.index.get(mac)
+    if i is None:
+        return None
+    today_valid = _today_date == datetime.now(KST).date()
+    loc = _device_location[i]
+    data = {"device_mac": mac, "location": _locations.keys[loc] if loc >= 0 else None}
+    data.update(_energy_kwh(_devices, i, today_valid))
+    if loc >= 0:
+        data["location_energy"] = _energy_kwh(_locations, loc, today_valid)
+    return data
+
+
+def get_energy_breakdown() -> dict:
+    """전체/디바이스별/위치별 오늘·월간 누적 전력량(kWh)"""
+    today_valid = _today_date == datetime.now(KST).date()
+    devices = []
+    for i, mac in enumerate(_devices.keys):
+        loc = _device_location[i]
+        devices.append({
+            "device_mac": mac,
+            "location": _locations.keys[loc] if loc >= 0 else None,
+            **_energy_kwh(_devices, i, today_valid),
+        })
+    locations = [
+        {"location": location, **_energy_kwh(_locations, i, today_valid)}
+        for i, location in enumerate(_locations.keys)
+    ]
+    return {
+        "date": _today_date.isoformat() if _today_date else None,
+        "ready": _accumulator_ready,
+        "today_energy_kwh": round(get_today_energy_kwh(), 4),
+        "monthly_energy_kwh": round(get_monthly_energy_kwh(), 4),
+        "devices": devices,
+        "locations": locations,
+    }
+
 
 async def init_energy_accumulator() -> None:
     """서버 시작 시 오늘/월간 전력량을 DB에서 계산하여 누적기를 초기화합니다.
@@ -266,16 +418,20 @@ async def init_energy_accumulator() -> None:
     today_start = datetime.combine(today, datetime.min.time())
     month_start = today.replace(day=1)
 
-    today_kwh, monthly_kwh = await asyncio.gather(
-        calculate_energy_kwh(today),
-        calculate_energy_kwh(month_start, today),
+    today_wh, monthly_wh = await asyncio.gather(
+        calculate_device_energy_wh(today),
+        calculate_device_energy_wh(month_start, today),
     )
+    monthly_kwh = sum(monthly_wh.values()) / 1000
 
-    _today_energy_wh = today_kwh * 1000
+    _today_energy_wh = sum(today_wh.values())
     _monthly_energy_wh = monthly_kwh * 1000
     _monthly_bill = calculate_kepco_bill(monthly_kwh, today.month)
     _today_date = today
     _last_energy_readings = {}
+    _reset_breakdown(month=True)
+    for mac in monthly_wh.keys() | today_wh.keys():
+        _add_device_energy(mac, monthly_wh.get(mac, 0.0), today_wh.get(mac, 0.0))
 
     # 디바이스별 마지막 읽기값 로드 (이후 증분 계산용)
     async with async_session() as session:
@@ -304,23 +460,34 @@ async def init_energy_accumulator() -> None:
 
 
 def accumulate_energy(mac: str, energy_amp: float | None, timestamp: datetime | None) -> float:
-    """새 센서 데이터로 오늘/월간 전력량을 증분 누적합니다. 현재 오늘 kWh를 반환합니다."""
+    """새 센서 데이터로 오늘/월간 전력량(전체 + 디바이스별 + 위치별)을 증분 누적합니다. 현재 오늘 kWh를 반환합니다."""
     global _today_energy_wh, _monthly_energy_wh, _monthly_bill
-    global _today_date, _last_energy_readings
+    global _today_date, _last_energy_readings, _closed_month
 
     today = datetime.now(KST).date()
     if _today_date != today:
         # 날짜 변경 시 오늘 누적 리셋, 월 변경 시 월간도 리셋
-        if _today_date and today.month != _today_date.month:
+        month_changed = bool(_today_date and today.month != _today_date.month)
+        if month_changed:
+            if _accumulator_ready:
+                # 리셋 전 지난달 최종값은 다음 dashboard 저장 때 기록
+                _closed_month = (
+                    _today_date.year, _today_date.month, round(_monthly_energy_wh / 1000, 4), _monthly_bill
+                )
             _monthly_energy_wh = 0.0
             _monthly_bill = 0
         _today_energy_wh = 0.0
+        _reset_breakdown(month_changed)
         _today_date = today
         _last_energy_readings = {}
 
     if energy_amp is None or timestamp is None:
         return _today_energy_wh / 1000
 
+    if not _accumulator_ready:
+        _pending_samples.append((mac, energy_amp, timestamp))
+        return _today_energy_wh / 1000
+
     delta_wh = 0.0
     last = _last_energy_readings.get(mac)
     if last:
@@ -330,6 +497,7 @@ def accumulate_energy(mac: str, energy_amp: float | None, timestamp: datetime |
             delta_wh = ((last_amp + energy_amp) / 2) * VOLTAGE * dt_hours
             _today_energy_wh += delta_wh
             _monthly_energy_wh += delta_wh
+            _add_device_energy(mac, delta_wh, delta_wh)
             # 월간 요금 재계산
             _monthly_bill = calculate_kepco_bill(_monthly_energy_wh / 1000, today.month)
 
@@ -337,6 +505,218 @@ def accumulate_energy(mac: str, energy_amp: float | None, timestamp: datetime |
     return _today_energy_wh / 1000
 
 
+# ── 누적기 스냅샷 (빠른 재시작 / 비정상 종료 대비) ──
+# devices.id 워터마크와 함께 디바이스별 오늘/월간 Wh + 마지막 읽기값을 주기적으로 저장
+# 재시작 시 id > 워터마크 인 행만 재생하므로 복구 비용은 마지막 저장 이후 몇 분치 데이터
+
+async def save_energy_snapshot() -> bool:
+    """현재 누적값을 devices.id 워터마크와 함께 파일에 원자적으로 저장합니다."""
+    if not _accumulator_ready or _today_date is None:
+        return False
+
+    # 워터마크를 먼저 읽음: MQTT 샘플은 DB 저장 전에 누적되므로 id <= 워터마크 인 행은 모두 반영된 상태
+    # (워터마크 이후에 누적된 샘플은 재생 시 디바이스별 마지막 읽기 시각으로 걸러짐)
+    try:
+        async with async_session() as session:
+            watermark_id = await session.scalar(select(func.max(Device.id))) or 0
+    except Exception as e:
+        logger.error(f"전력량 스냅샷 워터마크 조회 실패: {e}")
+        return False
+
+    last_readings = _last_energy_readings
+    for mac in last_readings:
+        _device_slot(mac)
+    snapshot = {
+        "version": SNAPSHOT_VERSION,
+        "date": _today_date.isoformat(),
+        "watermark_id": watermark_id,
+        "today_wh": _today_energy_wh,
+        "monthly_wh": _monthly_energy_wh,
+        "devices": {
+            mac: {
+                "today_wh": _devices.today_wh[i],
+                "monthly_wh": _devices.month_wh[i],
+                "location": _locations.keys[_device_location[i]] if _device_location[i] >= 0 else None,
+                "last": [last_readings[mac][0], last_readings[mac][1].isoformat()] if mac in last_readings else None,
+            }
+            for i, mac in enumerate(_devices.keys)
+        },
+        "saved_at": datetime.now(KST).replace(tzinfo=None).isoformat(),
+    }
+    try:
+        SNAPSHOT_PATH.parent.mkdir(parents=True, exist_ok=True)
+        tmp = SNAPSHOT_PATH.with_name(SNAPSHOT_PATH.name + ".tmp")
+        tmp.write_text(json.dumps(snapshot), encoding="utf-8")
+        os.replace(tmp, SNAPSHOT_PATH)
+        return True
+    except OSError as e:
+        logger.error(f"전력량 스냅샷 저장 실패: {e}")
+        return False
+
+
+def restore_energy_snapshot() -> dict | None:
+    """
+    스냅샷으로 누적기를 즉시 채우고 보정 대기 상태로 전환합니다.
+    이번 달 스냅샷이 아니면 None (→ warm_energy_accumulator 가 DB 전체 재계산)
+    어느 경우든 warm_energy_accumulator 가 끝날 때까지 새 샘플은 보관만 합니다.
+    """
+    global _today_energy_wh, _monthly_energy_wh, _monthly_bill
+    global _today_date, _last_energy_readings, _accumulator_ready
+
+    _accumulator_ready = False
+    _pending_samples.clear()
+
+    try:
+        snapshot = json.loads(SNAPSHOT_PATH.read_text(encoding="utf-8"))
+        if snapshot.get("version") != SNAPSHOT_VERSION:
+            return None
+        snap_date = date.fromisoformat(snapshot["date"])
+        saved_at = datetime.fromisoformat(snapshot["saved_at"])
+        watermark_id = int(snapshot["watermark_id"])
+        devices = snapshot["devices"]
+        readings = {
+            mac: (float(d["last"][0]), datetime.fromisoformat(d["last"][1]))
+            for mac, d in devices.items() if d.get("last")
+        }
+        device_wh = {
+            mac: (float(d["today_wh"]), float(d["monthly_wh"]), d.get("location")) for mac, d in devices.items()
+        }
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, KeyError, TypeError, IndexError) as e:
+        logger.warning(f"전력량 스냅샷을 읽을 수 없습니다: {e}")
+        return None
+
+    today = datetime.now(KST).date()
+    if (snap_date.year, snap_date.month) != (today.year, today.month):
+        return None
+
+    _reset_breakdown(month=True)
+    for mac, (today_wh, month_wh, location) in device_wh.items():
+        i = _device_slot(mac)
+        if location and _device_location[i] < 0:
+            _assign_location(i, location)
+        _add_device_energy(mac, month_wh, today_wh if snap_date == today else 0.0)
+    _today_energy_wh = float(snapshot["today_wh"]) if snap_date == today else 0.0
+    _monthly_energy_wh = float(snapshot["monthly_wh"])
+    _monthly_bill = calculate_kepco_bill(_monthly_energy_wh / 1000, today.month)
+    _today_date = today
+    _last_energy_readings = readings
+    return {"date": snap_date, "saved_at": saved_at, "watermark_id": watermark_id}
+
+
+async def _replay_since_snapshot(snapshot: dict) -> int:
+    """워터마크(devices.id) 이후 행을 디바이스별 마지막 읽기값 다음부터 적분해 더합니다. 반영한 행 수 반환."""
+    global _today_energy_wh, _monthly_energy_wh, _monthly_bill
+
+    today = _today_date
+    month_start = datetime.combine(today.replace(day=1), datetime.min.time())
+
+    async with async_session() as session:
+        result = await session.execute(
+            select(Device.device_mac, Device.energy_amp, Device.timestamp)
+            .where(Device.id > snapshot["watermark_id"])
+            .where(Device.energy_amp.isnot(None))
+            .where(Device.timestamp.isnot(None))
+            .order_by(Device.device_mac, Device.timestamp)
+        )
+        rows = result.all()
+
+    applied = 0
+    for mac, amp, ts in rows:
+        if ts < month_start:
+            continue
+        last = _last_energy_readings.get(mac)
+        if last and ts <= last[1]:
+            continue  # 스냅샷에 이미 반영된 구간
+        if last and last[1].date() == ts.date():
+            dt_hours = (ts - last[1]).total_seconds() / 3600
+            if 0 < dt_hours < 6:
+                delta_wh = ((last[0] + amp) / 2) * VOLTAGE * dt_hours
+                _monthly_energy_wh += delta_wh
+                if ts.date() == today:
+                    _today_energy_wh += delta_wh
+                _add_device_energy(mac, delta_wh, delta_wh if ts.date() == today else 0.0)
+        _last_energy_readings[mac] = (amp, ts)
+        applied += 1
+
+    _monthly_bill = calculate_kepco_bill(_monthly_energy_wh / 1000, today.month)
+    return applied
+
+
+async def warm_energy_accumulator(snapshot: dict | None) -> None:
+    """
+    restore_energy_snapshot 이후 백그라운드 보정
+    - 스냅샷 있음: 워터마크 이후 행만 재생
+    - 스냅샷 없음: init_energy_accumulator (DB 전체 재계산)
+    끝나면 보정 중 들어온 샘플을 순서대로 반영하고 dashboard 테이블 갱신
+    """
+    global _accumulator_ready, _last_energy_readings
+
+    t0 = time.perf_counter()
+    attempt = 0
+    while True:
+        # 실패 시 재시도 (보정 전에 준비 완료로 바꾸면 다음 스냅샷이 재생 못 한 구간을 건너뛴 워터마크를 저장함)
+        # 종료로 취소되면 준비 완료로 바꾸지 않음 → 종료 시 스냅샷도 저장하지 않고 기존 스냅샷 유지
+        try:
+            await preload_device_mac_cache()
+            if snapshot is None:
+                await init_energy_accumulator()
+                detail = "DB 전체 재계산"
+            else:
+                applied = await _replay_since_snapshot(snapshot)
+                detail = f"스냅샷({snapshot['saved_at']:%m-%d %H:%M}, id>{snapshot['watermark_id']}) 이후 {applied}건 재생"
+            break
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            attempt += 1
+            logger.error(f"전력량 누적기 보정 실패 ({attempt}회, 10초 후 재시도, 그동안 스냅샷 값 사용): {e}")
+            await asyncio.sleep(10)
+
+    # 오늘 이전 읽기값은 버림 (자정을 넘겨 적분하지 않도록, accumulate_energy 와 동일)
+    _last_energy_readings = {
+        mac: reading for mac, reading in _last_energy_readings.items()
+        if reading[1].date() == _today_date
+    }
+    _accumulator_ready = True
+
+    # 보정 중 들어온 샘플 반영 (재생으로 이미 반영된 시각까지의 샘플은 건너뜀)
+    pending = list(_pending_samples)
+    _pending_samples.clear()
+    for mac, amp, ts in pending:
+        last = _last_energy_readings.get(mac)
+        if last is None or ts > last[1]:
+            accumulate_energy(mac, amp, ts)
+
+    if snapshot is not None:
+        await update_dashboard_from_accumulator()
+    await save_energy_snapshot()
+
+    logger.info(
+        f"전력량 누적기 보정 완료 ({detail}, 대기 샘플 {len(pending)}건, "
+        f"{(time.perf_counter() - t0) * 1000:.0f}ms): 오늘 {_today_energy_wh:.1f}Wh, "
+        f"월간 {_monthly_energy_wh:.1f}Wh, 예상요금 {_monthly_bill}원"
+    )
+
+
+async def _energy_snapshot_loop(interval_seconds: int) -> None:
+    """interval_seconds마다 누적기 스냅샷을 저장합니다."""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            await save_energy_snapshot()
+        except Exception as e:
+            logger.error(f"전력량 스냅샷 저장 오류: {e}")
+
+
+def start_energy_snapshot_task() -> asyncio.Task | None:
+    """누적기 주기 스냅샷 백그라운드 태스크를 시작합니다 (주기 0이면 None)."""
+    if settings.ENERGY_SNAPSHOT_INTERVAL_SEC <= 0:
+        return None
+    return asyncio.create_task(_energy_snapshot_loop(settings.ENERGY_SNAPSHOT_INTERVAL_SEC))
+
+
 def get_today_energy_kwh() -> float:
     """현재 누적된 오늘 전력량(kWh)을 반환합니다."""
     if _today_date != datetime.now(KST).date():
@@ -355,38 +735,66 @@ def get_monthly_bill() -> int:
 
 
 # ── dashboard 테이블 업데이트 ──
+# 샘플마다 쓰지 않고 DASHBOARD_FLUSH_SEC 마다(값이 바뀌었을 때만) + 종료 시 한 번 저장
+
+_dashboard_flushed: tuple | None = None  # 마지막으로 저장한 (year, month, kWh, 요금)
+_closed_month: tuple | None = None  # 월이 바뀌며 리셋되기 직전 지난달 값 (다음 flush 때 저장)
+
 
-async def upsert_dashboard(year: int, month: int, energy_kwh: float, bill: int) -> None:
-    """dashboard 테이블에 월별 데이터를 저장/업데이트합니다."""
+async def upsert_dashboard(year: int, month: int, energy_kwh: float, bill: int) -> bool:
+    """dashboard 테이블에 월별 데이터를 INSERT ... ON CONFLICT (year, month) DO UPDATE 한 번으로 저장합니다."""
+    stmt = pg_insert(Dashboard).values(
+        year=year, month=month,
+        month_totalenergy=round(energy_kwh, 4),
+        month_energybill=bill,
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Dashboard.year, Dashboard.month],
+        set_={
+            "month_totalenergy": stmt.excluded.month_totalenergy,
+            "month_energybill": stmt.excluded.month_energybill,
+        },
+    )
     try:
         async with async_session() as session:
-            result = await session.execute(
-                select(Dashboard).where(
-                    Dashboard.year == year, Dashboard.month == month
-                )
-            )
-            row = result.scalar_one_or_none()
-            if row:
-                row.month_totalenergy = round(energy_kwh, 4)
-                row.month_energybill = bill
-            else:
-                session.add(Dashboard(
-                    year=year, month=month,
-                    month_totalenergy=round(energy_kwh, 4),
-                    month_energybill=bill,
-                ))
+            await session.execute(stmt)
             await session.commit()
+        return True
     except Exception as e:
         logger.error(f"dashboard 테이블 업데이트 실패: {e}")
+        return False
 
 
 async def update_dashboard_from_accumulator() -> None:
-    """현재 누적기 값으로 dashboard 테이블을 업데이트합니다."""
-    today = datetime.now(KST).date()
-    await upsert_dashboard(
-        today.year, today.month,
-        _monthly_energy_wh / 1000, _monthly_bill,
-    )
+    """현재 누적기 값이 마지막 저장 이후 바뀌었으면 dashboard 테이블을 업데이트합니다."""
+    global _dashboard_flushed, _closed_month
+
+    if _closed_month is not None:
+        if await upsert_dashboard(*_closed_month):
+            _closed_month = None
+
+    if not _accumulator_ready or _today_date is None:
+        return
+    values = (_today_date.year, _today_date.month, round(_monthly_energy_wh / 1000, 4), _monthly_bill)
+    if values == _dashboard_flushed:
+        return
+    if await upsert_dashboard(*values):
+        _dashboard_flushed = values
+
+
+async def _dashboard_flush_loop(interval_seconds: int) -> None:
+    """interval_seconds마다 dashboard 테이블을 저장합니다."""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            await update_dashboard_from_accumulator()
+        except Exception as e:
+            logger.error(f"dashboard 주기 저장 오류: {e}")
+
+
+def start_dashboard_flusher() -> asyncio.Task:
+    """dashboard 테이블 주기 저장 백그라운드 태스크를 시작합니다."""
+    return asyncio.create_task(_dashboard_flush_loop(max(1, settings.DASHBOARD_FLUSH_SEC)))
 
 
 async def get_all_device_status() -> list:
@@ -509,7 +917,8 @@ def start_offline_checker() -> asyncio.Task:
 async def websocket_devices(websocket: WebSocket):
     """
     디바이스 실시간 상태 스트리밍 WebSocket 엔드포인트
-    - 연결 시 현재 디바이스 상태 1회 전송
+    - 연결 시 현재 디바이스 상태 + 전력량 요약 + 디바이스/위치별 누적 전력량 1회 전송
+    - 이후 device_update 마다 해당 디바이스/위치 누적값(device_energy)이 함께 전달됨
     - 이후 클라이언트 ping 에만 응답 (MQTT 메시지는 broadcast로 전달)
     """
     await manager.connect(websocket)
@@ -527,6 +936,10 @@ async def websocket_devices(websocket: WebSocket):
         {"type": "power_summary", "data": power_summary},
         websocket,
     )
+    await manager.send_personal_message(
+        {"type": "energy_breakdown", "data": get_energy_breakdown()},
+        websocket,
+    )
 
     try:
         while True:
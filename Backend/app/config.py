@@ -26,11 +26,23 @@ class Settings(BaseSettings):
     SECRET_KEY: str = "[SECRET_KEY]"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60
+    AUTH_HASH_WORKERS: int = 2  # bcrypt 해시/검증 전용 스레드 수 (이벤트 루프 밖에서 실행)
+    # 토큰 → 사용자 조회 캐시 유지 시간 (0이면 캐시 끔)
+    # 캐시를 따로 무효화하지 않으므로 DB에서 사용자를 바꾸거나(is_admin 등) 지워도 최대 이 시간 동안은 이전 값으로 인증됨
+    AUTH_USER_CACHE_TTL_SEC: int = 30
+    AUTH_USER_CACHE_MAX_ENTRIES: int = 1024
 
     # 앱 기본 설정
     APP_NAME: str = "IoTCOSS API"
     DEBUG: bool = True
 
+    # 빠른 시작: 스키마 버전이 같으면 create_all 생략, 전력량 누적기는 스냅샷 복원 후 백그라운드 보정
+    # False면 예전처럼 create_all + DB 전체 재계산을 마친 뒤 요청을 받음
+    STARTUP_FAST_PATH: bool = True
+    ENERGY_SNAPSHOT_PATH: str = ""  # 비어 있으면 app/data/energy_snapshot.json
+    DASHBOARD_FLUSH_SEC: int = 30  # dashboard 테이블(월 누적 전력량/요금) 저장 주기, 종료 시에도 저장
+    ENERGY_SNAPSHOT_INTERVAL_SEC: int = 60  # 누적기 스냅샷 저장 주기 (비정상 종료 시 이 구간만 재생, 0이면 종료 시에만 저장)
+
     # Mobius (oneM2M) 설정
     X_API_KEY: str = Field(default="", validation_alias="X-API-KEY")
     X_AUTH_CUSTOM_LECTURE: str = Field(default="", validation_alias="X-AUTH-CUSTOM-LECTURE")
@@ -40,10 +52,25 @@ class Settings(BaseSettings):
 
     # OpenAI 설정
     OPENAI_API_KEY: str = Field(default="", validation_alias="OPENAI_API_KEY")
-    
+    OPENAI_BASE_URL: str = ""  # 비어 있으면 OpenAI 기본 주소 (호환 서버/로컬 스텁으로 바꿀 때 지정)
+    OPENAI_MODEL: str = "gpt-4o-mini"
+    OPENAI_TIMEOUT_SEC: float = 30.0
+    OPENAI_CACHE_TTL_SEC: int = 600  # 같은 프롬프트 응답 재사용 시간 (0이면 캐시 끔)
+    OPENAI_CACHE_MAX_ENTRIES: int = 256
+
+    # AI 서버 종합 분석(/api/ai/analyze-ai-server) 백그라운드 미리 계산 주기 (0이면 끔)
+    AI_SUMMARY_REFRESH_SEC: int = 300
+    AI_SUMMARY_HOURS: int = 24
+
     # AI Report 서버 설정 (다른 팀원이 구현한 AI)
     AI_REPORT_URL: str = Field(default="http://localhost:5000", validation_alias="AI_REPORT_URL")
 
+    # AI 자동 제어 추천 방식
+    # - local: profiles.json을 백엔드 프로세스에서 직접 로드하여 판정 (AI 서버 호출 없음)
+    # - http : AI 서버의 /auto-control/recommendations 호출
+    AI_CONTROL_MODE: str = "local"
+    AI_PROFILE_PATH: str = ""  # 비어 있으면 app/ai/models/profiles.json
+
     @property
     def mobius_base_url(self) -> str:
         """Mobius CSE 베이스 URL"""
@@ -3,6 +3,10 @@
 SQLAlchemy 비동기 엔진과 세션을 설정합니다.
 """
 
+import hashlib
+
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase
 
@@ -53,3 +57,44 @@ def get_db_session():
     async with get_db_session() as db: 형태로 사용
     """
     return async_session()
+
+
+def schema_fingerprint() -> str:
+    """등록된 모델(테이블/컬럼/인덱스) 정의의 해시 = 스키마 버전"""
+    parts = []
+    for table in sorted(Base.metadata.tables.values(), key=lambda t: t.name):
+        columns = ",".join(
+            f"{c.name}:{c.type.compile(dialect=engine.dialect)}:{int(bool(c.nullable))}"
+            for c in table.columns
+        )
+        indexes = ",".join(sorted(str(i.name) for i in table.indexes))
+        parts.append(f"{table.name}({columns})[{indexes}]")
+    return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()[:16]
+
+
+async def ensure_schema(fast: bool = True) -> str:
+    """
+    테이블 생성 확인
+    fast=True면 schema_meta 의 버전만 조회해서 같으면 create_all(테이블 리플렉션)을 건너뜁니다.
+    반환: "unchanged" (건너뜀) | "created" (create_all 실행 후 버전 기록)
+    """
+    from app.models.schema_meta import SchemaMeta
+
+    version = schema_fingerprint()
+    if fast:
+        try:
+            async with async_session() as session:
+                current = await session.scalar(
+                    select(SchemaMeta.value).where(SchemaMeta.key == "schema_version")
+                )
+            if current == version:
+                return "unchanged"
+        except SQLAlchemyError:
+            pass  # schema_meta 테이블이 아직 없음 → create_all
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with async_session() as session:
+        await session.merge(SchemaMeta(key="schema_version", value=version))
+        await session.commit()
+    return "created"
@@ -6,6 +6,7 @@ IoTCOSS 백엔드 FastAPI 앱 진입점
 import asyncio
 import json
 import logging
+import time
 from datetime import datetime, timedelta, timezone
 from contextlib import asynccontextmanager
 
@@ -13,25 +14,26 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.config import get_settings
-from app.database import engine, Base
+from app.database import engine, ensure_schema
 
 # API 라우터 import
 from app.api.devices import router as devices_router
 from app.api.power import router as power_router
-from app.api.auth import router as auth_router
-from app.api.websocket import router as websocket_router, broadcast_mqtt_message, broadcast_system_log, broadcast_device_update, get_cached_device_mac, update_device_last_seen, start_offline_checker, init_energy_accumulator, accumulate_energy, calculate_energy_kwh, update_dashboard_from_accumulator, KST
+from app.api.auth import router as auth_router, shutdown_hash_executor
+from app.api.websocket import router as websocket_router, broadcast_mqtt_message, broadcast_system_log, broadcast_device_update, get_cached_device_mac, update_device_last_seen, start_offline_checker, init_energy_accumulator, restore_energy_snapshot, warm_energy_accumulator, save_energy_snapshot, start_energy_snapshot_task, accumulate_energy, get_device_energy, calculate_energy_kwh, update_dashboard_from_accumulator, start_dashboard_flusher, KST
 from app.api.mobius import router as mobius_router
 from app.api.api_logs import router as api_logs_router
 from app.api.system_logs import router as system_logs_router
 from app.api.device_mac import router as device_mac_router
 from app.api.schedules import router as schedules_router
-from app.api.ai_analysis import router as ai_router
+from app.api.ai_analysis import router as ai_router, start_ai_summary_precompute
 
 # 서비스 import
 from app.services.mqtt_service import mqtt_service
 from app.services.mobius_service import mobius_service
 from app.services.schedule_service import schedule_service
-from app.services.ai_auto_control_service import start_ai_auto_control_service
+from app.services.ai_auto_control_service import start_ai_auto_control_service, close_ai_http_client
+from app.services.openai_service import close_openai_client
 
 # DB 세션 (로그 저장용)
 from app.database import async_session
@@ -55,23 +57,47 @@ logger = logging.getLogger(__name__)
 async def lifespan(app: FastAPI):
     """
     앱 시작/종료 시 실행되는 lifespan 이벤트 핸들러
-    - 시작: DB 테이블 생성, MQTT 브로커 연결
-    - 종료: MQTT 연결 해제, DB 엔진 종료
+    - 시작: DB 스키마 확인, 전력량 누적기 복원, MQTT 브로커 연결 (단계별 소요 시간 기록)
+    - 종료: MQTT 연결 해제, 전력량 누적기 스냅샷 저장, DB 엔진 종료
     """
     # === 앱 시작 시 ===
     logger.info("IoTCOSS 백엔드 서버를 시작합니다...")
 
+    # 단계별 시작 소요 시간 (ms)
+    startup_timings: dict[str, float] = {}
+    t_boot = t_phase = time.perf_counter()
+
+    def _mark(phase: str):
+        nonlocal t_phase
+        now = time.perf_counter()
+        startup_timings[phase] = round((now - t_phase) * 1000, 1)
+        t_phase = now
+
     # 데이터베이스 테이블 생성 (개발 환경용, 운영에서는 Alembic 사용 권장)
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-    logger.info("데이터베이스 테이블 초기화 완료")
+    # 빠른 시작이면 스키마 버전만 확인하고 같으면 create_all 생략
+    schema_state = await ensure_schema(fast=settings.STARTUP_FAST_PATH)
+    logger.info(f"데이터베이스 테이블 초기화 완료 ({'버전 동일, create_all 생략' if schema_state == 'unchanged' else 'create_all 실행'})")
+    _mark("schema")
 
     # 전력량 누적기 초기화 + 오프라인 감지 백그라운드 태스크 시작
-    try:
-        await init_energy_accumulator()
-    except Exception as e:
-        logger.error(f"전력량 누적기 초기화 실패 (서버는 계속 실행됩니다): {e}")
+    # 빠른 시작이면 스냅샷으로 즉시 복원하고, 스냅샷 이후 구간은 백그라운드에서 보정
+    accumulator_task = None
+    if settings.STARTUP_FAST_PATH:
+        snapshot = restore_energy_snapshot()
+        accumulator_task = asyncio.create_task(warm_energy_accumulator(snapshot))
+        logger.info(
+            f"전력량 누적기 스냅샷 복원 ({snapshot['saved_at']:%Y-%m-%d %H:%M} 저장본), 백그라운드 보정 시작"
+            if snapshot else "전력량 누적기 스냅샷 없음, 백그라운드에서 DB 재계산"
+        )
+    else:
+        try:
+            await init_energy_accumulator()
+        except Exception as e:
+            logger.error(f"전력량 누적기 초기화 실패 (서버는 계속 실행됩니다): {e}")
     offline_checker_task = start_offline_checker()
+    snapshot_task = start_energy_snapshot_task()
+    dashboard_task = start_dashboard_flusher()
+    _mark("accumulator")
 
     # MQTT 브로커 연결 시도
     mqtt_listen_task = None
@@ -150,6 +176,8 @@ async def lifespan(app: FastAPI):
                                 "timestamp": str(parsed_ts) if parsed_ts else None,
                                 "is_online": True,
                                 "today_energy_kwh": round(today_kwh, 4),
+                                # 디바이스별 / 위치별 누적 (위젯이 DB 조회 없이 표시)
+                                "device_energy": get_device_energy(mac_addr),
                             }
 
                 # ── FAST PATH: 대시보드 업데이트를 최우선 브로드캐스트 ──
@@ -223,7 +251,6 @@ async def lifespan(app: FastAPI):
                 tasks = [_save_to_db(), broadcast_mqtt_message(topic, payload)]
                 if update_data:
                     tasks.append(broadcast_system_log(message=sensor_message, detail=sensor_detail))
-                    tasks.append(update_dashboard_from_accumulator())
 
                 await asyncio.gather(*tasks)
 
@@ -233,13 +260,25 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.warning(f"MQTT 브로커 연결 실패 (서버는 계속 실행됩니다): {e}")
 
+    _mark("mqtt")
+
     # 스케줄 서비스 시작
     schedule_task = asyncio.create_task(schedule_service.start())
     logger.info("스케줄 서비스 시작")
 
-    # AI 자동 제어 서비스 시작 (60분 주기)
-    ai_control_task = asyncio.create_task(start_ai_auto_control_service(interval_seconds=10))
-    logger.info("AI 자동 제어 서비스 시작 (60분 주기)")
+    # AI 자동 제어 서비스 시작 (정시 실행 + 60초마다 대상/프로파일 변경 확인)
+    ai_control_task = asyncio.create_task(start_ai_auto_control_service(interval_seconds=60))
+    logger.info("AI 자동 제어 서비스 시작 (정시 실행, 변경 확인 60초)")
+
+    # AI 서버 종합 분석 미리 계산 (대시보드가 기다리지 않도록)
+    ai_summary_task = start_ai_summary_precompute()
+    if ai_summary_task:
+        logger.info(f"AI 종합 분석 미리 계산 시작 ({settings.AI_SUMMARY_REFRESH_SEC}초 주기)")
+    _mark("services")
+
+    startup_timings["total"] = round((time.perf_counter() - t_boot) * 1000, 1)
+    app.state.startup_timings = startup_timings
+    logger.info("[STARTUP] " + " / ".join(f"{k} {v:.0f}ms" for k, v in startup_timings.items()))
 
     yield
 
@@ -248,6 +287,13 @@ async def lifespan(app: FastAPI):
     offline_checker_task.cancel()
     schedule_task.cancel()
     ai_control_task.cancel()
+    if ai_summary_task:
+        ai_summary_task.cancel()
+    if accumulator_task and not accumulator_task.done():
+        accumulator_task.cancel()
+    if snapshot_task:
+        snapshot_task.cancel()
+    dashboard_task.cancel()
     await schedule_service.stop()
 
     # === 앱 종료 시 ===
@@ -256,8 +302,16 @@ async def lifespan(app: FastAPI):
     # MQTT 연결 해제
     await mqtt_service.disconnect()
 
-    # Mobius HTTP 클라이언트 종료
+    # Mobius / AI 서버 HTTP 클라이언트 종료
     await mobius_service.close()
+    await close_ai_http_client()
+    await close_openai_client()
+    shutdown_hash_executor()
+
+    # dashboard 테이블 마지막 저장 + 전력량 누적기 스냅샷 저장 (다음 시작 시 재계산 없이 복원)
+    await update_dashboard_from_accumulator()
+    if await save_energy_snapshot():
+        logger.info("전력량 누적기 스냅샷 저장 완료")
 
     # DB 엔진 종료
     await engine.dispose()
@@ -313,6 +367,7 @@ async def health_check():
         "mqtt_broker": f"mqtt://{settings.MQTT_BROKER}:{settings.MQTT_PORT}",
         "mqtt_topic": settings.MQTT_TOPIC,
         "server_time": datetime.now(timezone.utc).isoformat(),
+        "startup_timings_ms": getattr(app.state, "startup_timings", None),
     }
 
 
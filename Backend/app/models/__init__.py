@@ -12,5 +12,7 @@ from app.models.device_mac import DeviceMac
 from app.models.dashboard import Dashboard
 from app.models.device_switch import DeviceSwitch
 from app.models.schedule import Schedule
+from app.models.schedule_run import ScheduleRun
+from app.models.schema_meta import SchemaMeta
 
-__all__ = ["Device", "PowerLog", "User", "ApiLog", "SystemLog", "DeviceMac", "Dashboard", "DeviceSwitch", "Schedule"]
+__all__ = ["Device", "PowerLog", "User", "ApiLog", "SystemLog", "DeviceMac", "Dashboard", "DeviceSwitch", "Schedule", "ScheduleRun", "SchemaMeta"]
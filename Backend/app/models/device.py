@@ -5,7 +5,7 @@ MQTT 메시지에서 파싱된 디바이스 센서 데이터를 저장합니다.
 
 from datetime import datetime
 
-from sqlalchemy import DateTime, Float, Integer, String
+from sqlalchemy import DateTime, Float, Index, Integer, String
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.database import Base
@@ -14,6 +14,10 @@ from app.database import Base
 class Device(Base):
     """디바이스 센서 데이터 모델"""
     __tablename__ = "devices"
+    __table_args__ = (
+        # 디바이스별 시간 범위 조회/윈도우 함수(PARTITION BY device_mac ORDER BY timestamp)용
+        Index("idx_devices_mac_timestamp", "device_mac", "timestamp"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     device_name: Mapped[str] = mapped_column(
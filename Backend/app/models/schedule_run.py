@@ -0,0 +1,35 @@
+"""
+스케줄 실행 기록 모델
+스케줄별로 마지막으로 실행한 ON/OFF 발생 시각을 저장합니다.
+서버 재시작/지연으로 놓친 스케줄을 보정하는 기준으로 사용합니다.
+"""
+
+from datetime import datetime
+
+from sqlalchemy import DateTime, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+from app.models.system_log import get_kst_now
+
+
+class ScheduleRun(Base):
+    """스케줄 실행 기록 모델"""
+    __tablename__ = "schedule_runs"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    schedule_id: Mapped[int] = mapped_column(
+        Integer, unique=True, nullable=False, comment="스케줄 ID (schedules.id)"
+    )
+    last_action: Mapped[str] = mapped_column(
+        String(10), nullable=False, comment="마지막 실행 동작 (on/off)"
+    )
+    last_occurrence: Mapped[datetime] = mapped_column(
+        DateTime, nullable=False, comment="마지막으로 실행한 발생 시각 (KST)"
+    )
+    executed_at: Mapped[datetime] = mapped_column(
+        DateTime, default=get_kst_now, nullable=False, comment="실제 실행 시각 (KST)"
+    )
+
+    def __repr__(self) -> str:
+        return f"<ScheduleRun(schedule_id={self.schedule_id}, action='{self.last_action}', at={self.last_occurrence})>"
@@ -0,0 +1,27 @@
+"""
+스키마 메타 정보 모델
+현재 DB 스키마가 어떤 모델 정의(버전 해시)로 만들어졌는지 저장합니다.
+서버 시작 시 버전이 같으면 create_all(테이블 리플렉션)을 건너뜁니다.
+"""
+
+from datetime import datetime
+
+from sqlalchemy import DateTime, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+from app.models.system_log import get_kst_now
+
+
+class SchemaMeta(Base):
+    """스키마 메타 정보 (key-value)"""
+    __tablename__ = "schema_meta"
+
+    key: Mapped[str] = mapped_column(String(50), primary_key=True, comment="키 (schema_version 등)")
+    value: Mapped[str] = mapped_column(String(255), nullable=False, comment="값")
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime, default=get_kst_now, onupdate=get_kst_now, nullable=False, comment="갱신 시각 (KST)"
+    )
+
+    def __repr__(self) -> str:
+        return f"<SchemaMeta({self.key}={self.value})>"
@@ -1,11 +1,16 @@
 """
 AI 자동 제어 서비스
 profiles.json 기반으로 AI가 추천한 대로 릴레이를 자동 제어합니다.
+기본(AI_CONTROL_MODE=local)은 프로파일을 프로세스 안에서 직접 판정하고,
+http 모드일 때만 AI 서버의 일괄 추천 API를 호출합니다.
 """
 
 import asyncio
 import logging
-from typing import List
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional
 
 import httpx
 from sqlalchemy import select
@@ -13,6 +18,9 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database import async_session
 from app.models.device_mac import DeviceMac
+from app.models.device_switch import DeviceSwitch
+from app.services.power_control_service import apply_power_states
+from app.ai.profile_model import DEFAULT_PROFILE_PATH, ProfileModel
 from app.config import get_settings
 
 logger = logging.getLogger(__name__)
@@ -27,65 +35,218 @@ async def get_ai_enabled_devices(db: AsyncSession) -> List[DeviceMac]:
     return result.scalars().all()
 
 
-async def get_ai_recommendation(device_mac: str) -> dict:
-    """AI 서버로부터 특정 디바이스의 제어 추천 받기"""
-    ai_server_url = settings.AI_REPORT_URL or "http://iotcoss.nexcode.kr:8001"
-    
+# AI 서버 호출용 공유 HTTP 클라이언트 (커넥션 풀 재사용)
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def get_ai_http_client() -> httpx.AsyncClient:
+    """AI 서버용 공유 httpx 클라이언트를 반환합니다."""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            base_url=settings.AI_REPORT_URL or "http://iotcoss.nexcode.kr:8001",
+            timeout=10.0,
+        )
+    return _http_client
+
+
+async def close_ai_http_client():
+    """공유 HTTP 클라이언트 종료"""
+    if _http_client and not _http_client.is_closed:
+        await _http_client.aclose()
+
+
+async def get_ai_recommendations() -> Optional[Dict[str, dict]]:
+    """AI 서버의 일괄 추천 API로 전체 디바이스의 제어 추천을 한 번에 받기 (MAC → 추천)"""
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.get(
-                f"{ai_server_url}/devices/{device_mac}/auto-control-recommendation"
-            )
-            response.raise_for_status()
-            return response.json()
+        response = await get_ai_http_client().get("/auto-control/recommendations")
+        response.raise_for_status()
+        items = response.json().get("items", [])
+        return {item["device_mac"]: item for item in items if item.get("device_mac")}
     except Exception as e:
-        logger.error(f"AI 추천 조회 실패 ({device_mac}): {e}")
-        return {"action": "off", "reason": f"오류: {e}"}
+        logger.error(f"AI 일괄 추천 조회 실패: {e}")
+        return None
 
 
-async def run_ai_auto_control_cycle():
-    """AI 자동 제어 1회 실행 사이클"""
-    # devices.py의 control_device_power를 사용하기 위해 import
-    from app.api.devices import PowerControlRequest, control_device_power
-    
-    async with async_session() as db:
+# 프로세스 내 프로파일 모델 (파일이 바뀌면 자동 재로드)
+_profile_model: Optional[ProfileModel] = None
+
+
+def get_profile_model() -> ProfileModel:
+    """프로파일 모델을 반환합니다. 최초 1회 로드 후 파일 변경 시에만 다시 읽습니다."""
+    global _profile_model
+    if _profile_model is None:
+        _profile_model = ProfileModel.load(Path(settings.AI_PROFILE_PATH or DEFAULT_PROFILE_PATH))
+    else:
+        _profile_model = _profile_model.reload_if_changed()
+    return _profile_model
+
+
+def get_local_recommendations(device_macs: List[str]) -> Dict[str, dict]:
+    """프로파일 모델로 전체 디바이스 추천을 한 번의 배열 연산으로 계산 (MAC → 추천)"""
+    items = get_profile_model().recommend_all(device_macs)
+    return {item["device_mac"]: item for item in items}
+
+
+async def get_desired_states(db: AsyncSession, device_macs: List[str]) -> Dict[str, str]:
+    """device_switch 테이블에서 현재 제어 명령 상태 조회 (MAC → on/off)"""
+    result = await db.execute(
+        select(DeviceSwitch.device_mac, DeviceSwitch.desired_state)
+        .where(DeviceSwitch.device_mac.in_(device_macs))
+    )
+    return dict(result.all())
+
+
+# ── 사이클 스케줄링 / 지표 ──
+
+# 동시에 두 사이클이 돌지 않도록 보호
+_cycle_lock = asyncio.Lock()
+
+# 마지막으로 제어를 마친 입력 상태 (요일/시간대, 대상 디바이스, 프로파일 버전, 제어 후 desired_state)
+_last_cycle_key: Optional[tuple] = None
+
+_metrics: Dict[str, Any] = {
+    "cycles_run": 0,
+    "cycles_skipped": 0,
+    "last_skip_reason": None,
+    "last_run_at": None,
+    "last_duration_ms": None,
+    "last_target_devices": 0,
+    "last_commanded_devices": 0,
+    "total_commanded_devices": 0,
+    "last_error": None,
+}
+
+
+def get_ai_auto_control_metrics() -> Dict[str, Any]:
+    """AI 자동 제어 사이클 지표를 반환합니다."""
+    return dict(_metrics)
+
+
+def _cycle_key(device_macs: List[str], now: datetime, states: Dict[str, str]) -> tuple:
+    """
+    추천 결과나 제어 필요 여부를 바꿀 수 있는 입력만 모은 키 (같으면 사이클 결과도 같음)
+    desired_state 를 포함하므로 수동으로 상태를 바꾸면 다음 확인 주기에 AI 추천으로 다시 맞춤
+    """
+    profile_version = get_profile_model().mtime if settings.AI_CONTROL_MODE != "http" else None
+    return (now.weekday(), now.hour, frozenset(device_macs), profile_version, frozenset(states.items()))
+
+
+def _skip(reason: str):
+    _metrics["cycles_skipped"] += 1
+    _metrics["last_skip_reason"] = reason
+    logger.debug(f"[AI_CONTROL] 사이클 건너뜀: {reason}")
+
+
+def seconds_until_next_cycle(interval_seconds: int) -> float:
+    """
+    다음 사이클까지 대기 시간
+    프로파일 추천은 정시에만 바뀌므로 다음 정시(+1초)에 맞추고,
+    그 사이에는 interval_seconds 간격으로 대상 디바이스/프로파일 변경만 확인합니다.
+    """
+    now = datetime.now()
+    next_hour = now.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+    until_hour = (next_hour - now).total_seconds() + 1
+    return max(1.0, min(float(interval_seconds), until_hour))
+
+
+async def run_ai_auto_control_cycle(force: bool = False):
+    """
+    AI 자동 제어 1회 실행 사이클
+    - 이전 사이클이 아직 실행 중이면 건너뜀
+    - 시간대/대상 디바이스/프로파일/현재 desired_state 가 지난 사이클 직후와 같으면 건너뜀 (force=True면 무시)
+      (시간 중간에 수동으로 desired_state 를 바꿔도 다음 확인 주기에 다시 AI 추천으로 맞춤)
+    - DB 세션은 단계별로 짧게 열고 닫음
+    """
+    global _last_cycle_key
+
+    if _cycle_lock.locked():
+        _skip("이전 사이클 실행 중")
+        return
+
+    async with _cycle_lock:
+        started = time.perf_counter()
         try:
             # 1. AI 자동 제어 활성화된 디바이스 조회
-            devices = await get_ai_enabled_devices(db)
+            async with async_session() as db:
+                devices = await get_ai_enabled_devices(db)
+            device_macs = [d.device_mac for d in devices]
             
             if not devices:
-                logger.debug("[AI_CONTROL] AI 자동 제어가 활성화된 디바이스 없음")
+                _last_cycle_key = None
+                _skip("AI 자동 제어가 활성화된 디바이스 없음")
+                return
+            
+            # 현재 desired_state (수동 변경 감지 + 변경분 추림에 함께 사용)
+            async with async_session() as db:
+                current_states = await get_desired_states(db, device_macs)
+
+            now = datetime.now()
+            key = _cycle_key(device_macs, now, current_states)
+            if not force and key == _last_cycle_key:
+                _skip("입력 변경 없음")
                 return
             
             logger.info(f"[AI_CONTROL] 제어 대상: {len(devices)}개 디바이스")
             
-            # 2. 각 디바이스별로 AI 추천 받기 및 제어 실행
+            # 2. 전체 추천을 한 번에 받기 (실패 시 이번 사이클은 건너뜀)
+            if settings.AI_CONTROL_MODE == "http":
+                recommendations = await get_ai_recommendations()
+            else:
+                recommendations = get_local_recommendations(device_macs)
+            if recommendations is None:
+                logger.warning("[AI_CONTROL] AI 추천을 받지 못해 이번 사이클을 건너뜁니다")
+                _skip("AI 추천 조회 실패")
+                return
+            
+            # 3. 현재 desired_state와 비교하여 바뀌는 디바이스만 추림
+            changes: Dict[str, str] = {}
+            reasons: Dict[str, str] = {}
             for device in devices:
-                recommendation = await get_ai_recommendation(device.device_mac)
-                action = recommendation.get("action", "off")
+                # 프로파일이 없는 디바이스는 AI 서버 단건 추천과 동일하게 OFF
+                recommendation = recommendations.get(
+                    device.device_mac, {"action": "OFF", "reason": "프로파일 없음 (기본 OFF)"}
+                )
                 # action이 대소문자 상관없이 들어올 수 있으므로 소문자로 변환
-                desired_state = action.lower()
-                
-                try:
-                    # 기존 control_device_power 함수 사용
-                    request = PowerControlRequest(
-                        mac_address=device.device_mac,
-                        power_state=desired_state
-                    )
-                    await control_device_power(request, db)
-                    
+                desired_state = str(recommendation.get("action", "off")).lower()
+                if current_states.get(device.device_mac, "off") != desired_state:
+                    changes[device.device_mac] = desired_state
+                    reasons[device.device_mac] = recommendation.get("reason", "N/A")
+            
+            # 4. 변경분을 desired_state 갱신 + Mobius CIN 1건으로 전송
+            success = True
+            if changes:
+                async with async_session() as db:
+                    result = await apply_power_states(db, changes)
+                names = {d.device_mac: d.device_name for d in devices}
+                for mac, state in changes.items():
                     logger.info(
-                        f"[AI_CONTROL] {device.device_name} ({device.device_mac}) → {desired_state} "
-                        f"| 사유: {recommendation.get('reason', 'N/A')}"
+                        f"[AI_CONTROL] {names[mac]} ({mac}) → {state} | 사유: {reasons[mac]}"
                     )
-                except Exception as e:
-                    logger.error(f"[AI_CONTROL] 제어 실패 {device.device_name}: {e}")
-                
-                await asyncio.sleep(0.5)  # 각 디바이스 사이 0.5초 대기
+                success = result.success
+                if not success:
+                    logger.error(f"[AI_CONTROL] 제어 실패: Mobius 응답 {result.mobius_status} {result.mobius_body}")
+            
+            # 제어 후 상태로 키를 남김 (실패하면 남기지 않아 다음 주기에 다시 시도)
+            _last_cycle_key = (
+                _cycle_key(device_macs, now, {**current_states, **changes}) if success else None
+            )
+            
+            duration_ms = (time.perf_counter() - started) * 1000
+            _metrics["cycles_run"] += 1
+            _metrics["last_run_at"] = datetime.now().isoformat()
+            _metrics["last_duration_ms"] = round(duration_ms, 1)
+            _metrics["last_target_devices"] = len(devices)
+            _metrics["last_commanded_devices"] = len(changes)
+            _metrics["total_commanded_devices"] += len(changes)
+            _metrics["last_error"] = None if success else "Mobius 전송 실패"
             
-            logger.info("[AI_CONTROL] 사이클 완료")
+            logger.info(
+                f"[AI_CONTROL] 사이클 완료 ({len(changes)}/{len(devices)}개 디바이스 제어, {duration_ms:.0f}ms)"
+            )
             
         except Exception as e:
+            _metrics["last_error"] = str(e)
             logger.error(f"[AI_CONTROL] 사이클 실행 중 오류: {e}")
 
 
@@ -94,9 +255,10 @@ async def start_ai_auto_control_service(interval_seconds: int = 600):
     AI 자동 제어 서비스 시작
     
     Args:
-        interval_seconds: 실행 주기 (초 단위, 기본 600초 = 10분)
+        interval_seconds: 변경 확인 주기 (초 단위, 기본 600초 = 10분).
+            추천이 바뀌는 정시에는 주기와 무관하게 실행됩니다.
     """
-    logger.info(f"🤖 AI 자동 제어 서비스 시작 (주기: {interval_seconds}초)")
+    logger.info(f"🤖 AI 자동 제어 서비스 시작 (정시 실행, 변경 확인 주기: {interval_seconds}초)")
     
     while True:
         try:
@@ -104,8 +266,8 @@ async def start_ai_auto_control_service(interval_seconds: int = 600):
         except Exception as e:
             logger.error(f"[AI_CONTROL] 서비스 오류: {e}")
         
-        # 다음 실행까지 대기
-        await asyncio.sleep(interval_seconds)
+        # 다음 정시 또는 변경 확인 주기까지 대기
+        await asyncio.sleep(seconds_until_next_cycle(interval_seconds))
 
 
 # 서비스 직접 실행용
@@ -0,0 +1,149 @@
+"""
+OpenAI 호출 서비스
+- 프로세스 전체에서 AsyncOpenAI 클라이언트 하나를 공유 (커넥션 풀 재사용)
+- 요청 내용(모델 + 메시지 + 파라미터) 해시를 키로 응답 텍스트를 TTL 캐시
+- 같은 내용의 요청이 동시에 들어오면 진행 중인 호출 하나를 함께 기다림
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from app.config import get_settings
+
+try:
+    from openai import AsyncOpenAI
+except ImportError:
+    AsyncOpenAI = None
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+_client: Optional["AsyncOpenAI"] = None
+
+# 내용 해시 → (만료 시각 monotonic, 응답 텍스트)
+_cache: "OrderedDict[str, tuple[float, str]]" = OrderedDict()
+_inflight: Dict[str, asyncio.Future] = {}
+_metrics: Dict[str, Any] = {
+    "calls": 0,
+    "cache_hits": 0,
+    "inflight_joins": 0,
+    "errors": 0,
+    "last_latency_ms": None,
+}
+
+
+def is_openai_available() -> bool:
+    return bool(settings.OPENAI_API_KEY) and AsyncOpenAI is not None
+
+
+def get_openai_client() -> "AsyncOpenAI":
+    """공유 AsyncOpenAI 클라이언트를 반환합니다."""
+    global _client
+    if _client is None:
+        _client = AsyncOpenAI(
+            api_key=settings.OPENAI_API_KEY,
+            base_url=settings.OPENAI_BASE_URL or None,
+            timeout=settings.OPENAI_TIMEOUT_SEC,
+        )
+    return _client
+
+
+async def close_openai_client():
+    """공유 OpenAI 클라이언트 종료"""
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
+
+
+def _content_key(model: str, messages: List[Dict[str, str]], params: Dict[str, Any]) -> str:
+    body = json.dumps(
+        {"base_url": settings.OPENAI_BASE_URL, "model": model, "messages": messages, "params": params},
+        ensure_ascii=False,
+        sort_keys=True,
+    )
+    return hashlib.sha256(body.encode("utf-8")).hexdigest()
+
+
+def _cache_get(key: str) -> Optional[str]:
+    item = _cache.get(key)
+    if item is None:
+        return None
+    expires_at, text = item
+    if expires_at < time.monotonic():
+        del _cache[key]
+        return None
+    _cache.move_to_end(key)
+    return text
+
+
+def _cache_put(key: str, text: str):
+    if settings.OPENAI_CACHE_TTL_SEC <= 0 or settings.OPENAI_CACHE_MAX_ENTRIES <= 0:
+        return
+    _cache[key] = (time.monotonic() + settings.OPENAI_CACHE_TTL_SEC, text)
+    _cache.move_to_end(key)
+    while len(_cache) > settings.OPENAI_CACHE_MAX_ENTRIES:
+        _cache.popitem(last=False)
+
+
+async def _call(model: str, messages: List[Dict[str, str]], params: Dict[str, Any]) -> str:
+    t0 = time.perf_counter()
+    _metrics["calls"] += 1
+    try:
+        response = await get_openai_client().chat.completions.create(model=model, messages=messages, **params)
+    except Exception:
+        _metrics["errors"] += 1
+        raise
+    _metrics["last_latency_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+    return response.choices[0].message.content or ""
+
+
+async def chat_completion(
+    messages: List[Dict[str, str]],
+    model: Optional[str] = None,
+    **params: Any,
+) -> str:
+    """
+    chat.completions 호출 결과 텍스트
+    캐시에 있으면 바로 반환, 같은 요청이 진행 중이면 그 결과를 함께 받음.
+    실패한 호출은 캐시하지 않습니다.
+    """
+    model = model or settings.OPENAI_MODEL
+    key = _content_key(model, messages, params)
+
+    cached = _cache_get(key)
+    if cached is not None:
+        _metrics["cache_hits"] += 1
+        return cached
+
+    fut = _inflight.get(key)
+    if fut is not None:
+        _metrics["inflight_joins"] += 1
+        # 먼저 온 요청이 취소돼도 뒤에 온 요청의 호출은 끝까지 진행되도록 shield
+        return await asyncio.shield(fut)
+
+    fut = asyncio.ensure_future(_call(model, messages, params))
+    _inflight[key] = fut
+
+    def _done(f: asyncio.Future):
+        _inflight.pop(key, None)
+        if not f.cancelled() and f.exception() is None:
+            _cache_put(key, f.result())
+
+    fut.add_done_callback(_done)
+    return await asyncio.shield(fut)
+
+
+def get_openai_metrics() -> Dict[str, Any]:
+    return {
+        **_metrics,
+        "cache_entries": len(_cache),
+        "inflight": len(_inflight),
+        "model": settings.OPENAI_MODEL,
+        "base_url": settings.OPENAI_BASE_URL or None,
+    }
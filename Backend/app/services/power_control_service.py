@@ -0,0 +1,90 @@
+"""
+전원 제어 서비스
+여러 디바이스의 desired_state를 한 번에 갱신하고 Mobius에 ContentInstance 1건으로 전송합니다.
+"""
+
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.device_mac import DeviceMac
+from app.models.device_switch import DeviceSwitch
+from app.services.mobius_service import mobius_service
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PowerControlResult:
+    """일괄 전원 제어 결과"""
+    control_map: Dict[str, str] = field(default_factory=dict)  # Mobius로 전송한 전체 상태
+    applied: Dict[str, str] = field(default_factory=dict)  # 이번에 변경 요청된 디바이스
+    unknown_macs: List[str] = field(default_factory=list)  # 등록되지 않은 MAC
+    mobius_status: Optional[int] = None
+    mobius_body: Any = None
+
+    @property
+    def success(self) -> bool:
+        return self.mobius_status in (200, 201)
+
+
+async def apply_power_states(db: AsyncSession, power_states: Dict[str, str]) -> PowerControlResult:
+    """
+    여러 디바이스의 전원 상태를 한 번에 적용합니다.
+    - device_mac / device_switch 테이블을 각각 1회만 조회
+    - device_switch 는 INSERT ... ON CONFLICT 한 문장으로 갱신
+    - Mobius switch 컨테이너에는 전체 디바이스 상태를 담은 CIN 1건만 전송
+    """
+    result = PowerControlResult()
+
+    # 1. 등록된 디바이스 + 현재 desired_state 조회 (각 1회)
+    registered = (await db.execute(select(DeviceMac.device_mac))).scalars().all()
+    current_states = dict(
+        (await db.execute(select(DeviceSwitch.device_mac, DeviceSwitch.desired_state))).all()
+    )
+
+    registered_set = set(registered)
+    for mac, state in power_states.items():
+        if mac in registered_set:
+            result.applied[mac] = state
+        else:
+            result.unknown_macs.append(mac)
+
+    if not result.applied:
+        return result
+
+    # 2. Mobius로 전송할 전체 상태 구성 (변경 대상은 새 상태, 나머지는 기존 상태)
+    for mac in registered:
+        result.control_map[mac] = result.applied.get(mac) or current_states.get(mac) or "off"
+
+    # 3. device_switch 일괄 저장/업데이트
+    now = datetime.utcnow()
+    stmt = pg_insert(DeviceSwitch).values([
+        {"device_mac": mac, "desired_state": state, "updated_at": now}
+        for mac, state in result.applied.items()
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[DeviceSwitch.device_mac],
+        set_={"desired_state": stmt.excluded.desired_state, "updated_at": stmt.excluded.updated_at},
+    )
+    await db.execute(stmt)
+    await db.commit()
+    logger.info(f"제어 명령 상태 일괄 저장: {len(result.applied)}개 디바이스 → {result.applied}")
+
+    # 4. Mobius에 ContentInstance 1건 생성
+    payload = {
+        "m2m:cin": {
+            "con": result.control_map,
+            "lbl": ["smart_plug"]
+        }
+    }
+    logger.debug(f"전체 디바이스 상태 전송: {result.control_map}")
+    response = await mobius_service.create_cin("ae_nexcode", "switch", payload)
+    result.mobius_status = response.get("status")
+    result.mobius_body = response.get("body")
+    return result
@@ -7,16 +7,17 @@ import asyncio
 import json
 import logging
 from datetime import datetime, time as dt_time, timezone, timedelta
-from typing import List
+from typing import Dict, List, Optional, Tuple
 
 from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 
 from app.database import get_db_session
 from app.models.schedule import Schedule
-from app.models.device_switch import DeviceSwitch
+from app.models.schedule_run import ScheduleRun
 from app.models.system_log import SystemLog
 from app.services.mobius_service import MobiusService
+from app.services.power_control_service import PowerControlResult, apply_power_states
 
 logger = logging.getLogger(__name__)
 
@@ -31,13 +32,71 @@ def get_naive_kst_now():
                    kst_time.hour, kst_time.minute, kst_time.second, kst_time.microsecond)
 
 
+# 누락 스케줄 보정 시 거슬러 올라가는 최대 일수
+CATCHUP_LOOKBACK_DAYS = 7
+
+
+def _seconds_until_next_minute() -> float:
+    """다음 분 경계(+1초)까지 남은 시간"""
+    now = datetime.now(KST)
+    return 61 - now.second - now.microsecond / 1_000_000
+
+
+def _to_naive_kst(value: Optional[datetime]) -> Optional[datetime]:
+    """timezone-aware 시각을 timezone-naive KST로 변환 (naive면 그대로)"""
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(KST).replace(tzinfo=None)
+
+
+def _parse_time(value) -> dt_time:
+    """DB 값(time 또는 문자열)을 time 객체로 변환"""
+    if isinstance(value, dt_time):
+        return value
+    return dt_time.fromisoformat(str(value))
+
+
+def get_latest_occurrence(schedule: Schedule, since: datetime, now: datetime) -> Optional[Tuple[datetime, str]]:
+    """
+    since < 발생 시각 <= now 범위에서 가장 최근의 ON/OFF 발생을 반환합니다.
+    - start_time이 00:00:00이면 ON 없음, end_time이 23:59:59면 OFF 없음
+    - 같은 시각에 ON/OFF가 겹치면 ON 우선
+    """
+    days = {int(d.strip()) for d in schedule.days_of_week.split(',') if d.strip()}
+    start_original = _parse_time(schedule.start_time)
+    end_original = _parse_time(schedule.end_time)
+    start_time = start_original.replace(second=0, microsecond=0)
+    end_time = end_original.replace(second=0, microsecond=0)
+
+    since = max(since, now - timedelta(days=CATCHUP_LOOKBACK_DAYS))
+
+    for offset in range(CATCHUP_LOOKBACK_DAYS + 1):
+        day = now.date() - timedelta(days=offset)
+        if day.weekday() not in days:
+            continue
+
+        candidates = []
+        if start_original != dt_time(0, 0, 0):
+            candidates.append((datetime.combine(day, start_time), "on"))
+        if end_original != dt_time(23, 59, 59):
+            candidates.append((datetime.combine(day, end_time), "off"))
+
+        past = [c for c in candidates if c[0] <= now]
+        if not past:
+            continue
+
+        latest = max(past, key=lambda c: (c[0], c[1] == "on"))
+        return latest if latest[0] > since else None
+
+    return None
+
+
 class ScheduleService:
     """스케줄 실행 서비스"""
     
     def __init__(self):
         self.mobius_service = MobiusService()
         self.is_running = False
-        self.last_checked_minute = -1
     
     async def start(self):
         """스케줄 서비스 시작"""
@@ -79,10 +138,11 @@ class ScheduleService:
         print("[SCHEDULE SERVICE] while 루프 시작...")
 
         
+        # 첫 체크에서 서버 중단 중 놓친 스케줄을 보정한 뒤, 매 분 경계마다 체크
         while self.is_running:
             try:
                 await self._check_schedules()
-                await asyncio.sleep(60)  # 1분마다 체크
+                await asyncio.sleep(_seconds_until_next_minute())
             except Exception as e:
                 logger.error(f"스케줄 체크 중 오류: {e}", exc_info=True)
                 # 오류를 SystemLog에 기록 (새 세션 사용)
@@ -100,7 +160,7 @@ class ScheduleService:
                         await db.commit()
                 except Exception as log_error:
                     logger.error(f"오류 로그 저장 실패: {log_error}")
-                await asyncio.sleep(60)  # 에러 발생 시에도 1분 후 재시도
+                await asyncio.sleep(_seconds_until_next_minute())  # 에러 발생 시에도 다음 분에 재시도
     
     async def stop(self):
         """스케줄 서비스 중지"""
@@ -108,182 +168,169 @@ class ScheduleService:
         logger.info("스케줄 서비스 중지")
     
     async def _check_schedules(self):
-        """현재 시간에 실행할 스케줄 확인 및 실행"""
-        now = datetime.now(KST)  # 한국 시간 사용
-        current_time = now.time().replace(second=0, microsecond=0)
-        current_day = now.weekday()  # 0=월요일, 6=일요일
-        current_minute = now.hour * 60 + now.minute
-        
-        # 같은 분에 중복 실행 방지
-        if current_minute == self.last_checked_minute:
-            # 30초마다 체크 시도는 하지만 같은 분은 스킵
-            async with get_db_session() as db:
-                skip_log = SystemLog(
-                    timestamp=get_naive_kst_now(),
-                    type="SYSTEM",
-                    level="info",
-                    source="Schedule",
-                    message=f"30초 체크: {now.strftime('%H:%M:%S')} (같은 분이라 스킵)",
-                    detail=None
-                )
-                db.add(skip_log)
-                await db.commit()
-            return
-        
-        self.last_checked_minute = current_minute
-        
-        logger.debug(f"[스케줄 체크] 현재 시간: {now.strftime('%Y-%m-%d %H:%M:%S %Z')} (요일: {current_day})")
-        
+        """
+        실행할 스케줄 확인 및 실행
+        스케줄별 마지막 실행 발생 시각(schedule_runs) 이후 ~ 현재 사이의 가장 최근 ON/OFF를 찾아 실행합니다.
+        서버 재시작/지연으로 여러 번 놓쳤더라도 이벤트를 재생하지 않고 현재 있어야 할 상태로 한 번에 맞춥니다.
+        """
+        now = get_naive_kst_now()
+        logger.debug(f"[스케줄 체크] 현재 시간: {now.strftime('%Y-%m-%d %H:%M:%S')} (요일: {now.weekday()})")
+
         async with get_db_session() as db:
-            # 활성화된 스케줄 조회
+            # 활성화된 스케줄 + 실행 기록 조회
             result = await db.execute(
                 select(Schedule).where(Schedule.enabled == True)
             )
             schedules: List[Schedule] = result.scalars().all()
-            
-            logger.info(f"[스케줄 체크] 활성 스케줄 {len(schedules)}개 발견")
-            
-            # System Log에 체크 기록
-            check_log = SystemLog(
-                timestamp=get_naive_kst_now(),
-                type="SYSTEM",
-                level="info",
-                source="Schedule",
-                message=f"스케줄 체크: {now.strftime('%H:%M:%S')} | 활성 스케줄 {len(schedules)}개",
-                detail=None
+            if not schedules:
+                return
+
+            runs_result = await db.execute(
+                select(ScheduleRun.schedule_id, ScheduleRun.last_occurrence)
+                .where(ScheduleRun.schedule_id.in_([s.id for s in schedules]))
             )
-            db.add(check_log)
-            await db.commit()
-            
+            last_runs: Dict[int, datetime] = dict(runs_result.all())
+
+            logger.debug(f"[스케줄 체크] 활성 스케줄 {len(schedules)}개")
+
+            due: List[Tuple[Schedule, datetime, str]] = []
             for schedule in schedules:
-                # 요일 확인
-                days = [int(d.strip()) for d in schedule.days_of_week.split(',')]
-                logger.debug(f"[스케줄] {schedule.schedule_name} - 실행 요일: {days}, 현재 요일: {current_day}")
-                
-                if current_day not in days:
-                    logger.debug(f"[스케줄] {schedule.schedule_name} - 오늘은 실행 안 함 (요일 불일치)")
-                    continue
-                
-                # 시간을 time 객체로 변환
-                if isinstance(schedule.start_time, dt_time):
-                    start_time_original = schedule.start_time
-                    start_time = schedule.start_time.replace(second=0, microsecond=0)
-                else:
-                    start_time_original = dt_time.fromisoformat(str(schedule.start_time))
-                    start_time = start_time_original.replace(second=0, microsecond=0)
-                
-                if isinstance(schedule.end_time, dt_time):
-                    end_time_original = schedule.end_time
-                    end_time = schedule.end_time.replace(second=0, microsecond=0)
-                else:
-                    end_time_original = dt_time.fromisoformat(str(schedule.end_time))
-                    end_time = end_time_original.replace(second=0, microsecond=0)
-                
-                logger.info(f"[스케줄 비교] {schedule.schedule_name}")
-                logger.info(f"  - 현재: {current_time} / 시작: {start_time} / 종료: {end_time}")
-                
-                # System Log에 스케줄 비교 기록
-                detail_info = {
-                    "schedule_name": schedule.schedule_name,
-                    "current": str(current_time),
-                    "start": str(start_time),
-                    "end": str(end_time),
-                    "start_original": str(start_time_original),
-                    "end_original": str(end_time_original)
-                }
-                comparison_log = SystemLog(
+                since = last_runs.get(schedule.id) or _to_naive_kst(schedule.created_at) or now
+                occurrence = get_latest_occurrence(schedule, since, now)
+                if occurrence:
+                    due.append((schedule, *occurrence))
+
+            if not due:
+                return
+
+            # 같은 디바이스에 여러 스케줄이 걸리면 가장 최근 발생이 현재 상태를 결정 (동시각이면 ON 우선)
+            winners: Dict[str, Tuple[Schedule, datetime, str]] = {}
+            for item in due:
+                mac = item[0].device_mac
+                current = winners.get(mac)
+                if current is None or (item[1], item[2] == "on") > (current[1], current[2] == "on"):
+                    winners[mac] = item
+
+            # 실행 로그를 한 번에 기록
+            for schedule, occurred_at, action in winners.values():
+                missed = now - occurred_at >= timedelta(minutes=2)
+                label = "누락 보정 " if missed else ""
+                logger.info(
+                    f"스케줄 {label}실행 ({action.upper()}): {schedule.schedule_name} "
+                    f"(MAC: {schedule.device_mac}, 발생: {occurred_at})"
+                )
+                db.add(SystemLog(
                     timestamp=get_naive_kst_now(),
                     type="SYSTEM",
                     level="info",
                     source="Schedule",
-                    message=f"비교: {schedule.schedule_name} | 현재={current_time} 시작={start_time} 종료={end_time}",
-                    detail=json.dumps(detail_info, ensure_ascii=False)
-                )
-                db.add(comparison_log)
+                    message=f"{label}{action.upper()} 실행: {schedule.schedule_name} ({schedule.device_mac})",
+                    detail=json.dumps({
+                        "mac": schedule.device_mac,
+                        "action": action,
+                        "occurrence": occurred_at.isoformat(),
+                        "missed": missed,
+                    }, ensure_ascii=False)
+                ))
+            await db.commit()
+
+        control_result = await self._execute_power_control_batch(
+            [(schedule.schedule_name, schedule.device_mac, action) for schedule, _, action in winners.values()]
+        )
+
+        # 전송에 성공한 경우에만 기록 → 실패 시 다음 체크에서 다시 시도
+        if control_result is not None and control_result.success:
+            await self._record_runs(due)
+
+    async def _record_runs(self, due: List[Tuple[Schedule, datetime, str]]):
+        """스케줄별 마지막 실행 발생 시각을 schedule_runs에 일괄 저장"""
+        executed_at = get_naive_kst_now()
+        stmt = pg_insert(ScheduleRun).values([
+            {
+                "schedule_id": schedule.id,
+                "last_action": action,
+                "last_occurrence": occurred_at,
+                "executed_at": executed_at,
+            }
+            for schedule, occurred_at, action in due
+        ])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[ScheduleRun.schedule_id],
+            set_={
+                "last_action": stmt.excluded.last_action,
+                "last_occurrence": stmt.excluded.last_occurrence,
+                "executed_at": stmt.excluded.executed_at,
+            },
+        )
+        try:
+            async with get_db_session() as db:
+                await db.execute(stmt)
                 await db.commit()
-                
-                # start_time이 00:00:00이 아닐 때만 체크 (ON 스케줄)
-                if start_time_original != dt_time(0, 0, 0) and current_time == start_time:
-                    logger.info(f"스케줄 실행 (ON): {schedule.schedule_name} (MAC: {schedule.device_mac})")
-                    
-                    exec_log = SystemLog(
-                        timestamp=get_naive_kst_now(),
-                        type="SYSTEM",
-                        level="info",
-                        source="Schedule",
-                        message=f"ON 실행: {schedule.schedule_name} ({schedule.device_mac})",
-                        detail=json.dumps({"mac": schedule.device_mac, "action": "on"}, ensure_ascii=False)
-                    )
-                    db.add(exec_log)
-                    await db.commit()
-                    
-                    await self._execute_power_control(schedule.device_mac, "on")
-                
-                # end_time이 23:59:59가 아닐 때만 체크 (OFF 스케줄)
-                elif end_time_original != dt_time(23, 59, 59) and current_time == end_time:
-                    logger.info(f"스케줄 실행 (OFF): {schedule.schedule_name} (MAC: {schedule.device_mac})")
-                    
-                    exec_log = SystemLog(
-                        timestamp=get_naive_kst_now(),
-                        type="SYSTEM",
-                        level="info",
-                        source="Schedule",
-                        message=f"OFF 실행: {schedule.schedule_name} ({schedule.device_mac})",
-                        detail=json.dumps({"mac": schedule.device_mac, "action": "off"}, ensure_ascii=False)
-                    )
-                    db.add(exec_log)
-                    await db.commit()
-                    
-                    await self._execute_power_control(schedule.device_mac, "off")
+        except Exception as e:
+            logger.error(f"스케줄 실행 기록 저장 실패: {e}")
     
-    async def _execute_power_control(self, device_mac: str, power_state: str):
-        """전원 제어 실행 - 기존 API 재사용"""
+    async def _execute_power_control_batch(self, actions: List[Tuple[str, str, str]]) -> Optional[PowerControlResult]:
+        """
+        같은 시각에 실행할 전원 제어를 1회의 desired_state 갱신 + Mobius CIN 1건으로 처리
+        actions: (스케줄 이름, MAC, on/off) 목록
+        """
+        # 같은 디바이스에 여러 스케줄이 겹치면 ON을 우선 (기존 ON → OFF 판정 순서와 동일)
+        power_states: Dict[str, str] = {}
+        for _, device_mac, power_state in actions:
+            if power_states.get(device_mac) != "on":
+                power_states[device_mac] = power_state
+
         try:
-            logger.info(f"[전원 제어 시작] MAC: {device_mac}, 상태: {power_state}")
-            
-            # 기존 전원 제어 API를 직접 호출
-            from app.api.devices import control_device_power
-            from app.schemas.device import PowerControlRequest
-            
+            logger.info(f"[전원 제어 시작] {len(power_states)}개 디바이스: {power_states}")
+
             async with get_db_session() as db:
-                request = PowerControlRequest(
-                    mac_address=device_mac,
-                    power_state=power_state
-                )
-                
-                response = await control_device_power(request, db)
-                
-                logger.info(f"전원 제어 완료: {response}")
-                
-                # SystemLog에 성공 기록
-                success_log = SystemLog(
-                    timestamp=get_naive_kst_now(),
-                    type="SYSTEM",
-                    level="info",
-                    source="Schedule",
-                    message=f"전원 제어 성공: {device_mac} → {power_state}",
-                    detail=f"Mobius 응답: {response.mobius_status}"
-                )
-                db.add(success_log)
+                result = await apply_power_states(db, power_states)
+                logger.info(f"전원 제어 완료: Mobius 응답 {result.mobius_status}")
+
+                # 스케줄별 결과를 한 번에 기록
+                logs = []
+                for schedule_name, device_mac, power_state in actions:
+                    if device_mac in result.unknown_macs:
+                        level, message = "error", f"전원 제어 오류: {device_mac} → {power_state} (등록되지 않은 디바이스)"
+                    elif result.success:
+                        level, message = "info", f"전원 제어 성공: {device_mac} → {power_states[device_mac]}"
+                    else:
+                        level, message = "error", f"전원 제어 실패: {device_mac} → {power_states[device_mac]}"
+                    logs.append(SystemLog(
+                        timestamp=get_naive_kst_now(),
+                        type="SYSTEM",
+                        level=level,
+                        source="Schedule",
+                        message=message,
+                        detail=json.dumps({
+                            "schedule_name": schedule_name,
+                            "mobius_status": result.mobius_status,
+                        }, ensure_ascii=False)
+                    ))
+                db.add_all(logs)
                 await db.commit()
+            return result
         
         except Exception as e:
             logger.error(f"스케줄 전원 제어 중 오류: {e}", exc_info=True)
             # 오류도 SystemLog에 기록
             try:
                 async with get_db_session() as db:
-                    error_log = SystemLog(
-                        timestamp=get_naive_kst_now(),
-                        type="SYSTEM",
-                        level="error",
-                        source="Schedule",
-                        message=f"전원 제어 오류: {device_mac} → {power_state}",
-                        detail=str(e)
-                    )
-                    db.add(error_log)
+                    db.add_all([
+                        SystemLog(
+                            timestamp=get_naive_kst_now(),
+                            type="SYSTEM",
+                            level="error",
+                            source="Schedule",
+                            message=f"전원 제어 오류: {device_mac} → {power_state}",
+                            detail=str(e)
+                        )
+                        for device_mac, power_state in power_states.items()
+                    ])
                     await db.commit()
             except Exception as log_error:
                 logger.error(f"오류 로그 저장 실패: {log_error}")
+            return None
 
 
 # 전역 스케줄 서비스 인스턴스
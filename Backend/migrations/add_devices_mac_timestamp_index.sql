@@ -0,0 +1,3 @@
+-- 디바이스별 시계열 조회 인덱스 (AI 분석 이상치 탐지 등)
+-- 운영 중 테이블 잠금을 피하려면 트랜잭션 밖에서 CONCURRENTLY로 실행
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_devices_mac_timestamp ON devices(device_mac, "timestamp");
@@ -0,0 +1,13 @@
+-- 스케줄 실행 기록 (누락 스케줄 보정용)
+CREATE TABLE IF NOT EXISTS schedule_runs (
+    id SERIAL PRIMARY KEY,
+    schedule_id INTEGER NOT NULL UNIQUE,
+    last_action VARCHAR(10) NOT NULL,
+    last_occurrence TIMESTAMP NOT NULL,
+    executed_at TIMESTAMP NOT NULL DEFAULT (NOW() AT TIME ZONE 'Asia/Seoul')
+);
+
+COMMENT ON COLUMN schedule_runs.schedule_id IS '스케줄 ID (schedules.id)';
+COMMENT ON COLUMN schedule_runs.last_action IS '마지막 실행 동작 (on/off)';
+COMMENT ON COLUMN schedule_runs.last_occurrence IS '마지막으로 실행한 발생 시각 (KST)';
+COMMENT ON COLUMN schedule_runs.executed_at IS '실제 실행 시각 (KST)';
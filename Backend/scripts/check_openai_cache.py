@@ -0,0 +1,184 @@
+"""
+check_openai_cache.py
+- openai_service.chat_completion 의 요청 공유 / TTL 캐시를 로컬 스텁 LLM 서버로 확인하는 점검 스크립트
+- 스텁 서버는 POST /v1/chat/completions 에 --delay 초 뒤 응답하고 받은 요청 수를 셈
+- OPENAI_BASE_URL 을 스텁 주소로 지정한 뒤 app.services.openai_service 를 import (설정은 lru_cache)
+- 1) 같은 프롬프트 N개 동시 호출 → 스텁 호출 정확히 1번, 모두 같은 응답
+- 2) OPENAI_CACHE_TTL_SEC 안에 같은 프롬프트 다시 호출 → 스텁 호출 없이 캐시 응답
+- 3) 진행 중인 호출을 기다리는 요청 하나(처음 호출을 시작한 요청)를 취소 → 나머지는 그 호출 결과를 그대로 받음
+
+실행 예시)
+  cd Backend
+  python scripts/check_openai_cache.py
+  python scripts/check_openai_cache.py --concurrency 32 --delay 1.0
+
+하나라도 어긋나면 AssertionError 로 종료 코드 1
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+
+class StubLLM:
+    """요청 수를 세고 delay 초 뒤 프롬프트를 그대로 돌려주는 chat.completions 스텁"""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.started = 0
+        self.finished = 0
+        self.request_seen = threading.Event()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.server.daemon_threads = True
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}/v1"
+
+    def counts(self) -> tuple[int, int]:
+        with self.lock:
+            return self.started, self.finished
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                if self.path.rstrip("/") != "/v1/chat/completions":
+                    self.send_error(404)
+                    return
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                with stub.lock:
+                    stub.started += 1
+                    n = stub.started
+                stub.request_seen.set()
+                time.sleep(stub.delay)
+
+                prompt = body.get("messages", [{}])[-1].get("content", "")
+                payload = json.dumps({
+                    "id": f"stub-{n}",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": body.get("model", "stub"),
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": f"echo#{n}: {prompt}"},
+                        "finish_reason": "stop",
+                    }],
+                    "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+                }).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+                with stub.lock:
+                    stub.finished += 1
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def prompt(text: str) -> list:
+    return [{"role": "user", "content": text}]
+
+
+async def check_concurrent(svc, stub: StubLLM, concurrency: int):
+    before = stub.counts()[0]
+    results = await asyncio.gather(*[svc.chat_completion(prompt("동시 요청")) for _ in range(concurrency)])
+    calls = stub.counts()[0] - before
+    assert calls == 1, f"동시 {concurrency}개 요청인데 스텁 호출 {calls}번"
+    assert len(set(results)) == 1, f"응답이 서로 다름: {set(results)}"
+    print(f"✅ 1) 동시 {concurrency}개 → 스텁 호출 1번, joins={svc.get_openai_metrics()['inflight_joins']}")
+    return results[0]
+
+
+async def check_cached(svc, stub: StubLLM, expected: str):
+    before = stub.counts()[0]
+    hits = svc.get_openai_metrics()["cache_hits"]
+    result = await svc.chat_completion(prompt("동시 요청"))
+    assert stub.counts()[0] == before, "TTL 안의 같은 요청이 스텁까지 감"
+    assert result == expected, f"캐시 응답이 다름: {result!r} != {expected!r}"
+    assert svc.get_openai_metrics()["cache_hits"] == hits + 1, "cache_hits 가 늘지 않음"
+    print(f"✅ 2) TTL({svc.settings.OPENAI_CACHE_TTL_SEC}s) 안 재요청 → 캐시 응답, 스텁 호출 없음")
+
+
+async def check_cancel(svc, stub: StubLLM, concurrency: int):
+    before = stub.counts()
+    stub.request_seen.clear()
+    messages = prompt("취소 테스트")
+
+    # 첫 요청이 호출을 시작하고 스텁에 도착한 뒤 나머지가 합류
+    first = asyncio.create_task(svc.chat_completion(messages))
+    await asyncio.get_running_loop().run_in_executor(None, stub.request_seen.wait, 10.0)
+    others = [asyncio.create_task(svc.chat_completion(messages)) for _ in range(max(1, concurrency - 1))]
+    await asyncio.sleep(0)
+
+    first.cancel()
+    results = await asyncio.gather(*others, return_exceptions=True)
+    assert first.cancelled(), "첫 요청이 취소되지 않음"
+    failed = [r for r in results if isinstance(r, BaseException)]
+    assert not failed, f"첫 요청 취소가 공유 호출까지 취소함: {len(failed)}개 실패 ({type(failed[0]).__name__})"
+    assert len(set(results)) == 1 and results[0].endswith("취소 테스트"), f"나머지 응답 이상: {set(results)}"
+
+    started, finished = stub.counts()
+    assert started - before[0] == 1, f"취소 후 스텁 호출 {started - before[0]}번 (1번이어야 함)"
+    assert finished - before[1] == 1, "공유 호출이 스텁에서 끝까지 처리되지 않음"
+
+    again = await svc.chat_completion(messages)
+    assert again == results[0] and stub.counts()[0] == started, "취소와 무관하게 결과가 캐시되지 않음"
+    print(f"✅ 3) 첫 요청 취소 → 나머지 {len(others)}개는 같은 호출 결과 수신, 스텁 호출 1번, 결과 캐시됨")
+
+
+async def run(args, stub: StubLLM) -> None:
+    from app.services import openai_service as svc
+
+    try:
+        expected = await check_concurrent(svc, stub, args.concurrency)
+        await check_cached(svc, stub, expected)
+        await check_cancel(svc, stub, args.concurrency)
+    finally:
+        await svc.close_openai_client()
+    print(f"📊 metrics: {svc.get_openai_metrics()}")
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--concurrency", type=int, default=8, help="동시에 보낼 같은 요청 수")
+    p.add_argument("--delay", type=float, default=0.5, help="스텁 응답 지연(초)")
+    args = p.parse_args()
+
+    stub = StubLLM(args.delay)
+    stub.start()
+
+    # 설정은 import 시점에 읽고 캐시되므로 그 전에 스텁 주소 지정
+    os.environ["OPENAI_BASE_URL"] = stub.base_url
+    os.environ["OPENAI_API_KEY"] = "stub-key"
+    os.environ.setdefault("OPENAI_CACHE_TTL_SEC", "60")
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+    print(f"[STUB] {stub.base_url} (delay={args.delay}s)")
+    try:
+        asyncio.run(run(args, stub))
+    finally:
+        stub.stop()
+
+
+if __name__ == "__main__":
+    main()
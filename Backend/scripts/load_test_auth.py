@@ -0,0 +1,119 @@
+"""
+load_test_auth.py
+- 로그인 폭주 중에도 이벤트 루프(MQTT 수신 / 웹소켓 브로드캐스트)가 멈추지 않는지 확인하는 부하 테스트
+- 1) baseline: /api/health 만 주기적으로 호출해 응답 지연 측정
+- 2) storm   : 같은 측정을 하면서 동시에 N개 클라이언트가 /api/auth/login 반복
+- /api/health 는 DB/외부 호출 없이 이벤트 루프에서 바로 응답하므로,
+  그 지연이 곧 같은 루프에서 돌아가는 MQTT 수신 처리가 기다리는 시간
+
+실행 예시)
+  cd Backend
+  python scripts/load_test_auth.py --base-url http://localhost:8000 --username loadtest --password loadtest123 --register
+  python scripts/load_test_auth.py --concurrency 32 --duration 20
+
+bcrypt가 이벤트 루프에서 바로 돌면 storm 구간 p95/max가 수백 ms~초 단위로 튀고,
+해시 전용 스레드 풀에서 돌면 baseline과 비슷하게 유지되어야 함
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+def summarize(samples: list) -> str:
+    if not samples:
+        return "샘플 없음"
+    ms = sorted(s * 1000 for s in samples)
+
+    def pct(p: float) -> float:
+        return ms[min(len(ms) - 1, int(len(ms) * p))]
+
+    return (
+        f"n={len(ms)} p50={statistics.median(ms):.1f}ms p95={pct(0.95):.1f}ms "
+        f"p99={pct(0.99):.1f}ms max={ms[-1]:.1f}ms"
+    )
+
+
+async def probe_health(client: httpx.AsyncClient, stop: asyncio.Event, interval: float, out: list):
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        try:
+            r = await client.get("/api/health")
+            r.raise_for_status()
+            out.append(time.perf_counter() - t0)
+        except httpx.HTTPError as e:
+            print(f"⚠️ health 실패: {e}")
+        await asyncio.sleep(interval)
+
+
+async def login_worker(client: httpx.AsyncClient, stop: asyncio.Event, username: str, password: str, stats: dict):
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        try:
+            r = await client.post("/api/auth/login", data={"username": username, "password": password})
+            stats["latency"].append(time.perf_counter() - t0)
+            stats["ok" if r.status_code == 200 else "fail"] += 1
+        except httpx.HTTPError:
+            stats["error"] += 1
+
+
+async def run_phase(base_url: str, duration: float, interval: float, concurrency: int, username: str, password: str):
+    health: list = []
+    stats = {"latency": [], "ok": 0, "fail": 0, "error": 0}
+    stop = asyncio.Event()
+    limits = httpx.Limits(max_connections=concurrency + 4)
+    async with httpx.AsyncClient(base_url=base_url, timeout=30.0, limits=limits) as client:
+        tasks = [asyncio.create_task(probe_health(client, stop, interval, health))]
+        tasks += [
+            asyncio.create_task(login_worker(client, stop, username, password, stats))
+            for _ in range(concurrency)
+        ]
+        await asyncio.sleep(duration)
+        stop.set()
+        await asyncio.gather(*tasks)
+    return health, stats
+
+
+async def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--base-url", type=str, default="http://localhost:8000")
+    p.add_argument("--username", type=str, default="loadtest")
+    p.add_argument("--password", type=str, default="loadtest123")
+    p.add_argument("--register", action="store_true", help="시작 전에 테스트 계정 등록 (이미 있으면 무시)")
+    p.add_argument("--concurrency", type=int, default=16, help="동시 로그인 클라이언트 수")
+    p.add_argument("--duration", type=float, default=15.0, help="구간별 측정 시간(초)")
+    p.add_argument("--interval", type=float, default=0.05, help="health 호출 간격(초)")
+    args = p.parse_args()
+
+    if args.register:
+        async with httpx.AsyncClient(base_url=args.base_url, timeout=30.0) as client:
+            r = await client.post("/api/auth/register", json={
+                "username": args.username,
+                "email": f"{args.username}@loadtest.local",
+                "password": args.password,
+            })
+            print(f"[REGISTER] {r.status_code}")
+
+    print(f"[BASELINE] {args.duration:.0f}초 health 측정")
+    base_health, _ = await run_phase(args.base_url, args.duration, args.interval, 0, args.username, args.password)
+    print(f"  health : {summarize(base_health)}")
+
+    print(f"[STORM] {args.duration:.0f}초 동안 로그인 {args.concurrency}개 동시 반복")
+    storm_health, stats = await run_phase(
+        args.base_url, args.duration, args.interval, args.concurrency, args.username, args.password
+    )
+    print(f"  health : {summarize(storm_health)}")
+    print(f"  login  : {summarize(stats['latency'])}")
+    print(
+        f"  login  : ok={stats['ok']} fail={stats['fail']} error={stats['error']} "
+        f"({stats['ok'] / args.duration:.1f}/s)"
+    )
+    if stats["fail"] and not stats["ok"]:
+        print("⚠️ 로그인이 모두 실패했습니다. --register 또는 계정 정보를 확인하세요.")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())